@@ -1,5 +1,19 @@
 from pygame.math import Vector2
 import random
+import numpy as np
+from game.walkgrid import WalkGrid
+
+# Movimientos posibles (derecha, izquierda, abajo, arriba), compartidos por todos los NPC
+DIRECTIONS = (Vector2(1,0), Vector2(-1,0), Vector2(0,1), Vector2(0,-1))
+DIRECTION_ARRAY = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.float32)
+
+
+def as_walk_grid(path_mask) -> WalkGrid:
+    """Acepta una WalkGrid o una Surface de máscara (transitable donde el rojo > 0)."""
+    if isinstance(path_mask, WalkGrid):
+        return path_mask
+    return WalkGrid.from_surface(path_mask, channel=0)
+
 
 class NPCBehavior:
     """
@@ -7,16 +21,78 @@ class NPCBehavior:
     """
     def __init__(self, start_pos, path_mask):
         self.pos = Vector2(start_pos)
-        self.mask = path_mask
+        self.mask = as_walk_grid(path_mask)
         self.speed = 2
 
     def step(self):
         # Movimiento aleatorio sencillo sobre la máscara
-        dirs = [Vector2(1,0), Vector2(-1,0), Vector2(0,1), Vector2(0,-1)]
-        move = random.choice(dirs) * self.speed
-        new = self.pos + move
-        x, y = int(new.x), int(new.y)
-        if 0 <= x < self.mask.get_width() and 0 <= y < self.mask.get_height():
-            if self.mask.get_at((x,y))[0] > 0:
-                self.pos = new
-        return self.pos
\ No newline at end of file
+        new = self.pos + random.choice(DIRECTIONS) * self.speed
+        if self.mask.is_walkable(new.x, new.y):
+            self.pos = new
+        return self.pos
+
+
+def step_batch(behaviors: list[NPCBehavior], rng: np.random.Generator = None) -> None:
+    """
+    Un paso de todos los NPC con una sola consulta vectorizada a la rejilla.
+    Todos deben compartir la misma máscara.
+    """
+    if not behaviors:
+        return
+    rng = rng if rng is not None else np.random.default_rng()
+    pos = np.array([(b.pos.x, b.pos.y) for b in behaviors], dtype=np.float32)
+    speed = np.array([b.speed for b in behaviors], dtype=np.float32)
+    new, ok = _propose(pos, speed, behaviors[0].mask, rng)
+    for i, (x, y) in zip(np.flatnonzero(ok).tolist(), new[ok].tolist()):
+        behaviors[i].pos.update(x, y)
+
+
+def _propose(pos: np.ndarray, speed: np.ndarray, grid: WalkGrid, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    dirs = DIRECTION_ARRAY[rng.integers(0, len(DIRECTION_ARRAY), len(pos))]
+    new = pos + dirs * speed[:, None]
+    return new, grid.walkable(new[:, 0], new[:, 1])
+
+
+class NPCCrowd:
+    """
+    Multitud de NPC guardada como arrays (posiciones N×2, velocidades N):
+    el paso de patrulla y las colisiones de todo el frame son una operación.
+    """
+    def __init__(self, positions, path_mask, speed: float = 2, seed: int = None):
+        self.pos = np.array(positions, dtype=np.float32).reshape(-1, 2)
+        self.speed = np.full(len(self.pos), speed, dtype=np.float32)
+        self.mask = as_walk_grid(path_mask)
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return len(self.pos)
+
+    def add(self, pos, speed: float = 2) -> int:
+        self.pos = np.vstack([self.pos, np.asarray(pos, dtype=np.float32).reshape(1, 2)])
+        self.speed = np.append(self.speed, np.float32(speed))
+        return len(self.pos) - 1
+
+    def step(self, which: np.ndarray = None) -> np.ndarray:
+        """Paso de patrulla aleatorio de todos los NPC (o solo de `which`)."""
+        if which is None:
+            new, ok = _propose(self.pos, self.speed, self.mask, self.rng)
+            self.pos[ok] = new[ok]
+            return self.pos
+        pos = self.pos[which]
+        new, ok = _propose(pos, self.speed[which], self.mask, self.rng)
+        pos[ok] = new[ok]
+        self.pos[which] = pos
+        return self.pos
+
+    def follow(self, field, which: np.ndarray = None) -> np.ndarray:
+        """
+        Avanza hacia la meta de un FlowField (game.pathfinding) a todos los NPC
+        o solo a los índices/máscara `which`.
+        """
+        idx = slice(None) if which is None else which
+        pos = self.pos[idx]
+        new = pos + field.direction(pos[:, 0], pos[:, 1]) * self.speed[idx][:, None]
+        ok = field.service.walkable(new[:, 0], new[:, 1])
+        pos[ok] = new[ok]
+        self.pos[idx] = pos
+        return self.pos
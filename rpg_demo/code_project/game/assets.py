@@ -0,0 +1,213 @@
+# game/assets.py
+
+import os
+import struct
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+import pygame
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+CACHE_DIR = os.path.join(BASE_DIR, ".asset_cache")
+
+# Cabecera de la caché en disco: magia, versión, ancho, alto, formato de píxel
+_HEADER = struct.Struct("<4sHII4s")
+_MAGIC = b"RPGA"
+_VERSION = 1
+
+Size = tuple[int, int]
+
+
+class AssetManager:
+    """
+    Punto único de carga de recursos, por clave (ruta relativa a assets/).
+    - image/scaled/sprite/slices se cargan la primera vez que se piden
+      y quedan memorizados.
+    - preload() decodifica en un hilo de fondo lo que necesitará la siguiente
+      escena; la conversión al formato de pantalla se hace en el hilo principal
+      al pedirlo (convert() no es seguro fuera de él). Si se pide algo que la
+      precarga está decodificando, se espera a ella en vez de decodificarlo otra vez.
+    - Las variantes escaladas se guardan en disco (.asset_cache/) como píxeles
+      crudos, así los siguientes arranques se saltan la decodificación del PNG
+      y el transform.scale. La entrada se invalida si cambia el PNG.
+    """
+    def __init__(self, root: str = ASSETS_DIR, cache_dir: str = CACHE_DIR, disk_cache: bool = True):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.disk_cache = disk_cache
+        self._memo: dict[tuple, pygame.Surface] = {}
+        self._raw: dict[tuple, pygame.Surface] = {}  # decodificadas en el hilo de fondo
+        self._loading: dict[tuple, threading.Event] = {}  # en decodificación ahora mismo
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self.stats = {"loads": 0, "disk_hits": 0, "preloaded": 0}
+
+    def path(self, key: str) -> str:
+        return key if os.path.isabs(key) else os.path.join(self.root, key)
+
+    # ─── Conversión ──────────────────────────────────────────────────────────
+    @staticmethod
+    def _convert(surf: pygame.Surface, alpha: bool) -> pygame.Surface:
+        if pygame.display.get_surface() is None:
+            return surf
+        return surf.convert_alpha() if alpha else surf.convert()
+
+    def _memoized(self, spec: tuple, alpha: bool) -> pygame.Surface | None:
+        surf = self._memo.get(spec)
+        if surf is not None:
+            return surf
+        with self._lock:
+            raw = self._raw.pop(spec, None)
+            loading = self._loading.get(spec) if raw is None else None
+        if loading is not None:
+            loading.wait()
+            with self._lock:
+                raw = self._raw.pop(spec, None)
+        if raw is None:
+            return None
+        surf = self._memo[spec] = self._convert(raw, alpha)
+        self.stats["preloaded"] += 1
+        return surf
+
+    # ─── Caché en disco ──────────────────────────────────────────────────────
+    def _disk_path(self, spec: tuple) -> str:
+        src = self.path(spec[1])
+        st = os.stat(src)
+        raw = repr((spec, st.st_mtime_ns, st.st_size)).encode("utf-8")
+        return os.path.join(self.cache_dir, hashlib.blake2b(raw, digest_size=16).hexdigest() + ".bin")
+
+    def _disk_load(self, spec: tuple) -> pygame.Surface | None:
+        if not self.disk_cache:
+            return None
+        try:
+            with open(self._disk_path(spec), "rb") as f:
+                magic, version, w, h, fmt = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or version != _VERSION:
+                    return None
+                return pygame.image.frombytes(f.read(), (w, h), fmt.decode("ascii").strip())
+        except (OSError, struct.error, ValueError):
+            return None
+
+    def _disk_save(self, spec: tuple, surf: pygame.Surface, alpha: bool) -> None:
+        if not self.disk_cache:
+            return
+        fmt = "RGBA" if alpha else "RGB"
+        path = self._disk_path(spec)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            w, h = surf.get_size()
+            f.write(_HEADER.pack(_MAGIC, _VERSION, w, h, fmt.encode("ascii").ljust(4)))
+            f.write(pygame.image.tobytes(surf, fmt))
+        os.replace(tmp, path)
+
+    def clear_disk_cache(self) -> None:
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".bin"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    # ─── Carga (sin convertir; sirve para cualquier hilo) ────────────────────
+    def _load_raw(self, spec: tuple) -> pygame.Surface:
+        kind, key = spec[0], spec[1]
+        if kind == "image":
+            self.stats["loads"] += 1
+            return pygame.image.load(self.path(key))
+        # ("scaled", key, size, alpha)
+        surf = self._disk_load(spec)
+        if surf is not None:
+            self.stats["disk_hits"] += 1
+            return surf
+        self.stats["loads"] += 1
+        surf = pygame.transform.scale(pygame.image.load(self.path(key)), spec[2])
+        self._disk_save(spec, surf, spec[3])
+        return surf
+
+    # ─── API ─────────────────────────────────────────────────────────────────
+    def image(self, key: str, alpha: bool = True, colorkey=None) -> pygame.Surface:
+        spec = ("image", key, alpha, colorkey)
+        surf = self._memoized(spec, alpha)
+        if surf is None:
+            surf = self._memo[spec] = self._convert(self._load_raw(spec), alpha)
+            if colorkey is not None:
+                surf.set_colorkey(colorkey)
+        return surf
+
+    def scaled(self, key: str, size: Size, alpha: bool = False) -> pygame.Surface:
+        """Variante de `key` escalada a `size` (cacheada también en disco)."""
+        spec = ("scaled", key, tuple(size), alpha)
+        surf = self._memoized(spec, alpha)
+        if surf is None:
+            surf = self._memo[spec] = self._convert(self._load_raw(spec), alpha)
+        return surf
+
+    def sprite(self, key: str, rect: tuple[int, int, int, int]) -> pygame.Surface:
+        """Recorte de una hoja de sprites (subsuperficie, sin copiar)."""
+        spec = ("sprite", key, tuple(rect))
+        surf = self._memo.get(spec)
+        if surf is None:
+            surf = self._memo[spec] = self.image(key).subsurface(rect)
+        return surf
+
+    def slices(self, key: str, tile_w: int, tile_h: int = None) -> list[pygame.Surface]:
+        """Todos los recortes tile_w × tile_h de una hoja, por filas."""
+        tile_h = tile_h or tile_w
+        sheet = self.image(key)
+        cols, rows = sheet.get_width() // tile_w, sheet.get_height() // tile_h
+        return [
+            self.sprite(key, (c * tile_w, r * tile_h, tile_w, tile_h))
+            for r in range(rows) for c in range(cols)
+        ]
+
+    # ─── Precarga en segundo plano ───────────────────────────────────────────
+    def preload(self, *items) -> Future:
+        """
+        Decodifica en un hilo de fondo. Cada elemento es una clave (imagen con
+        alfa) o (clave, (ancho, alto)) para una variante escalada opaca.
+        """
+        specs = []
+        for item in items:
+            if isinstance(item, str):
+                specs.append(("image", item, True, None))
+            else:
+                key, size = item
+                specs.append(("scaled", key, tuple(size), False))
+        specs = [s for s in specs if s not in self._memo]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="assets")
+        return self._executor.submit(self._preload, specs)
+
+    def _preload(self, specs: list[tuple]) -> None:
+        for spec in specs:
+            with self._lock:
+                if spec in self._raw or spec in self._memo or spec in self._loading:
+                    continue
+                done = self._loading[spec] = threading.Event()
+            raw = None
+            try:
+                raw = self._load_raw(spec)
+            finally:
+                with self._lock:
+                    # si el hilo principal ya la cargó por su cuenta, no se guarda otra copia
+                    if raw is not None and spec not in self._memo:
+                        self._raw[spec] = raw
+                    del self._loading[spec]
+                done.set()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_assets: AssetManager | None = None
+
+
+def get_assets() -> AssetManager:
+    """Instancia compartida por el motor, los menús y data.py."""
+    global _assets
+    if _assets is None:
+        _assets = AssetManager()
+    return _assets
@@ -0,0 +1,202 @@
+# game/cache.py
+
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Iterator
+from game.db import DB_FILENAME, get_store
+
+SQL_CACHE_GET = "SELECT reply, created_at FROM response_cache WHERE key = ?;"
+SQL_CACHE_PUT = """
+    INSERT OR REPLACE INTO response_cache (key, npc, reply, created_at, last_used)
+    VALUES (?, ?, ?, ?, ?);
+"""
+SQL_CACHE_PRUNE = """
+    DELETE FROM response_cache WHERE created_at < ? OR key IN (
+        SELECT key FROM response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+    );
+"""
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin tildes, sin signos y con espacios colapsados: '¿Quién eres?' -> 'quien eres'."""
+    text = unicodedata.normalize("NFKD", text or "").lower()
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = "".join(c if c.isalnum() else " " for c in text)
+    return " ".join(text.split())
+
+
+class _Flight:
+    """Petición en curso para una clave; los duplicados esperan su resultado."""
+    def __init__(self):
+        self.event = threading.Event()
+        self.reply: str | None = None
+
+
+class ResponseCache:
+    """
+    Caché de respuestas de NPC.
+    Clave: hash de (npc, jugador, mensaje normalizado, contexto de memoria del par).
+    Frente en memoria LRU acotado (aciertos en microsegundos) respaldado por la
+    tabla response_cache de la BD de memorias, para sobrevivir a reinicios.
+    Las entradas caducan tras `ttl` segundos. Si llegan a la vez varias peticiones
+    idénticas, solo la primera llama al modelo; el resto espera su respuesta.
+    """
+    def __init__(
+        self,
+        db_filename: str = DB_FILENAME,
+        max_entries: int = 2048,
+        ttl: float = 7 * 24 * 3600.0,
+        prune_every: int = 64
+    ):
+        self.store = get_store(db_filename)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # fallos servidos por otra petición idéntica en curso
+        self._lru: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._flights: dict[str, _Flight] = {}
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(npc_name: str, player_name: str, player_message: str, context: str = "") -> str:
+        raw = "\0".join((npc_name, player_name, normalize(player_message), context))
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._lru),
+        }
+
+    def _lookup(self, key: str) -> str | None:
+        # Llamar con self._lock tomado
+        now = time.time()
+        entry = self._lru.get(key)
+        if entry is None:
+            row = self.store.conn.execute(SQL_CACHE_GET, (key,)).fetchone()
+            if row is None:
+                return None
+            entry = (row[0], row[1])
+            self._remember(key, entry)
+        if now - entry[1] > self.ttl:
+            del self._lru[key]
+            return None
+        self._lru.move_to_end(key)
+        return entry[0]
+
+    def _remember(self, key: str, entry: tuple[str, float]) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            reply = self._lookup(key)
+            if reply is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return reply
+
+    def put(self, key: str, npc_name: str, reply: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, (reply, now))
+            self._puts += 1
+            prune = self._puts % self.prune_every == 0
+        conn = self.store.conn
+        with conn:
+            conn.execute(SQL_CACHE_PUT, (key, npc_name, reply, now, now))
+            if prune:
+                conn.execute(SQL_CACHE_PRUNE, (now - self.ttl, self.max_entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+        with self.store.conn:
+            self.store.conn.execute("DELETE FROM response_cache;")
+
+    # ─── Single-flight ───────────────────────────────────────────────────────
+    def _begin(self, key: str) -> tuple[str | None, _Flight | None, bool]:
+        """Devuelve (respuesta en caché, vuelo, soy_lider)."""
+        with self._lock:
+            reply = self._lookup(key)
+            if reply is not None:
+                self.hits += 1
+                return reply, None, False
+            self.misses += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                return None, flight, False
+            flight = self._flights[key] = _Flight()
+            return None, flight, True
+
+    def _finish(self, key: str, npc_name: str, flight: _Flight, reply: str | None) -> None:
+        if reply is not None:
+            self.put(key, npc_name, reply)
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.reply = reply
+        flight.event.set()
+
+    def get_or_compute(self, key: str, npc_name: str, compute: Callable[[], str]) -> str:
+        """
+        Devuelve la respuesta cacheada o la calcula una sola vez.
+        Si compute lanza, la excepción se propaga y no se guarda nada.
+        """
+        reply, flight, leader = self._begin(key)
+        if reply is not None:
+            return reply
+        if not leader:
+            flight.event.wait()
+            if flight.reply is not None:
+                self.coalesced += 1
+                return flight.reply
+            return compute()
+        result = None
+        try:
+            result = compute()
+            return result
+        finally:
+            self._finish(key, npc_name, flight, result)
+
+    def stream_or_compute(
+        self,
+        key: str,
+        npc_name: str,
+        stream: Callable[[], Iterator[str]]
+    ) -> Iterator[str]:
+        """Igual que get_or_compute, pero cediendo trozos; un acierto sale de una vez."""
+        reply, flight, leader = self._begin(key)
+        if reply is not None:
+            yield reply
+            return
+        if not leader:
+            flight.event.wait()
+            if flight.reply is not None:
+                self.coalesced += 1
+                yield flight.reply
+            else:
+                yield from stream()
+            return
+        parts = []
+        completed = False
+        try:
+            for chunk in stream():
+                parts.append(chunk)
+                yield chunk
+            completed = True
+        finally:
+            reply = "".join(parts).strip() if completed and parts else None
+            self._finish(key, npc_name, flight, reply)
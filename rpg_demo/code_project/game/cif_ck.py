@@ -1,105 +1,386 @@
-import random
-from typing import Dict, List, Callable
+import os
+import json
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple
+import numpy as np
+
+NO_MOVE = -1
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RULES_PATH = os.path.join(BASE_DIR, 'assets', 'rules', 'social_moves.json')
+
+# Comparadores permitidos en las precondiciones
+_OPS = {
+    '>':  np.greater,
+    '>=': np.greater_equal,
+    '<':  np.less,
+    '<=': np.less_equal,
+}
+
 
 class SocialAttribute:
     """
     Representa un atributo social (ej. amistad, respeto, miedo) con valores entre -1.0 y 1.0.
+    Es una vista sobre la matriz (fuente × objetivo) del atributo en la SocialNetwork:
+    get/adjust trabajan sobre la columna del actor, es decir, sobre lo que
+    todos los demás sienten hacia él.
     """
-    def __init__(self, name: str, default: float = 0.0):
+    def __init__(self, name: str, net: 'SocialNetwork', index: int, default: float = 0.0):
         self.name = name
-        self.values: Dict[str, float] = {}
+        self.net = net
+        self.index = index
         self.default = default
 
+    @property
+    def values(self) -> Dict[str, float]:
+        return {actor: self.get(actor) for actor in self.net.names}
+
     def get(self, actor: str) -> float:
-        return self.values.get(actor, self.default)
+        t = self.net.index.get(actor)
+        if t is None:
+            return self.default
+        col = self.net.values[self.index, :, t]
+        # media de lo que sienten los demás actores (sin contarse a sí mismo)
+        n = len(col)
+        if n <= 1:
+            return float(col[t]) if n else self.default
+        return float((col.sum() - col[t]) / (n - 1))
 
     def adjust(self, actor: str, delta: float) -> None:
-        new_val = self.get(actor) + delta
+        t = self.net.index.get(actor)
+        if t is None:
+            return
+        col = self.net.values[self.index, :, t]
+        col += delta
         # Clamping entre -1 y 1
-        self.values[actor] = max(-1.0, min(1.0, new_val))
+        np.clip(col, -1.0, 1.0, out=col)
+
 
 class SocialMove:
     """
     Define un movimiento social con precondiciones y efectos sobre atributos.
     name: identificador del movimiento.
-    precond: función(net, source, target) -> bool si puede ejecutarse.
-    effect: función(net, source, target) que ajusta atributos.
+    conditions: lista de (atributo, comparador, umbral) sobre lo que la fuente
+                siente hacia el objetivo; todas deben cumplirse.
+    effects: {atributo: delta} que se suma a la relación fuente → objetivo.
+    weights: {'base': b, atributo: coef}; peso = max(0, b + Σ coef·valor).
+    allow_self: si el movimiento puede dirigirse a uno mismo.
     """
     def __init__(self,
                  name: str,
-                 precond: Callable[['SocialNetwork', str, str], bool],
-                 effect: Callable[['SocialNetwork', str, str], None]):
+                 conditions: List[Tuple[str, str, float]] = (),
+                 effects: Dict[str, float] = None,
+                 allow_self: bool = True,
+                 weights: Dict[str, float] = None):
         self.name = name
-        self.precond = precond
-        self.effect = effect
+        self.conditions = list(conditions)
+        self.effects = dict(effects or {})
+        self.allow_self = allow_self
+        self.weights = dict(weights or {'base': 1.0})
+
+    @classmethod
+    def from_rule(cls, rule: dict) -> 'SocialMove':
+        """Crea el movimiento a partir de una entrada del fichero de reglas."""
+        for _attr, op, _thr in rule.get('when', []):
+            if op not in _OPS:
+                raise ValueError(f"Comparador desconocido en '{rule['name']}': {op}")
+        return cls(
+            rule['name'],
+            [(attr, op, float(thr)) for attr, op, thr in rule.get('when', [])],
+            {attr: float(d) for attr, d in rule.get('effects', {}).items()},
+            bool(rule.get('allow_self', True)),
+            {k: float(v) for k, v in rule.get('weight', {'base': 1.0}).items()},
+        )
+
+    def weight(self, net: 'SocialNetwork', src: str, tgt: str) -> float:
+        w = self.weights.get('base', 0.0)
+        for attr, coef in self.weights.items():
+            if attr != 'base':
+                w += coef * net.get_pair(attr, src, tgt)
+        return max(0.0, w)
+
+    def precond(self, net: 'SocialNetwork', src: str, tgt: str) -> bool:
+        if not self.allow_self and src == tgt:
+            return False
+        return all(
+            bool(_OPS[op](net.get_pair(attr, src, tgt), thr))
+            for attr, op, thr in self.conditions
+        )
+
+    def effect(self, net: 'SocialNetwork', src: str, tgt: str) -> None:
+        for attr, delta in self.effects.items():
+            net.adjust_pair(attr, src, tgt, delta)
+
+
+def load_rules(path: str = RULES_PATH) -> dict:
+    """Lee el fichero JSON de reglas sociales (atributos y movimientos)."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class MoveIndex:
+    """
+    Precondiciones compiladas para consultas por par.
+    Agrupa las condiciones por (atributo, comparador) y ordena sus umbrales;
+    para un par basta un bisect por grupo para saber qué movimientos lo cumplen
+    (como máscara de bits), sin llamar a ninguna función por movimiento.
+    """
+    def __init__(self, moves: List[SocialMove], attr_index: Dict[str, int]):
+        self.all_bits = (1 << len(moves)) - 1
+        self.self_bits = 0  # movimientos permitidos cuando fuente == objetivo
+        # (atributo, op) -> umbral más restrictivo de cada movimiento
+        tightest: Dict[Tuple[int, str], Dict[int, float]] = {}
+        for m, move in enumerate(moves):
+            if move.allow_self:
+                self.self_bits |= 1 << m
+            for attr, op, thr in move.conditions:
+                group = tightest.setdefault((attr_index[attr], op), {})
+                if m in group:
+                    keep_max = op in ('>', '>=')
+                    thr = max(group[m], thr) if keep_max else min(group[m], thr)
+                group[m] = thr
+
+        self.groups = []
+        for (a, op), by_move in tightest.items():
+            entries = sorted((thr, m) for m, thr in by_move.items())
+            thrs = [thr for thr, _ in entries]
+            constrained = 0
+            for _, m in entries:
+                constrained |= 1 << m
+            # masks[k] = movimientos de las k primeras entradas (umbrales más bajos)
+            masks = [0]
+            for _, m in entries:
+                masks.append(masks[-1] | (1 << m))
+            self.groups.append((a, op, thrs, masks, self.all_bits & ~constrained))
+
+    def valid_bits(self, vec: List[float], same_actor: bool = False) -> int:
+        """Máscara de bits de los movimientos válidos para el vector de atributos de un par."""
+        bits = self.self_bits if same_actor else self.all_bits
+        for a, op, thrs, masks, free in self.groups:
+            v = vec[a]
+            if op == '>':      # umbral < v: prefijo
+                ok = masks[bisect_left(thrs, v)]
+            elif op == '>=':   # umbral <= v: prefijo
+                ok = masks[bisect_right(thrs, v)]
+            elif op == '<':    # umbral > v: sufijo
+                ok = masks[-1] & ~masks[bisect_right(thrs, v)]
+            else:              # '<=': umbral >= v: sufijo
+                ok = masks[-1] & ~masks[bisect_left(thrs, v)]
+            bits &= ok | free
+            if not bits:
+                break
+        return bits
+
 
 class SocialNetwork:
     """
     Versión ampliada de CiF-CK: mantiene atributos sociales y decide movimientos basados en condiciones y probabilidades.
+    Los atributos se guardan en un tensor (atributos × fuentes × objetivos) para
+    poder evaluar precondiciones y aplicar efectos sobre todos los pares a la vez.
     """
-    def __init__(self, npcs: List[str]):
+    def __init__(self, npcs: List[str], seed: int = None, rules=None):
+        # Reglas: ruta a un JSON, dict ya cargado o None para las de assets/rules
+        if rules is None or isinstance(rules, str):
+            rules = load_rules(rules or RULES_PATH)
+        self.rules = rules
         # Inicializa atributos sociales
+        self.attr_names = list(rules['attributes'])
+        self.attr_index = {name: i for i, name in enumerate(self.attr_names)}
+        self.names: List[str] = list(dict.fromkeys(list(npcs) + ['Jugador']))
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.values = np.zeros((len(self.attr_names), n, n), dtype=np.float32)
         self.attributes: Dict[str, SocialAttribute] = {
-            'amistad': SocialAttribute('amistad', 0.0),
-            'respeto': SocialAttribute('respeto', 0.0),
-            'miedo': SocialAttribute('miedo', 0.0)
+            name: SocialAttribute(name, self, i, 0.0)
+            for i, name in enumerate(self.attr_names)
         }
+        self.rng = np.random.default_rng(seed)
         self.moves: List[SocialMove] = []
-        self.actors = set(npcs + ['Jugador'])
         self._build_moves()
+        self._compile_moves()
+
+    @property
+    def actors(self) -> set:
+        return set(self.names)
+
+    def add_actor(self, name: str) -> int:
+        """Añade un actor (fila y columna nuevas a cero) y devuelve su índice."""
+        if name in self.index:
+            return self.index[name]
+        self.values = np.pad(self.values, ((0, 0), (0, 1), (0, 1)))
+        self.names.append(name)
+        self.index[name] = len(self.names) - 1
+        return self.index[name]
 
     def _build_moves(self) -> None:
-        # Ayudar: solo si amistad > 0.2
-        def pre_help(net, src, tgt):
-            return net.attributes['amistad'].get(tgt) > 0.2
-        def eff_help(net, src, tgt):
-            net.attributes['amistad'].adjust(tgt, 0.3)
-            net.attributes['respeto'].adjust(tgt, 0.2)
-        self.moves.append(SocialMove('ayudar', pre_help, eff_help))
-
-        # Insulto: si amistad < 0.0
-        def pre_insult(net, src, tgt):
-            return net.attributes['amistad'].get(tgt) < 0.0
-        def eff_insult(net, src, tgt):
-            net.attributes['respeto'].adjust(tgt, -0.4)
-            net.attributes['miedo'].adjust(tgt, 0.3)
-        self.moves.append(SocialMove('insultar', pre_insult, eff_insult))
-
-        # Chismear: siempre disponible
-        def pre_gossip(net, src, tgt):
-            return src != tgt
-        def eff_gossip(net, src, tgt):
-            net.attributes['respeto'].adjust(tgt, -0.1)
-        self.moves.append(SocialMove('chismear', pre_gossip, eff_gossip))
-
-        # Elogio: aumenta respeto
-        def pre_praise(net, src, tgt):
-            return True
-        def eff_praise(net, src, tgt):
-            net.attributes['respeto'].adjust(tgt, 0.3)
-            net.attributes['amistad'].adjust(tgt, 0.1)
-        self.moves.append(SocialMove('elogiar', pre_praise, eff_praise))
+        for rule in self.rules['moves']:
+            move = SocialMove.from_rule(rule)
+            unknown = {a for a, _, _ in move.conditions} | set(move.effects)
+            unknown |= set(move.weights) - {'base'}
+            unknown -= set(self.attr_names)
+            if unknown:
+                raise ValueError(f"Atributos desconocidos en '{move.name}': {sorted(unknown)}")
+            self.moves.append(move)
 
+    def _compile_moves(self) -> None:
+        """
+        Compila las reglas: índice de precondiciones para consultas por par y
+        matrices (movimientos × atributos) de efectos y pesos para el lote.
+        """
+        n_moves, n_attrs = len(self.moves), len(self.attr_names)
+        self.move_index = MoveIndex(self.moves, self.attr_index)
+        self.effect_matrix = np.zeros((n_moves, n_attrs), dtype=np.float32)
+        self.weight_base = np.zeros(n_moves, dtype=np.float32)
+        self.weight_coef = np.zeros((n_moves, n_attrs), dtype=np.float32)
+        for m, move in enumerate(self.moves):
+            for attr, delta in move.effects.items():
+                self.effect_matrix[m, self.attr_index[attr]] = delta
+            for attr, coef in move.weights.items():
+                if attr == 'base':
+                    self.weight_base[m] = coef
+                else:
+                    self.weight_coef[m, self.attr_index[attr]] = coef
+
+    def move_weights(self) -> np.ndarray:
+        """Pesos (movimientos × fuentes × objetivos) según las reglas, sin negativos."""
+        w = np.tensordot(self.weight_coef, self.values, axes=(1, 0))
+        w += self.weight_base[:, None, None]
+        return np.maximum(w, 0.0, out=w)
+
+    # ─── Acceso por par ──────────────────────────────────────────────────────
+    def get_pair(self, attr_name: str, source: str, target: str) -> float:
+        a = self.attr_index.get(attr_name)
+        s, t = self.index.get(source), self.index.get(target)
+        if a is None or s is None or t is None:
+            return 0.0
+        return float(self.values[a, s, t])
+
+    def adjust_pair(self, attr_name: str, source: str, target: str, delta: float) -> None:
+        a = self.attr_index.get(attr_name)
+        s, t = self.index.get(source), self.index.get(target)
+        if a is None or s is None or t is None:
+            return
+        self.values[a, s, t] = min(1.0, max(-1.0, self.values[a, s, t] + delta))
+
+    # ─── Evaluación en lote ──────────────────────────────────────────────────
+    def valid_mask(self) -> np.ndarray:
+        """
+        Máscara booleana (movimientos × fuentes × objetivos): True donde
+        el movimiento cumple sus precondiciones para ese par.
+        """
+        n = len(self.names)
+        mask = np.ones((len(self.moves), n, n), dtype=bool)
+        diag = np.eye(n, dtype=bool)
+        for m, move in enumerate(self.moves):
+            for attr, op, thr in move.conditions:
+                # umbral en float64, igual que en las consultas por par
+                mask[m] &= _OPS[op](self.values[self.attr_index[attr]], np.float64(thr))
+            if not move.allow_self:
+                mask[m] &= ~diag
+        return mask
+
+    def decide_moves_all(self, rng: np.random.Generator = None) -> np.ndarray:
+        """
+        Elige un movimiento para cada par (fuente, objetivo) distinto de una vez.
+        Devuelve una matriz de índices en self.moves (NO_MOVE si no hay válidos
+        o en la diagonal). Reproducible con SocialNetwork(seed=...) o un rng propio.
+        """
+        rng = self.rng if rng is None else rng
+        n = len(self.names)
+        weights = self.valid_mask() * self.move_weights()
+        cum = np.cumsum(weights, axis=0)
+        total = cum[-1]
+        u = rng.random((n, n)) * total
+        choice = (cum > u[None]).argmax(axis=0)
+        choice[total <= 0] = NO_MOVE
+        np.fill_diagonal(choice, NO_MOVE)
+        return choice
+
+    def apply_moves(self, choices: np.ndarray) -> None:
+        """Aplica a la vez los movimientos elegidos por decide_moves_all, con clamping."""
+        active = choices != NO_MOVE
+        if not active.any():
+            return
+        deltas = self.effect_matrix[np.where(active, choices, 0)]  # (N, N, A)
+        deltas[~active] = 0.0
+        self.values += np.moveaxis(deltas, -1, 0)
+        np.clip(self.values, -1.0, 1.0, out=self.values)
+
+    def step_all(self, rng: np.random.Generator = None) -> np.ndarray:
+        """Un tick social completo: decide y aplica los movimientos de todos los pares."""
+        choices = self.decide_moves_all(rng)
+        self.apply_moves(choices)
+        return choices
+
+    def step_pairs(
+        self,
+        pairs: List[Tuple[str, str]],
+        rng: np.random.Generator = None,
+        both_ways: bool = True
+    ) -> List[Tuple[str, str, str]]:
+        """
+        Tick social restringido a los pares dados (p. ej. los NPC cercanos que
+        devuelve SpatialHash.pairs_within), en lugar de los N² pares.
+        Con both_ways cada par actúa en los dos sentidos.
+        Devuelve [(fuente, objetivo, movimiento)] de lo que se aplicó.
+        """
+        rng = self.rng if rng is None else rng
+        index = self.index
+        src = [index[a] for a, b in pairs if a in index and b in index and a != b]
+        tgt = [index[b] for a, b in pairs if a in index and b in index and a != b]
+        if both_ways:
+            src, tgt = src + tgt, tgt + src
+        if not src:
+            return []
+        s, t = np.array(src), np.array(tgt)
+        vals = self.values[:, s, t]  # (atributos × pares)
+        valid = np.ones((len(self.moves), len(s)), dtype=bool)
+        for m, move in enumerate(self.moves):
+            for attr, op, thr in move.conditions:
+                valid[m] &= _OPS[op](vals[self.attr_index[attr]], np.float64(thr))
+        weights = self.weight_coef @ vals + self.weight_base[:, None]
+        weights = np.maximum(weights, 0.0) * valid
+        cum = np.cumsum(weights, axis=0)
+        total = cum[-1]
+        choice = (cum > (rng.random(len(s)) * total)[None]).argmax(axis=0)
+        active = total > 0
+        if not active.any():
+            return []
+        s, t, choice = s[active], t[active], choice[active]
+        np.add.at(self.values, (slice(None), s, t), self.effect_matrix[choice].T)
+        np.clip(self.values, -1.0, 1.0, out=self.values)
+        names = self.names
+        return [(names[a], names[b], self.moves[m].name) for a, b, m in zip(s.tolist(), t.tolist(), choice.tolist())]
+
+    # ─── API por par (compatibilidad) ────────────────────────────────────────
     def get_valid_moves(self, source: str, target: str) -> List[SocialMove]:
         # Retorna movimientos que cumplen precondiciones y actores válidos
-        if source not in self.actors or target not in self.actors:
+        s, t = self.index.get(source), self.index.get(target)
+        if s is None or t is None:
             return []
-        return [m for m in self.moves if m.precond(self, source, target)]
+        bits = self.move_index.valid_bits(self.values[:, s, t].tolist(), s == t)
+        valids = []
+        while bits:
+            low = bits & -bits
+            valids.append(self.moves[low.bit_length() - 1])
+            bits ^= low
+        return valids
 
-    def decide_move(self, source: str, target: str) -> SocialMove:
+    def decide_move(self, source: str, target: str, rng: np.random.Generator = None) -> SocialMove:
         """
         Elige un movimiento válido de forma aleatoria ponderada.
-        Se puede ampliar para ponderar según atributos.
+        Los pesos salen de las reglas ("weight" en el fichero de movimientos).
+        Usa el mismo rng sembrado que decide_moves_all, así que es reproducible.
         """
+        rng = self.rng if rng is None else rng
         valids = self.get_valid_moves(source, target)
         if not valids:
             return None
-        # Opcional: ponderar por diferencia de atributo respeto-amistad
-        weights = []
-        for m in valids:
-            # Ejemplo simple: igual probabilidad
-            weights.append(1)
-        return random.choices(valids, weights=weights, k=1)[0]
+        weights = np.clip([m.weight(self, source, target) for m in valids], 0.0, None)
+        total = weights.sum()
+        if total <= 0:
+            return None
+        return valids[rng.choice(len(valids), p=weights / total)]
 
     def execute_move(self, move: SocialMove, source: str, target: str) -> None:
         """
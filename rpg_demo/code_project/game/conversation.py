@@ -1,53 +1,267 @@
 # game/conversation.py
 
-import openai
-from game.db import load_npc_memory, save_npc_memory
+import threading
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor, Future
+from game.db import DB_FILENAME, save_npc_memory, get_store, get_writer
+from game.llm import LLMBackend, OpenAIBackend
+from game.cache import ResponseCache
+from game.prompt import PromptBuilder, LLMSummarizer
+from game.profiler import profile_scope
+
+FALLBACK_REPLY = "Lo siento, no puedo responder ahora mismo."
+
+
+def _timed_chunks(source: Iterator[str]) -> Iterator[str]:
+    """Mide en el perfilador la espera de cada trozo del stream (no lo que tarda quien lo consume)."""
+    while True:
+        with profile_scope("llm.stream"):
+            chunk = next(source, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+class DialogueRequest:
+    """
+    Petición de diálogo lanzada en segundo plano.
+    El motor la consulta cada frame con done() y recoge la respuesta con result().
+    En modo streaming, `partial` contiene el texto recibido hasta ahora.
+    """
+    def __init__(self, npc_name: str, cancel_event: threading.Event):
+        self.npc_name = npc_name
+        self.future: Future | None = None
+        self._cancel_event = cancel_event
+        self._parts: list[str] = []
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def partial(self) -> str:
+        # join sobre una copia: el hilo del pool puede estar añadiendo trozos
+        return "".join(list(self._parts)).lstrip()
+
+    def cancel(self) -> None:
+        """
+        Cancela la petición. Si aún no empezó, no llega a ejecutarse;
+        si ya está esperando a la API, su respuesta se descarta y no se guarda.
+        """
+        self._cancel_event.set()
+        self.future.cancel()
+
+    def result(self) -> str:
+        return self.future.result()
+
 
 class ConversationManager:
-    def __init__(self, api_key: str, memory_limit: int = 100):
-        openai.api_key = api_key
+    def __init__(
+        self,
+        api_key: str,
+        memory_limit: int = 100,
+        max_workers: int = 4,
+        max_inflight_per_npc: int = 1,
+        backend: LLMBackend = None,
+        cache: ResponseCache = None,
+        prompt_builder: PromptBuilder = None,
+        cache_context_lines: int = 2,
+        db_filename: str = DB_FILENAME
+    ):
+        # Por defecto OpenAI; se puede inyectar DialogueTreeBackend, HTTPBackend, etc.
+        self.backend = backend if backend is not None else OpenAIBackend(api_key)
+        # Caché de respuestas (None = desactivada). La clave incluye jugador, resumen y
+        # las últimas `cache_context_lines` líneas de memoria: el mismo contexto reciente
+        # + el mismo mensaje reutilizan la respuesta aunque la historia antigua crezca.
+        self.cache = cache
+        self.cache_context_lines = cache_context_lines
         self.memory_limit = memory_limit
+        # Presupuesto de tokens + resumen incremental; memory_limit acota los turnos literales
+        # Con el modelo por defecto el resumen lo escribe el propio LLM; los backends
+        # inyectados (árboles de diálogo, pruebas) usan el extractivo, sin llamadas extra.
+        # Con el LLM se pliega como mucho un lote por petición: una sola llamada extra
+        # antes de la respuesta, el atraso se recupera en las siguientes.
+        if prompt_builder is None:
+            llm_summary = backend is None
+            prompt_builder = PromptBuilder(
+                recent_turns=min(12, memory_limit),
+                max_folds_per_call=1 if llm_summary else 4,
+                summarizer=LLMSummarizer(self.backend) if llm_summary else None,
+                db_filename=db_filename
+            )
+        self.prompt_builder = prompt_builder
+        self.db_filename = db_filename
+        self.max_workers = max_workers
+        self.max_inflight_per_npc = max_inflight_per_npc
+        self._executor: ThreadPoolExecutor | None = None
+        self._inflight: dict[str, int] = {}
+        self._lock = threading.Lock()
 
-    def get_dialogue(
+    def submit_dialogue(
         self,
         npc_name: str,
         player_name: str,
-        player_message: str = None
-    ) -> str:
+        player_message: str = None,
+        stream: bool = False,
+        use_cache: bool = True
+    ) -> DialogueRequest | None:
         """
-        Devuelve la respuesta del NPC usando GPT-3.5-turbo,
-        basándose en la memoria histórica (por jugador y NPC).
+        Versión no bloqueante de get_dialogue: la ejecuta en un pool de hilos.
+        Con stream=True la respuesta se va acumulando en DialogueRequest.partial.
+        Devuelve None si el NPC ya tiene max_inflight_per_npc peticiones en curso.
         """
-        # 1) Cargo toda la historia
-        history = load_npc_memory(npc_name, player_name)
-        # tomo solo las últimas memory_limit entradas
-        recent = history[-self.memory_limit:]
+        with self._lock:
+            if self._inflight.get(npc_name, 0) >= self.max_inflight_per_npc:
+                return None
+            self._inflight[npc_name] = self._inflight.get(npc_name, 0) + 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="dialogue"
+                )
+        req = DialogueRequest(npc_name, threading.Event())
+        if stream:
+            req.future = self._executor.submit(
+                self._run_stream, req, player_name, player_message, use_cache
+            )
+        else:
+            req.future = self._executor.submit(
+                self.get_dialogue, npc_name, player_name, player_message,
+                req._cancel_event, use_cache
+            )
+        req.future.add_done_callback(lambda _f: self._release(npc_name))
+        return req
 
-        # 2) Preparo prompt
-        system_prompt = (
-            f"Tú eres **{npc_name}**. Recuerda estas líneas de tu memoria:\n"
-            + "\n".join(f"- {m}" for m in recent)
+    def _run_stream(self, req: DialogueRequest, player_name: str, player_message: str, use_cache: bool) -> str:
+        for chunk in self.stream_dialogue(
+            req.npc_name, player_name, player_message, req._cancel_event, use_cache
+        ):
+            req._parts.append(chunk)
+        return req.partial.strip()
+
+    def _release(self, npc_name: str) -> None:
+        with self._lock:
+            self._inflight[npc_name] -= 1
+
+    def shutdown(self) -> None:
+        """Descarta las peticiones en cola y libera el pool de hilos."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ─── Construcción del prompt ──────────────────────────────────────────────
+    def _cache_key(self, npc_name: str, player_name: str, player_message: str) -> str:
+        """
+        Clave sin construir el prompt: resumen + últimas líneas de memoria (texto,
+        no ids, así no cambia cuando el escritor vuelca la cola) + mensaje.
+        """
+        summary, upto_id = get_store(self.db_filename).load_summary(npc_name, player_name)
+        rows = get_writer(self.db_filename).load_rows(
+            npc_name, player_name, upto_id, self.cache_context_lines
         )
+        context = "\n".join([summary] + [m for _, m in rows])
+        return ResponseCache.make_key(npc_name, player_name, player_message or "", context)
+
+    def _build_messages(
+        self,
+        npc_name: str,
+        player_name: str,
+        player_message: str = None
+    ) -> tuple[list[dict], list[str]]:
+        """Devuelve (mensajes para el backend, líneas recientes usadas en el prompt)."""
+        with profile_scope("prompt.build"):
+            system_prompt, recent = self.prompt_builder.build(npc_name, player_name, player_message)
         messages = [{"role": "system", "content": system_prompt}]
         if player_message:
             messages.append({"role": "user", "content": player_message})
+        return messages, recent
 
-        # 3) Llamo a la API
+    def _remember(self, npc_name: str, player_name: str, player_message: str, reply: str) -> None:
+        # Guardo en memoria (jugador y NPC)
+        if player_message:
+            save_npc_memory(npc_name, player_name, f"Jugador: {player_message}", self.db_filename)
+        save_npc_memory(npc_name, player_name, f"{npc_name}: {reply}", self.db_filename)
+
+    def get_dialogue(
+        self,
+        npc_name: str,
+        player_name: str,
+        player_message: str = None,
+        cancel_event: threading.Event = None,
+        use_cache: bool = True
+    ) -> str:
+        """
+        Devuelve la respuesta del NPC usando el backend configurado,
+        basándose en la memoria histórica (por jugador y NPC).
+        Si cancel_event se activa durante la llamada, la respuesta no se guarda.
+        use_cache=False salta la caché de respuestas.
+        """
+        def compute() -> str:
+            # el prompt solo se construye si la caché falla
+            messages, _ = self._build_messages(npc_name, player_name, player_message)
+            with profile_scope("llm.complete"):
+                return self.backend.complete(npc_name, messages).strip()
         try:
-            resp = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=messages
-            )
-            reply = resp.choices[0].message.content.strip()
+            if self.cache is not None and use_cache:
+                key = self._cache_key(npc_name, player_name, player_message)
+                reply = self.cache.get_or_compute(key, npc_name, compute)
+            else:
+                reply = compute()
         except Exception:
-            reply = "Lo siento, no puedo responder ahora mismo."
-
-        # 4) Guardo en memoria (jugador y NPC)
-        if player_message:
-            save_npc_memory(npc_name, player_name, f"Jugador: {player_message}")
-        save_npc_memory(npc_name, player_name, f"{npc_name}: {reply}")
+            reply = FALLBACK_REPLY
 
+        if cancel_event is None or not cancel_event.is_set():
+            self._remember(npc_name, player_name, player_message, reply)
         return reply
 
+    def stream_dialogue(
+        self,
+        npc_name: str,
+        player_name: str,
+        player_message: str = None,
+        cancel_event: threading.Event = None,
+        use_cache: bool = True
+    ) -> Iterator[str]:
+        """
+        Variante de get_dialogue que va cediendo trozos de la respuesta.
+        La memoria se guarda una sola vez, cuando el stream termina;
+        si se cancela a mitad, no se guarda nada. Si falla antes del primer trozo
+        se cede FALLBACK_REPLY (como en get_dialogue); si falla a mitad, el texto
+        cortado se queda en pantalla pero no se guarda ni entra en la caché.
+        """
+        def chunks() -> Iterator[str]:
+            messages, _ = self._build_messages(npc_name, player_name, player_message)
+            return _timed_chunks(self.backend.stream(npc_name, messages))
+        source = None
+        parts = []
+        complete = False
+        try:
+            if self.cache is not None and use_cache:
+                key = self._cache_key(npc_name, player_name, player_message)
+                source = self.cache.stream_or_compute(key, npc_name, chunks)
+            else:
+                source = chunks()
+            for chunk in source:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                parts.append(chunk)
+                yield chunk
+            complete = True
+        except Exception:
+            if not parts:
+                parts.append(FALLBACK_REPLY)
+                complete = True
+                yield FALLBACK_REPLY
+        finally:
+            # cierra el stream (y libera a quien espere en la caché) si se cancela a mitad
+            if hasattr(source, "close"):
+                source.close()
+
+        if complete and (cancel_event is None or not cancel_event.is_set()):
+            self._remember(npc_name, player_name, player_message, "".join(parts).strip())
+
 # alias para compatibilidad
 ConversationManager.send_message = ConversationManager.get_dialogue
@@ -1,18 +1,46 @@
 import os
 import pygame
+from game.assets import get_assets
+from game.text import get_text_renderer
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 
 
 def safe_load_image(subpath: str, colorkey=None):
-    full_path = os.path.join(ASSETS_DIR, subpath)
-    img = pygame.image.load(full_path).convert_alpha()
-    if colorkey is not None:
-        img.set_colorkey(colorkey)
-    return img
+    # Memorizada en el AssetManager compartido
+    return get_assets().image(subpath, colorkey=colorkey)
 
 
 def load_font(name: str, size: int):
-    full_path = os.path.join(ASSETS_DIR, "fonts", name)
-    return pygame.font.Font(full_path, size)
\ No newline at end of file
+    # Fuentes de assets/fonts/, en la caché única del TextRenderer
+    return get_text_renderer().font(get_assets().path(os.path.join("fonts", name)), size)
+
+
+# Árboles de diálogo para el modo offline (DialogueTreeBackend / LLMClient)
+DIALOGUE_TREES = {
+    "Carlos": {
+        "greeting": "¡Bienvenido a la herrería! ¿Qué necesitas?",
+        "options": [
+            {"text": "¿Quién eres?", "response": "Soy Carlos, el herrero. Forjo las mejores espadas del pueblo."},
+            {"text": "¿Tienes trabajo?", "response": "Tráeme mineral de hierro de la mina y te pagaré bien."},
+            {"text": "Adiós.", "response": "Que el acero te proteja."},
+        ],
+    },
+    "Lina": {
+        "greeting": "Hola, viajero. El bosque está inquieto hoy.",
+        "options": [
+            {"text": "¿Quién eres?", "response": "Me llamo Lina. Cultivo hierbas y preparo remedios."},
+            {"text": "¿Qué pasa en el bosque?", "response": "Algo despertó en las ruinas del norte. Los animales huyen."},
+            {"text": "Adiós.", "response": "Ve con cuidado entre los árboles."},
+        ],
+    },
+    "Eldar": {
+        "greeting": "Los pergaminos hablan de tu llegada...",
+        "options": [
+            {"text": "¿Quién eres?", "response": "Soy Eldar, guardián del saber arcano de este lugar."},
+            {"text": "¿Qué dicen los pergaminos?", "response": "Que el imperio caído guarda un secreto bajo la aldea."},
+            {"text": "Adiós.", "response": "Nos volveremos a ver, está escrito."},
+        ],
+    },
+}
@@ -2,47 +2,579 @@
 
 import sqlite3
 import os
+import unicodedata
+import time
+import atexit
+import logging
+import threading
+from game.profiler import profiled
+
+log = logging.getLogger(__name__)
 
 DB_FILENAME = "npc_memory.db"
+SQLITE_MAX_ROWID = 2**63 - 1
 
-def init_db(db_filename=DB_FILENAME):
+# Sentencias preparadas: sqlite3 las guarda en la caché de cada conexión,
+# así que reutilizar el mismo texto evita recompilarlas en cada llamada.
+SQL_CREATE_MEMORIES = """
+    CREATE TABLE IF NOT EXISTS memories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player TEXT NOT NULL,
+        npc TEXT NOT NULL,
+        memory TEXT NOT NULL
+    );
+"""
+SQL_INSERT_MEMORY = "INSERT INTO memories (player, npc, memory) VALUES (?, ?, ?);"
+SQL_SELECT_MEMORY = "SELECT memory FROM memories WHERE npc = ? AND player = ? AND id <= ? ORDER BY id;"
+# Cola de la historia: recorre el índice (npc, player, id) hacia atrás y corta en N
+SQL_SELECT_TAIL = """
+    SELECT memory FROM (
+        SELECT id, memory FROM memories
+        WHERE npc = ? AND player = ? AND id <= ?
+        ORDER BY id DESC LIMIT ?
+    ) ORDER BY id;
+"""
+# Página anterior a un cursor (id exclusivo), de la más nueva a la más vieja
+SQL_SELECT_PAGE = """
+    SELECT id, memory FROM memories
+    WHERE npc = ? AND player = ? AND id < ?
+    ORDER BY id DESC LIMIT ?;
+"""
+# Filas (id, memoria) posteriores a un id: cola (más nuevas) o principio (más viejas)
+SQL_SELECT_TAIL_ROWS = """
+    SELECT id, memory FROM memories
+    WHERE npc = ? AND player = ? AND id > ? AND id <= ?
+    ORDER BY id DESC LIMIT ?;
+"""
+SQL_SELECT_ROWS_AFTER = """
+    SELECT id, memory FROM memories
+    WHERE npc = ? AND player = ? AND id > ?
+    ORDER BY id LIMIT ?;
+"""
+SQL_SELECT_SUMMARY = "SELECT summary, upto_id FROM summaries WHERE npc = ? AND player = ?;"
+# Solo avanza: un resumen nunca se sustituye por otro que cubra menos historia
+SQL_UPSERT_SUMMARY = """
+    INSERT INTO summaries (npc, player, summary, upto_id) VALUES (?, ?, ?, ?)
+    ON CONFLICT (npc, player) DO UPDATE SET
+        summary = excluded.summary, upto_id = excluded.upto_id
+    WHERE excluded.upto_id > summaries.upto_id;
+"""
+# Búsqueda por relevancia (FTS5 + bm25), filtrada a un NPC y jugador
+SQL_SEARCH_MEMORY = """
+    SELECT m.id, m.memory, bm25(memories_fts) AS score
+    FROM memories_fts JOIN memories m ON m.id = memories_fts.rowid
+    WHERE memories_fts MATCH ? AND m.npc = ? AND m.player = ?
+    ORDER BY score LIMIT ?;
+"""
+
+# Migraciones de esquema, indexadas por PRAGMA user_version.
+# Cada entrada lleva la BD de la versión i a la i+1; nunca se editan, solo se añaden.
+MIGRATIONS = [
+    SQL_CREATE_MEMORIES,
+    "CREATE INDEX IF NOT EXISTS idx_memories_npc_player_id ON memories (npc, player, id);",
+    """
+    CREATE TABLE IF NOT EXISTS response_cache (
+        key TEXT PRIMARY KEY,
+        npc TEXT NOT NULL,
+        reply TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache (last_used);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS summaries (
+        npc TEXT NOT NULL,
+        player TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        upto_id INTEGER NOT NULL,
+        PRIMARY KEY (npc, player)
+    );
+    """,
+    # Índice de texto completo sincronizado con memories mediante triggers
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+        memory,
+        content='memories', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS memories_fts_ai AFTER INSERT ON memories BEGIN
+        INSERT INTO memories_fts (rowid, memory) VALUES (new.id, new.memory);
+    END;
+    CREATE TRIGGER IF NOT EXISTS memories_fts_ad AFTER DELETE ON memories BEGIN
+        INSERT INTO memories_fts (memories_fts, rowid, memory) VALUES ('delete', old.id, old.memory);
+    END;
+    CREATE TRIGGER IF NOT EXISTS memories_fts_au AFTER UPDATE ON memories BEGIN
+        INSERT INTO memories_fts (memories_fts, rowid, memory) VALUES ('delete', old.id, old.memory);
+        INSERT INTO memories_fts (rowid, memory) VALUES (new.id, new.memory);
+    END;
+    INSERT INTO memories_fts (memories_fts) VALUES ('rebuild');
+    """,
+]
+
+
+# Palabras demasiado frecuentes para aportar relevancia (ya sin tildes)
+STOPWORDS = frozenset(
+    "que del las los una uno unos unas por para con sin como pero mas este esta "
+    "estos estas eso esto esa ese hay muy tus sus mis nos les the and you "
+    "cual quien donde cuando porque tiene tienes tengo eres soy esta estas".split()
+)
+
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def build_match_query(text: str, min_len: int = 3) -> str | None:
+    """
+    Consulta MATCH de FTS5: cualquier palabra de `text` (OR).
+    El filtro por NPC/jugador lo hace el JOIN con memories, que es más barato
+    que intersectar en el índice términos tan frecuentes como el nombre del NPC.
+    None si el texto no tiene palabras útiles.
+    """
+    words = []
+    for raw in unicodedata.normalize("NFKD", text.lower()).split():
+        word = "".join(c for c in raw if c.isalnum())
+        if len(word) >= min_len and word not in STOPWORDS and word not in words:
+            words.append(word)
+    if not words:
+        return None
+    return " OR ".join(_fts_phrase(w) for w in words)
+
+
+def _resolve_path(db_filename: str) -> str:
+    if db_filename in ("", ":memory:"):
+        # cada hilo (y el escritor) abre su propia conexión: con ":memory:" o "" cada
+        # una sería una BD vacía distinta y las escrituras se perderían
+        raise ValueError("MemoryStore necesita un fichero; para pruebas usa una ruta temporal")
+    if os.path.isabs(db_filename):
+        return db_filename
     project_root = os.path.dirname(os.path.dirname(__file__))
-    db_path = os.path.join(project_root, db_filename)
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS memories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            player TEXT NOT NULL,
-            npc TEXT NOT NULL,
-            memory TEXT NOT NULL
-        );
-    """)
-    conn.commit()
-    conn.close()
+    return os.path.join(project_root, db_filename)
+
+
+class MemoryStore:
+    """
+    Almacén de memorias de NPC sobre SQLite.
+    Mantiene una conexión larga por hilo (pool thread-local) en modo WAL,
+    en vez de abrir y cerrar una conexión en cada lectura o escritura.
+    """
+    def __init__(self, db_filename: str = DB_FILENAME, cache_size_kb: int = 8192):
+        self.path = _resolve_path(db_filename)
+        self.cache_size_kb = cache_size_kb
+        self._local = threading.local()
+        self._conns: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        # WAL: lectores y escritor no se bloquean; NORMAL solo hace fsync en checkpoints
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)};")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        with self._lock:
+            self._conns.append(conn)
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (se crea la primera vez que se pide)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def init_schema(self) -> None:
+        """Aplica las migraciones pendientes según PRAGMA user_version."""
+        conn = self.conn
+        version = conn.execute("PRAGMA user_version;").fetchone()[0]
+        if version == 0:
+            self._upgrade_legacy(conn)
+        for i, sql in enumerate(MIGRATIONS[version:], start=version):
+            # cada paso y su número de versión se aplican en la misma transacción
+            try:
+                conn.executescript(f"BEGIN; {sql} PRAGMA user_version={i + 1}; COMMIT;")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+    @staticmethod
+    def _upgrade_legacy(conn: sqlite3.Connection) -> None:
+        # Las primeras versiones creaban `memories` sin la columna `player`
+        cols = [row[1] for row in conn.execute("PRAGMA table_info(memories);")]
+        if cols and "player" not in cols:
+            with conn:
+                conn.execute("ALTER TABLE memories ADD COLUMN player TEXT NOT NULL DEFAULT '';")
+
+    def save(self, npc_name: str, player_name: str, memory: str) -> None:
+        with self.conn:
+            self.conn.execute(SQL_INSERT_MEMORY, (player_name, npc_name, memory))
+
+    @profiled("db.write")
+    def save_many(self, rows: list[tuple[str, str, str]]) -> None:
+        """Inserta varias memorias (npc, jugador, texto) en una sola transacción."""
+        with self.conn:
+            self.conn.executemany(
+                SQL_INSERT_MEMORY,
+                ((player, npc, memory) for npc, player, memory in rows)
+            )
+
+    @profiled("db.load")
+    def load(
+        self,
+        npc_name: str,
+        player_name: str,
+        limit: int | None = None,
+        upto_id: int = SQLITE_MAX_ROWID
+    ) -> list[str]:
+        """
+        Devuelve las últimas `limit` memorias en orden cronológico
+        (o toda la historia si limit es None), sin pasar de `upto_id`.
+        """
+        if limit is None:
+            cur = self.conn.execute(SQL_SELECT_MEMORY, (npc_name, player_name, upto_id))
+        else:
+            cur = self.conn.execute(
+                SQL_SELECT_TAIL, (npc_name, player_name, upto_id, int(limit))
+            )
+        return [row[0] for row in cur.fetchall()]
+
+    def max_id(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM memories;").fetchone()[0]
+
+    def load_page(
+        self,
+        npc_name: str,
+        player_name: str,
+        before_id: int | None = None,
+        page_size: int = 50
+    ) -> tuple[list[tuple[int, str]], int | None]:
+        """
+        Página de memorias anteriores a `before_id` (None = desde la más reciente).
+        Devuelve (filas (id, memoria) de nueva a vieja, cursor para la siguiente
+        página o None si ya no quedan).
+        """
+        cursor = before_id if before_id is not None else SQLITE_MAX_ROWID
+        rows = self.conn.execute(
+            SQL_SELECT_PAGE, (npc_name, player_name, cursor, int(page_size))
+        ).fetchall()
+        next_cursor = rows[-1][0] if len(rows) == page_size else None
+        return rows, next_cursor
+
+    def load_tail_rows(
+        self,
+        npc_name: str,
+        player_name: str,
+        after_id: int = 0,
+        limit: int = 50,
+        upto_id: int = SQLITE_MAX_ROWID
+    ) -> list[tuple[int, str]]:
+        """Últimas `limit` filas (id, memoria) con after_id < id <= upto_id, en orden cronológico."""
+        rows = self.conn.execute(
+            SQL_SELECT_TAIL_ROWS, (npc_name, player_name, after_id, upto_id, int(limit))
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    @profiled("db.load")
+    def load_rows_after(self, npc_name: str, player_name: str, after_id: int, limit: int) -> list[tuple[int, str]]:
+        """Primeras `limit` filas (id, memoria) con id > after_id, en orden cronológico."""
+        return self.conn.execute(
+            SQL_SELECT_ROWS_AFTER, (npc_name, player_name, after_id, int(limit))
+        ).fetchall()
+
+    def load_summary(self, npc_name: str, player_name: str) -> tuple[str, int]:
+        """Resumen acumulado y id de la última memoria que cubre ("", 0 si no hay)."""
+        row = self.conn.execute(SQL_SELECT_SUMMARY, (npc_name, player_name)).fetchone()
+        return (row[0], row[1]) if row else ("", 0)
+
+    def save_summary(self, npc_name: str, player_name: str, summary: str, upto_id: int) -> None:
+        with self.conn:
+            self.conn.execute(SQL_UPSERT_SUMMARY, (npc_name, player_name, summary, upto_id))
+
+    @profiled("db.search")
+    def search(self, npc_name: str, player_name: str, text: str, k: int = 5) -> list[tuple[int, str, float]]:
+        """
+        Las k memorias más relevantes para `text` (bm25), como (id, memoria, score);
+        score más bajo = más relevante.
+        """
+        query = build_match_query(text)
+        if query is None:
+            return []
+        return self.conn.execute(
+            SQL_SEARCH_MEMORY, (query, npc_name, player_name, int(k))
+        ).fetchall()
+
+    def iter_history(self, npc_name: str, player_name: str, page_size: int = 50):
+        """Recorre toda la historia hacia atrás, página a página."""
+        cursor = None
+        while True:
+            rows, cursor = self.load_page(npc_name, player_name, cursor, page_size)
+            yield from rows
+            if cursor is None:
+                return
+
+    def close(self) -> None:
+        """Cierra todas las conexiones abiertas por cualquier hilo."""
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+
+class MemoryWriter:
+    """
+    Buffer write-behind sobre un MemoryStore.
+    save() solo encola la fila; un hilo escritor, dueño de su propia conexión,
+    las vuelca con un único executemany cuando se llega a `batch_size` filas,
+    cuando la más antigua supera `flush_interval` segundos o al llamar a flush().
+    load() combina lo ya escrito con lo que sigue en cola.
+    Si un volcado falla (p. ej. "database is locked"), el lote vuelve a la
+    cola y se reintenta cada `retry_interval` s; el error queda en `error` y
+    flush() lo relanza. Al cerrar se reintenta `close_retries` veces antes
+    de descartar lo pendiente (con un aviso en el log).
+    """
+    def __init__(
+        self,
+        store: MemoryStore,
+        batch_size: int = 64,
+        flush_interval: float = 0.5,
+        retry_interval: float = 1.0,
+        close_retries: int = 3
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.close_retries = close_retries
+        self.error: Exception | None = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._cond = threading.Condition()
+        self._pending: list[tuple[str, str, str]] = []
+        self._inflight: list[tuple[str, str, str]] = []
+        self._oldest = 0.0
+        self._flush_requested = False
+        self._stopping = False
+        # Último id que los lectores pueden pedir a la BD: todo lo posterior
+        # sigue en _pending/_inflight, así nunca se ve una fila dos veces.
+        self._committed_id = store.max_id()
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, npc_name: str, player_name: str, memory: str) -> None:
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("MemoryWriter cerrado")
+            self._check_alive()
+            if not self._pending:
+                # primera fila del lote: el escritor arranca su temporizador
+                self._oldest = time.monotonic()
+                self._cond.notify_all()
+            self._pending.append((npc_name, player_name, memory))
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def load(self, npc_name: str, player_name: str, limit: int | None = None) -> list[str]:
+        with self._cond:
+            upto_id = self._committed_id
+            queued = [
+                m for npc, player, m in self._inflight + self._pending
+                if npc == npc_name and player == player_name
+            ]
+        rows = self.store.load(npc_name, player_name, limit, upto_id) + queued
+        return rows if limit is None else rows[-limit:] if limit else []
+
+    def load_rows(
+        self,
+        npc_name: str,
+        player_name: str,
+        after_id: int = 0,
+        limit: int = 50
+    ) -> list[tuple[int | None, str]]:
+        """
+        Como load(), pero con ids y solo posteriores a after_id.
+        Las filas aún en cola no tienen id todavía (None).
+        """
+        with self._cond:
+            upto_id = self._committed_id
+            queued = [
+                (None, m) for npc, player, m in self._inflight + self._pending
+                if npc == npc_name and player == player_name
+            ]
+        rows = self.store.load_tail_rows(npc_name, player_name, after_id, limit, upto_id) + queued
+        return rows[-limit:] if limit else []
+
+    def _check_alive(self) -> None:
+        if not self._thread.is_alive():
+            raise RuntimeError("El hilo escritor de memorias se detuvo") from self.error
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Fuerza el volcado y espera a que la cola quede vacía.
+        Devuelve False si vence `timeout`; si el volcado falla, relanza el error.
+        """
+        with self._cond:
+            self._check_alive()
+            failures = self._failures
+            self._flush_requested = True
+            self._cond.notify_all()
+            done = self._cond.wait_for(
+                lambda: (not self._pending and not self._inflight)
+                or self._failures > failures or not self._thread.is_alive(),
+                timeout
+            )
+            if not self._pending and not self._inflight:
+                return True
+            if self._failures > failures:
+                raise self.error
+            self._check_alive()
+            return done
+
+    def close(self) -> None:
+        """Vacía la cola y detiene el hilo escritor."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        now = time.monotonic()
+        if self._flush_requested:
+            return True
+        if now < self._retry_at:
+            return False
+        return (
+            self._stopping
+            or len(self._pending) >= self.batch_size
+            or now - self._oldest >= self.flush_interval
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._due():
+                    if self._stopping and not self._pending:
+                        self._cond.notify_all()
+                        return
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                    timeout = None
+                    if self._pending:
+                        due_at = max(self._oldest + self.flush_interval, self._retry_at)
+                        timeout = max(0.0, due_at - time.monotonic())
+                    self._cond.wait(timeout)
+                self._flush_requested = False
+                self._inflight, self._pending = self._pending, []
+                batch = self._inflight
+
+            try:
+                self.store.save_many(batch)
+                last_id = self.store.conn.execute("SELECT last_insert_rowid();").fetchone()[0]
+            except Exception as exc:
+                if self._failed(batch, exc):
+                    return
+                continue
+
+            with self._cond:
+                self._committed_id = last_id
+                self._inflight = []
+                self.error = None
+                self._failures = 0
+                self._retry_at = 0.0
+                self._cond.notify_all()
+
+    def _failed(self, batch: list[tuple[str, str, str]], exc: Exception) -> bool:
+        """Devuelve el lote a la cola; True si el hilo debe terminar (cierre sin éxito)."""
+        with self._cond:
+            self.error = exc
+            self._failures += 1
+            self._inflight = []
+            if self._stopping and self._failures >= self.close_retries:
+                log.error("No se pudieron guardar %d memorias al cerrar: %s", len(batch) + len(self._pending), exc)
+                self._pending = []
+                self._cond.notify_all()
+                return True
+            log.warning("Fallo al guardar %d memorias (reintento en %.1f s): %s", len(batch), self.retry_interval, exc)
+            self._pending = batch + self._pending
+            self._retry_at = time.monotonic() + self.retry_interval
+            self._cond.notify_all()
+            return False
+
+
+_stores: dict[str, MemoryStore] = {}
+_writers: dict[str, MemoryWriter] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_filename: str = DB_FILENAME) -> MemoryStore:
+    """Devuelve el MemoryStore compartido para ese fichero de BD."""
+    path = _resolve_path(db_filename)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = MemoryStore(path)
+            _stores[path] = store
+        return store
+
+
+def get_writer(db_filename: str = DB_FILENAME) -> MemoryWriter:
+    """Devuelve el MemoryWriter compartido para ese fichero de BD."""
+    store = get_store(db_filename)
+    with _stores_lock:
+        writer = _writers.get(store.path)
+        if writer is None:
+            writer = MemoryWriter(store)
+            _writers[store.path] = writer
+        return writer
+
+
+def flush_all() -> None:
+    with _stores_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush()
+
+
+def close_all() -> None:
+    """Vuelca las colas pendientes y cierra todas las conexiones."""
+    with _stores_lock:
+        writers = list(_writers.values())
+        stores = list(_stores.values())
+        _writers.clear()
+        _stores.clear()
+    for writer in writers:
+        writer.close()
+    for store in stores:
+        store.close()
+
+
+atexit.register(close_all)
+
+
+def init_db(db_filename=DB_FILENAME):
+    get_store(db_filename).init_schema()
 
 def save_npc_memory(npc_name: str, player_name: str, memory: str, db_filename=DB_FILENAME):
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    db_path = os.path.join(project_root, db_filename)
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO memories (player, npc, memory) VALUES (?, ?, ?);",
-        (player_name, npc_name, memory)
-    )
-    conn.commit()
-    conn.close()
+    # se encola; el hilo escritor lo persiste en lote
+    get_writer(db_filename).save(npc_name, player_name, memory)
 
 def load_npc_memory(npc_name: str, player_name: str, limit: int = 1000, db_filename=DB_FILENAME):
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    db_path = os.path.join(project_root, db_filename)
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute(
-        "SELECT memory FROM memories WHERE npc = ? AND player = ? ORDER BY id;",
-        (npc_name, player_name)
-    )
-    rows = c.fetchall()
-    conn.close()
-    # devuelve toda la historia cronológica
-    return [row[0] for row in rows]
+    # devuelve las últimas `limit` líneas en orden cronológico (incluye las aún en cola)
+    return get_writer(db_filename).load(npc_name, player_name, limit)
+
+def search_npc_memory(npc_name: str, player_name: str, text: str, k: int = 5, db_filename=DB_FILENAME):
+    # solo ve filas ya persistidas; las de la cola forman parte de la ventana reciente
+    return get_store(db_filename).search(npc_name, player_name, text, k)
+
+def page_npc_memory(npc_name: str, player_name: str, before_id: int = None, page_size: int = 50, db_filename=DB_FILENAME):
+    # la paginación trabaja sobre ids ya persistidos (sin esperar más de 2 s a la cola)
+    get_writer(db_filename).flush(timeout=2.0)
+    return get_store(db_filename).load_page(npc_name, player_name, before_id, page_size)
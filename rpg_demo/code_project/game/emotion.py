@@ -1,7 +1,52 @@
 # game/emotion.py
 
-import random
-from typing import Dict, List
+from collections.abc import Mapping
+from typing import Dict, List, Iterator
+import numpy as np
+
+EMOTIONS = ['alegria', 'ira', 'miedo']
+
+# Efectos de eventos de entorno: la primera regla cuyas palabras aparezcan
+# en el nombre del evento decide el cambio (como la antigua cadena de if/elif).
+EVENT_RULES = [
+    # Aumenta el miedo ante mal tiempo
+    (('tormenta', 'lluvia'), {'miedo': 0.3}),
+    # Niebla reduce visibilidad: un poco de miedo
+    (('niebla',), {'miedo': 0.2}),
+    # Festival genera alegría
+    (('festival',), {'alegria': 0.4}),
+    # Otros eventos pueden añadirse aquí
+]
+
+# Efectos de acciones sociales sobre quien las recibe
+SOCIAL_RULES = {
+    'ayudar':   {'alegria': 0.3},
+    'insultar': {'ira': 0.4, 'miedo': 0.1},
+    'chismear': {'ira': 0.2},
+    'elogiar':  {'alegria': 0.2},
+    # Puedes extender con más movimientos sociales
+}
+
+# Semivida (segundos) de cada emoción al decaer hacia 0
+HALF_LIFE = {'alegria': 60.0, 'ira': 45.0, 'miedo': 30.0}
+
+
+class _EmotionView(Mapping):
+    """Vista de solo lectura {actor: {emoción: nivel}} sobre la tabla del motor."""
+    def __init__(self, engine: 'EmotionEngine'):
+        self._engine = engine
+
+    def __getitem__(self, actor: str) -> Dict[str, float]:
+        if actor not in self._engine.index:
+            raise KeyError(actor)
+        return self._engine.get_emotions(actor)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._engine.names)
+
+    def __len__(self) -> int:
+        return len(self._engine.names)
+
 
 class EmotionEngine:
     """
@@ -9,59 +54,121 @@ class EmotionEngine:
     Mantiene niveles de emociones primarias y aplica efectos según
     eventos de entorno y movimientos sociales.
     Emociones: alegría, ira, miedo.
+    Los niveles viven en una tabla NumPy (actores × emociones), así los eventos
+    globales y el decaimiento se aplican a todos los actores en una operación.
     """
-    def __init__(self, actors: List[str]):
+    def __init__(self, actors: List[str], half_life: Dict[str, float] = None):
+        self.emotion_names = list(EMOTIONS)
+        self.emotion_index = {e: i for i, e in enumerate(self.emotion_names)}
+        self.names: List[str] = list(dict.fromkeys(actors))
+        self.index: Dict[str, int] = {a: i for i, a in enumerate(self.names)}
         # Inicializa emociones en cero para cada actor
-        self.emotions: Dict[str, Dict[str, float]] = {
-            actor: {'alegria': 0.0, 'ira': 0.0, 'miedo': 0.0}
-            for actor in actors
+        self.table = np.zeros((len(self.names), len(self.emotion_names)), dtype=np.float32)
+        hl = dict(HALF_LIFE, **(half_life or {}))
+        # tasa de decaimiento por emoción: nivel *= exp(-rate * dt)
+        self.decay_rates = np.array(
+            [np.log(2.0) / hl[e] if hl.get(e) else 0.0 for e in self.emotion_names],
+            dtype=np.float32
+        )
+        self._event_cache: Dict[str, np.ndarray | None] = {}
+        self._social_deltas = {
+            move: self._delta_vector(effects) for move, effects in SOCIAL_RULES.items()
         }
 
+    @property
+    def emotions(self) -> Mapping:
+        return _EmotionView(self)
+
+    def add_actor(self, actor: str) -> int:
+        if actor in self.index:
+            return self.index[actor]
+        self.table = np.vstack([self.table, np.zeros((1, self.table.shape[1]), dtype=np.float32)])
+        self.names.append(actor)
+        self.index[actor] = len(self.names) - 1
+        return self.index[actor]
+
+    def _delta_vector(self, effects: Dict[str, float]) -> np.ndarray:
+        vec = np.zeros(len(self.emotion_names), dtype=np.float32)
+        for emotion, amount in effects.items():
+            vec[self.emotion_index[emotion]] = amount
+        return vec
+
+    def event_delta(self, event: str) -> np.ndarray | None:
+        """Vector de cambio emocional de un evento (precompilado y cacheado por nombre)."""
+        e = event.lower()
+        if e not in self._event_cache:
+            delta = None
+            for keywords, effects in EVENT_RULES:
+                if any(k in e for k in keywords):
+                    delta = self._delta_vector(effects)
+                    break
+            self._event_cache[e] = delta
+        return self._event_cache[e]
+
+    def _apply_row(self, row: int, delta: np.ndarray) -> None:
+        vals = self.table[row]
+        vals += delta
+        # Clamp entre 0.0 y 1.0
+        np.clip(vals, 0.0, 1.0, out=vals)
+
     def adjust(self, actor: str, emotion: str, amount: float):
         """Ajusta la emoción de un actor en la cantidad dada, con límites [0,1]."""
-        if actor not in self.emotions or emotion not in self.emotions[actor]:
+        row = self.index.get(actor)
+        col = self.emotion_index.get(emotion)
+        if row is None or col is None:
             return
-        val = self.emotions[actor][emotion] + amount
-        # Clamp entre 0.0 y 1.0
-        self.emotions[actor][emotion] = max(0.0, min(1.0, val))
+        self.table[row, col] = max(0.0, min(1.0, self.table[row, col] + amount))
 
     def handle_event(self, actor: str, event: str) -> None:
         """
         Mapea eventos de entorno a cambios emocionales de cada actor.
         Se llama desde EventManager cuando ocurre un evento global.
         """
-        e = event.lower()
-        if 'tormenta' in e or 'lluvia' in e:
-            # Aumenta el miedo ante mal tiempo
-            self.adjust(actor, 'miedo', 0.3)
-        elif 'niebla' in e:
-            # Niebla reduce visibilidad: un poco de miedo
-            self.adjust(actor, 'miedo', 0.2)
-        elif 'festival' in e:
-            # Festival genera alegría
-            self.adjust(actor, 'alegria', 0.4)
-        # Otros eventos pueden añadirse aquí
+        row = self.index.get(actor)
+        delta = self.event_delta(event)
+        if row is not None and delta is not None:
+            self._apply_row(row, delta)
+
+    def apply_event_to_all(self, event: str, actors: np.ndarray = None) -> None:
+        """
+        Aplica un evento global a todos los actores (o a los índices `actors`)
+        en una sola operación vectorizada.
+        """
+        delta = self.event_delta(event)
+        if delta is None:
+            return
+        if actors is None:
+            self.table += delta
+            np.clip(self.table, 0.0, 1.0, out=self.table)
+        else:
+            self.table[actors] = np.clip(self.table[actors] + delta, 0.0, 1.0)
+
+    def decay(self, dt: float) -> None:
+        """Hace decaer todas las emociones hacia 0 según su semivida."""
+        if dt <= 0:
+            return
+        self.table *= np.exp(-self.decay_rates * dt)
 
     def handle_social_move(self, actor: str, move_name: str) -> None:
         """
         Ajusta emociones según acciones sociales (interacciones NPC-NPC o NPC-jugador).
         """
-        m = move_name.lower()
-        if m == 'ayudar':
-            self.adjust(actor, 'alegria', 0.3)
-        elif m == 'insultar':
-            self.adjust(actor, 'ira', 0.4)
-            self.adjust(actor, 'miedo', 0.1)
-        elif m == 'chismear':
-            self.adjust(actor, 'ira', 0.2)
-        elif m == 'elogiar':
-            self.adjust(actor, 'alegria', 0.2)
-        # Puedes extender con más movimientos sociales
+        row = self.index.get(actor)
+        delta = self._social_deltas.get(move_name.lower())
+        if row is not None and delta is not None:
+            self._apply_row(row, delta)
 
     def get(self, actor: str, emotion: str) -> float:
         """Devuelve el nivel actual de la emoción para un actor."""
-        return self.emotions.get(actor, {}).get(emotion, 0.0)
+        row = self.index.get(actor)
+        col = self.emotion_index.get(emotion)
+        if row is None or col is None:
+            return 0.0
+        return float(self.table[row, col])
 
     def get_emotions(self, actor: str) -> Dict[str, float]:
         """Devuelve todas las emociones actuales de un actor."""
-        return dict(self.emotions.get(actor, {}))
+        row = self.index.get(actor)
+        if row is None:
+            return {}
+        return dict(zip(self.emotion_names, self.table[row].tolist()))
@@ -1,11 +1,27 @@
 import os
+import time
+import logging
+import numpy as np
 import pygame
-import pygame_menu
 from pygame.math import Vector2
-from game.db import init_db, save_npc_memory, load_npc_memory
+# pygame_menu, la conversación (openai) y el mapa por tiles se importan al
+# construir la escena que los usa: el menú principal aparece antes
+from game.db import init_db, save_npc_memory, load_npc_memory, close_all
 from game.emotion import EmotionEngine
 from game.events import EventManager
-from game.conversation import ConversationManager
+from game.spatial import SpatialHash
+from game.walkgrid import WalkGrid
+from game.ai import NPCCrowd
+from game.text import get_text_renderer, wrap
+from game.render import DirtyRenderer, Drawable
+from game.assets import get_assets
+from game.profiler import get_profiler, ProfilerOverlay
+from game.timestep import FixedTimestep, lerp
+
+log = logging.getLogger(__name__)
+
+# Tiles del pueblo que no se pueden pisar: árboles, rocas, agua y edificios
+SOLID_TILES = frozenset({57, 58, 66, 70, 71, 75, 76, 77, 78, 79})
 
 class GameEngine:
     # Estados del juego
@@ -13,41 +29,80 @@ class GameEngine:
         "MENU", "WHOAMI", "NAME_INPUT", "CHAR_SELECT", "LORE", "PLAYING", "CHAT"
     )
 
-    def __init__(self, openai_api_key: str):
+    MENU_STATES = (MENU, WHOAMI, NAME_INPUT, CHAR_SELECT, LORE)
+
+    PLAYER_SPEED = 200  # px/s
+
+    def __init__(
+        self,
+        openai_api_key: str,
+        dirty_rects: bool = False,
+        idle_wait_ms: int = 250,
+        sim_hz: float = 60.0,
+        max_sim_steps: int = 5,
+        max_fps: int = 120,
+        save_path: str = None,
+        autosave_every: float = 10.0
+    ):
         pygame.init()
-        init_db()
         pygame.display.set_caption("Mini RPG Narrativo")
         self.W, self.H = 720, 480
         self.screen = pygame.display.set_mode((self.W, self.H))
+        # Modo opcional de rectángulos sucios: repinta solo lo que cambia y
+        # omite el frame (y espera al siguiente evento) si no cambia nada
+        self.dirty = DirtyRenderer(self.screen) if dirty_rects else None
+        self.idle_wait_ms = idle_wait_ms
+        self._drawn_state = None
+        self._drawn_camera = None
+        # Simulación a paso fijo (sim_hz) desacoplada del render (max_fps, 0 = sin límite):
+        # en máquinas lentas se puede bajar sim_hz sin que cambie la velocidad del juego
+        self.timestep = FixedTimestep(sim_hz, max_sim_steps)
+        self.max_fps = max_fps
 
         # Directorio base y assets
         base = os.path.dirname(os.path.dirname(__file__))
-        assets = os.path.join(base, "assets")
+        self.assets_dir = os.path.join(base, "assets")
+
+        self.assets = get_assets()
 
-        # Fondo de menú
-        menu_bg_path = os.path.join(assets, "menu", "background.png")
-        raw_menu_bg = pygame.image.load(menu_bg_path).convert()
-        self.menu_bg = pygame.transform.scale(raw_menu_bg, (self.W, self.H))
+        # Fondo de menú (el del mapa se precarga tras el primer frame, ver _after_first_frame)
+        self.menu_bg = self.assets.scaled("menu/background.png", (self.W, self.H))
 
-        # Fondo de mapa para PLAYING
-        map_bg_path = os.path.join(assets, "maps", "fondo_pueblo.png")
-        raw_map_bg = pygame.image.load(map_bg_path).convert()
-        self.map_bg = pygame.transform.scale(raw_map_bg, (self.W, self.H))
+        # Mundo (BD, mapa por tiles, cámara): se construye al entrar en PLAYING (_build_world)
+        self.world_ready = False
+        self.tilemap = None
+        self.camera = None
+        self.npc_crowd = None  # NPCCrowd: patrulla de todos los NPC en un paso vectorizado
+        # Partida guardada (opcional): instantánea + deltas, autoguardado en segundo plano
+        self.save_path = save_path
+        self.autosave_every = autosave_every
+        self.saver = None
+        self._autosave_left = autosave_every
 
         # Fuentes
-        fonts_dir = os.path.join(assets, "fonts")
-        font_path = os.path.join(fonts_dir, "CinzelDecorative-Regular.ttf")
-        self.font_text  = pygame.font.Font(font_path, 24)
-        self.font_small = pygame.font.Font(font_path, 20)
+        fonts_dir = os.path.join(self.assets_dir, "fonts")
+        self.font_path = font_path = os.path.join(fonts_dir, "CinzelDecorative-Regular.ttf")
+        self.text = get_text_renderer()
+        self.font_text  = self.text.font(font_path, 24)
+        self.font_small = self.text.font(font_path, 20)
+        # Caracteres por línea del chat (ancho medio de la fuente), para wrap()
+        sample = "abcdefghijklmnopqrstuvwxyz "
+        self.chat_wrap = max(20, (self.W - 40) * len(sample) // self.font_text.size(sample)[0])
+
+        # Perfilador por subsistemas: F3 muestra el overlay (RPG_PROFILE=1 lo deja siempre activo)
+        self.profiler = get_profiler()
+        self.profiler_overlay = ProfilerOverlay(self.profiler, self.font_small)
 
         # Jugador y chat
         self.openai_api_key = openai_api_key
         self.player_name = ""
         self.player_class = ""
         self.player_pos = Vector2(self.W/2, self.H/2)
+        self.player_prev = Vector2(self.player_pos)  # estado del paso anterior, para interpolar
         self.chat_history = []
         self.chat_input = ""
         self.current_npc = None
+        self.pending_reply = None  # DialogueRequest en curso (no bloquea el bucle)
 
         # NPCs
         self.npcs = [
@@ -55,68 +110,178 @@ class GameEngine:
             {"name": "Lina",   "pos": Vector2(400, 300)},
             {"name": "Eldar",  "pos": Vector2(600, 250)},
         ]
+        for npc in self.npcs:
+            npc["prev"] = Vector2(npc["pos"])
         names = [n["name"] for n in self.npcs]
+        # Índice espacial de NPCs (actualizar con npc_index.move si se desplazan)
+        self.npc_index = SpatialHash(cell_size=64)
+        for npc in self.npcs:
+            self.npc_index.insert(npc["name"], npc["pos"].x, npc["pos"].y)
 
         # Motores
         self.emotion_manager = EmotionEngine(names)
         self.event_manager   = EventManager([], self.emotion_manager, save_npc_memory, self._on_event)
-        self.conv_manager    = ConversationManager(names, self.openai_api_key)
+        self._conv_manager   = None  # se crea con el primer chat (importa openai)
 
         # Estado inicial
         self.state = self.MENU
 
-        # Tema de pygame_menu
-        theme = pygame_menu.themes.Theme(
-            background_color=(0,0,0,0), title=False,
-            widget_font=font_path, widget_font_size=32,
-            widget_font_color=(255,255,255),
-            widget_selection_effect=pygame_menu.widgets.LeftArrowSelection(),
-            widget_alignment=pygame_menu.locals.ALIGN_CENTER,
-            widget_margin=(10,10), widget_background_color=(0,0,0,160)
-        )
-
-        # Menú principal
-        self.main_menu = pygame_menu.Menu(width=self.W, height=self.H, theme=theme, title='')
-        self.main_menu.add.button('JUGAR',        self._set_state, self.NAME_INPUT)
-        self.main_menu.add.button('¿QUIÉN SOY?',  self._set_state, self.WHOAMI)
-        self.main_menu.add.button('SALIR',        pygame_menu.events.EXIT)
+        # Escenas de pygame_menu: cada una se construye la primera vez que se muestra
+        self._theme = None
+        self._menus = {}
+        self._menu_builders = {
+            self.MENU:        self._build_main_menu,
+            self.NAME_INPUT:  self._build_name_menu,
+            self.CHAR_SELECT: self._build_char_menu,
+            self.LORE:        self._build_lore_menu,
+            self.WHOAMI:      self._build_whoami_menu,
+        }
+        self.frames = 0
+        self.first_frame_at = None  # perf_counter() al presentar el primer frame
+
+    def _on_event(self, event):
+        pass
+
+    # ─── Construcción diferida de escenas ────────────────────────────────────
+    @property
+    def conv_manager(self):
+        if self._conv_manager is None:
+            from game.conversation import ConversationManager
+            from game.cache import ResponseCache
+            self._conv_manager = ConversationManager(self.openai_api_key, cache=ResponseCache())
+        return self._conv_manager
 
+    def _menu(self, state):
+        menu = self._menus.get(state)
+        if menu is None:
+            with self.profiler.scope("startup.scene"):
+                menu = self._menus[state] = self._menu_builders[state]()
+        return menu
+
+    def _new_menu(self):
+        import pygame_menu
+        if self._theme is None:
+            self._theme = pygame_menu.themes.Theme(
+                background_color=(0,0,0,0), title=False,
+                widget_font=self.font_path, widget_font_size=32,
+                widget_font_color=(255,255,255),
+                widget_selection_effect=pygame_menu.widgets.LeftArrowSelection(),
+                widget_alignment=pygame_menu.locals.ALIGN_CENTER,
+                widget_margin=(10,10), widget_background_color=(0,0,0,160)
+            )
+        return pygame_menu, pygame_menu.Menu(width=self.W, height=self.H, theme=self._theme, title='')
+
+    def _build_main_menu(self):
+        pygame_menu, menu = self._new_menu()
+        menu.add.button('JUGAR',        self._set_state, self.NAME_INPUT)
+        menu.add.button('¿QUIÉN SOY?',  self._set_state, self.WHOAMI)
+        menu.add.button('SALIR',        pygame_menu.events.EXIT)
+        return menu
+
+    def _build_name_menu(self):
         # Ingreso de nombre
-        self.name_menu = pygame_menu.Menu(width=self.W, height=self.H, theme=theme, title='')
-        self.name_menu.add.text_input('Nombre: ', textinput_id='player_name', default='', input_underline='_')
-        self.name_menu.add.button('Aceptar', self._accept_name)
-        self.name_menu.add.button('Volver',  self._set_state, self.MENU)
+        _, menu = self._new_menu()
+        menu.add.text_input('Nombre: ', textinput_id='player_name', default='', input_underline='_')
+        menu.add.button('Aceptar', self._accept_name)
+        menu.add.button('Volver',  self._set_state, self.MENU)
+        return menu
 
+    def _build_char_menu(self):
         # Selección de clase
-        self.char_menu = pygame_menu.Menu(width=self.W, height=self.H, theme=theme, title='')
+        _, menu = self._new_menu()
         for cls in ('Guerrero','Mago','Pícaro'):
-            self.char_menu.add.button(cls, self._accept_class, cls)
-        self.char_menu.add.button('Volver', self._set_state, self.NAME_INPUT)
+            menu.add.button(cls, self._accept_class, cls)
+        menu.add.button('Volver', self._set_state, self.NAME_INPUT)
+        return menu
 
+    def _build_lore_menu(self):
         # Prólogo
-        self.lore_menu = pygame_menu.Menu(width=self.W, height=self.H, theme=theme, title='')
+        pygame_menu, menu = self._new_menu()
         story = [
             "Hace siglos, un gran imperio cayó en ruinas.",
             "Solo valientes aventureros exploran sus secretos."
         ]
         for line in story:
-            self.lore_menu.add.label(line, align=pygame_menu.locals.ALIGN_CENTER, font_size=24)
-        self.lore_menu.add.button('Continuar', self._start_adventure)
+            menu.add.label(line, align=pygame_menu.locals.ALIGN_CENTER, font_size=24)
+        menu.add.button('Continuar', self._start_adventure)
+        return menu
 
+    def _build_whoami_menu(self):
         # Quién soy
-        self.whoami_menu = pygame_menu.Menu(width=self.W, height=self.H, theme=theme, title='')
-        self.whoami_menu.add.label(lambda: f"Jugador: {self.player_name}", align=pygame_menu.locals.ALIGN_CENTER, font_size=24)
-        self.whoami_menu.add.button('Volver', self._set_state, self.MENU)
+        pygame_menu, menu = self._new_menu()
+        menu.add.label(lambda: f"Jugador: {self.player_name}", align=pygame_menu.locals.ALIGN_CENTER, font_size=24)
+        menu.add.button('Volver', self._set_state, self.MENU)
+        return menu
 
-    def _on_event(self, event):
-        pass
+    def _build_world(self):
+        """Escena del mapa: BD de memorias, mapa por tiles (si existe) y cámara."""
+        if self.world_ready:
+            return
+        with self.profiler.scope("startup.scene"):
+            init_db()
+            # Mapa por tiles (suelo + objetos): sustituye al fondo y la cámara sigue al jugador
+            from game.tilemap import TileMap, Tileset, Camera
+            layers = self._map_layers()
+            self.tilemap = TileMap.load(layers, Tileset(scale=2)) if layers else None
+            world_size = self.tilemap.pixel_size if self.tilemap else (self.W, self.H)
+            self.camera = Camera(self.W, self.H, world_size)
+            if self.save_path:
+                self._load_world()
+            if self.tilemap is not None:
+                grid = self.tilemap.walk_grid(SOLID_TILES)
+            else:
+                grid = WalkGrid.from_array(np.ones((self.H, self.W), dtype=bool))
+            self.npc_crowd = NPCCrowd([npc["pos"] for npc in self.npcs], grid, speed=1)
+        self.world_ready = True
+
+    def _map_layers(self) -> list[str]:
+        """Capas CSV del mapa por tiles que existen (suelo + objetos); vacía = fondo fijo."""
+        maps = os.path.join(self.assets_dir, "maps")
+        layers = [os.path.join(maps, name) for name in ("pueblo.csv", "pueblo_objetos.csv")]
+        return [path for path in layers if os.path.exists(path)]
+
+    def _load_world(self):
+        from game.snapshot import WorldSaver, load_world
+        state = load_world(self.save_path)
+        if state is not None:
+            state.apply(emotions=self.emotion_manager, events=self.event_manager)
+            for npc in self.npcs:
+                pos = state.position(npc["name"])
+                if pos is not None:
+                    npc["pos"].update(pos)
+                    npc["prev"].update(pos)
+                    self.npc_index.move(npc["name"], *pos)
+        self.saver = WorldSaver(self.save_path)
+
+    def _autosave(self):
+        """Captura el mundo (copia de arrays) y deja la escritura al hilo del WorldSaver."""
+        from game.snapshot import WorldState
+        with self.profiler.scope("autosave"):
+            state = WorldState.capture(
+                [npc["name"] for npc in self.npcs], [npc["pos"] for npc in self.npcs],
+                emotions=self.emotion_manager, events=self.event_manager, time=self.timestep.time
+            )
+            self.saver.autosave(state)
+
+    def _after_first_frame(self):
+        """Trabajo que no hace falta para el primer frame: se lanza justo después de mostrarlo."""
+        self.first_frame_at = time.perf_counter()
+        # Fondo fijo para PLAYING (solo sin mapa por tiles): se decodifica en segundo
+        # plano mientras se ven los menús
+        if not self._map_layers():
+            self.assets.preload(("maps/fondo_pueblo.png", (self.W, self.H)))
+
+    @property
+    def map_bg(self):
+        return self.assets.scaled("maps/fondo_pueblo.png", (self.W, self.H))
 
     def _set_state(self, state):
         self.state = state
 
     def _accept_name(self):
-        w = self.name_menu.get_widget('player_name')
+        w = self._menu(self.NAME_INPUT).get_widget('player_name')
         self.player_name = w.get_value().strip() or 'Anónimo'
+        self.event_manager.player_name = self.player_name
         self.state = self.CHAR_SELECT
 
     def _accept_class(self, cls):
@@ -124,87 +289,274 @@ class GameEngine:
         self.state = self.LORE
 
     def _start_adventure(self):
+        self._build_world()
         self.state = self.PLAYING
 
-    def run(self):
+    def run(self, max_frames: int = None):
+        """Bucle principal; `max_frames` lo corta tras ese número de frames (benchmarks)."""
         clock = pygame.time.Clock()
         running = True
+        drew = True
         while running:
-            dt = clock.tick(60)/1000.0
-            events = pygame.event.get()
-            for e in events:
-                if e.type == pygame.QUIT:
-                    running = False
-                if self.state == self.PLAYING and e.type == pygame.KEYDOWN:
-                    if e.key == pygame.K_UP:    self.player_pos.y -= 200*dt
-                    if e.key == pygame.K_DOWN:  self.player_pos.y += 200*dt
-                    if e.key == pygame.K_LEFT:  self.player_pos.x -= 200*dt
-                    if e.key == pygame.K_RIGHT: self.player_pos.x += 200*dt
-                    if e.key == pygame.K_SPACE:
-                        for npc in self.npcs:
-                            if self.player_pos.distance_to(npc['pos']) < 50:
-                                self.current_npc = npc['name']
+            if not drew and self.pending_reply is None:
+                # Frame anterior sin cambios: dormir hasta el próximo evento (o idle_wait_ms)
+                first = pygame.event.wait(self.idle_wait_ms)
+                if first.type != pygame.NOEVENT:
+                    pygame.event.post(first)
+            frame_dt = clock.tick(self.max_fps)/1000.0
+            profiler = self.profiler
+            profiler.begin_frame()
+            with profiler.scope("input"):
+                events = pygame.event.get()
+                for e in events:
+                    if e.type == pygame.QUIT:
+                        running = False
+                    if e.type == pygame.KEYDOWN and e.key == pygame.K_F3:
+                        self.profiler_overlay.toggle()
+                        if self.dirty is not None:
+                            self.dirty.invalidate()
+                    if self.state == self.PLAYING and e.type == pygame.KEYDOWN:
+                        if e.key == pygame.K_SPACE:
+                            near = self.npc_index.nearest(self.player_pos.x, self.player_pos.y, 1, max_radius=50)
+                            if near:
+                                self.current_npc = near[0]
                                 self.chat_history.clear()
                                 self.chat_input = ''
                                 self.state = self.CHAT
-                if self.state == self.CHAT and e.type == pygame.KEYDOWN:
-                    if e.key == pygame.K_BACKSPACE:
-                        self.chat_input = self.chat_input[:-1]
-                    elif e.key == pygame.K_RETURN:
-                        msg = self.chat_input.strip()
-                        if msg:
-                            self.chat_history.append(('Tú', msg))
-                            reply = self.conv_manager.get_dialogue(self.current_npc, self.player_name, msg)
-                            self.chat_history.append((self.current_npc, reply))
-                        self.chat_input = ''
-                    elif e.unicode.isprintable():
-                        self.chat_input += e.unicode
-                    if e.key == pygame.K_ESCAPE:
-                        self.state = self.PLAYING
-
-            if self.state == self.MENU or self.state == self.NAME_INPUT or self.state == self.CHAR_SELECT or self.state == self.LORE or self.state == self.WHOAMI:
-                self._draw_menu(events)
-            elif self.state == self.PLAYING:
-                self._show_playing()
-            elif self.state == self.CHAT:
-                self._show_chat()
+                    if self.state == self.CHAT and e.type == pygame.KEYDOWN:
+                        if e.key == pygame.K_BACKSPACE:
+                            self.chat_input = self.chat_input[:-1]
+                        elif e.key == pygame.K_RETURN:
+                            msg = self.chat_input.strip()
+                            if msg and self.pending_reply is None:
+                                req = self.conv_manager.submit_dialogue(self.current_npc, self.player_name, msg, stream=True)
+                                if req is not None:
+                                    self.chat_history.append(('Tú', msg))
+                                    self.pending_reply = req
+                                    self.chat_input = ''
+                        elif e.unicode.isprintable():
+                            self.chat_input += e.unicode
+                        if e.key == pygame.K_ESCAPE:
+                            if self.pending_reply is not None:
+                                self.pending_reply.cancel()
+                                self.pending_reply = None
+                            self.state = self.PLAYING
 
-            pygame.display.flip()
-        pygame.quit()
+            with profiler.scope("simulation"):
+                self._poll_reply()
+                # Teclas mantenidas: se leen una vez por frame y valen para todos sus pasos
+                keys = pygame.key.get_pressed()
+                for _ in range(self.timestep.advance(frame_dt)):
+                    self._simulate(self.timestep.dt, keys)
+
+            drew = self._render(events)
+            profiler.end_frame()
+            self.frames += 1
+            if self.frames == 1:
+                self._after_first_frame()
+            if max_frames is not None and self.frames >= max_frames:
+                running = False
+        try:
+            if self._conv_manager is not None:
+                self._conv_manager.shutdown()
+            if self.saver is not None:
+                self._autosave()
+                self.saver.close()
+        finally:
+            # aunque falle el guardado, las memorias en cola se vuelcan y pygame se cierra
+            self.assets.shutdown()
+            close_all()
+            self._export_profile()
+            pygame.quit()
+
+    def _simulate(self, dt: float, keys) -> None:
+        """Un paso fijo de simulación: jugador, NPC, eventos y emociones."""
+        self.player_prev.update(self.player_pos)
+        for npc in self.npcs:
+            npc["prev"].update(npc["pos"])
+        if self.state == self.PLAYING:
+            move = Vector2(
+                keys[pygame.K_RIGHT] - keys[pygame.K_LEFT],
+                keys[pygame.K_DOWN] - keys[pygame.K_UP]
+            )
+            if move.length_squared():
+                self.player_pos += move.normalize() * self.PLAYER_SPEED * dt
+        if self.state in (self.PLAYING, self.CHAT):
+            # IA de NPC: un paso de patrulla de toda la multitud con una consulta a la rejilla
+            if self.npc_crowd is not None:
+                pos = self.npc_crowd.step()
+                for npc, (x, y) in zip(self.npcs, pos.tolist()):
+                    npc["pos"].update(x, y)
+                self.npc_index.update_many([npc["name"] for npc in self.npcs], pos[:, 0].tolist(), pos[:, 1].tolist())
+            self.event_manager.update(dt)
+            if self.saver is not None:
+                self._autosave_left -= dt
+                if self._autosave_left <= 0:
+                    self._autosave_left += self.autosave_every
+                    self._autosave()
+
+    def _export_profile(self):
+        """Con RPG_PROFILE=1, vuelca la traza (chrome://tracing / Perfetto) al salir."""
+        if os.getenv("RPG_PROFILE") != "1" or not self.profiler.events:
+            return
+        path = os.getenv("RPG_PROFILE_TRACE") or time.strftime("profile_%Y%m%d_%H%M%S.json")
+        self.profiler.export_trace(path)
+        log.info("Traza del perfilador guardada en %s", path)
+
+    def _poll_reply(self):
+        """Recoge la respuesta del NPC cuando la petición en segundo plano termina."""
+        req = self.pending_reply
+        if req is None or not req.done():
+            return
+        self.pending_reply = None
+        if req.cancelled:
+            return
+        try:
+            reply = req.result()
+        except Exception:
+            # un fallo en el hilo (prompt, BD...) no debe tumbar el bucle del juego
+            from game.conversation import FALLBACK_REPLY
+            log.exception("Falló la respuesta de %s", req.npc_name)
+            reply = FALLBACK_REPLY
+        self.chat_history.append((req.npc_name, reply))
 
     def _draw_menu(self, events):
         self.screen.blit(self.menu_bg, (0,0))
-        if self.state == self.MENU:
-            self.main_menu.update(events);    self.main_menu.draw(self.screen)
-        elif self.state == self.NAME_INPUT:
-            self.name_menu.update(events);    self.name_menu.draw(self.screen)
-        elif self.state == self.CHAR_SELECT:
-            self.char_menu.update(events);    self.char_menu.draw(self.screen)
-        elif self.state == self.LORE:
-            self.lore_menu.update(events);    self.lore_menu.draw(self.screen)
-        elif self.state == self.WHOAMI:
-            self.whoami_menu.update(events);  self.whoami_menu.draw(self.screen)
+        if self.state in self._menu_builders:
+            menu = self._menu(self.state)
+            menu.update(events)
+            menu.draw(self.screen)
 
-    def _show_playing(self):
-        # Dibujar mapa de fondo
-        self.screen.blit(self.map_bg, (0,0))
-        # Dibujar NPCs
+    def _render(self, events) -> bool:
+        """Pinta el frame actual; devuelve False si se omitió por no haber cambios."""
+        overlay = self.profiler_overlay
+        if self.state != self._drawn_state:
+            self._drawn_state = self.state
+            if self.dirty is not None:
+                self.dirty.invalidate()
+        if overlay.visible and self.dirty is not None:
+            # el overlay cambia cada frame: con él visible no hay frames que omitir
+            self.dirty.invalidate()
+        profiler = self.profiler
+        if self.state in self.MENU_STATES:
+            # pygame_menu pinta todo: sin eventos no hay nada nuevo que mostrar
+            if self.dirty is not None and not events and not self.dirty.full:
+                return False
+            with profiler.scope("render.menu"):
+                self._draw_menu(events)
+                overlay.draw(self.screen)
+            if self.dirty is not None:
+                self.dirty.full = False
+            with profiler.scope("render.present"):
+                pygame.display.flip()
+            return True
+        with profiler.scope("render.scene"):
+            if self.state == self.PLAYING:
+                background, drawables = self._playing_scene()
+            elif self.state == self.CHAT:
+                background, drawables = self._chat_scene()
+            else:
+                return False
+        if overlay.visible:
+            drawables.append(Drawable('profiler', self.screen.get_rect(), None, lambda: overlay.draw(self.screen)))
+        with profiler.scope("render.present"):
+            if self.dirty is not None:
+                return self.dirty.present(background, drawables)
+            background(None)
+            for d in drawables:
+                d.draw()
+            pygame.display.flip()
+        return True
+
+    def _playing_scene(self):
+        # Posiciones interpoladas entre los dos últimos pasos de simulación
+        alpha = self.timestep.alpha
+        player = lerp(self.player_prev, self.player_pos, alpha)
+        # Mapa de fondo (solo los chunks visibles si hay mapa por tiles)
+        if self.tilemap is not None:
+            self.camera.center_on(*player)
+            cam = self.camera.rect
+            if cam != self._drawn_camera:
+                self._drawn_camera = cam
+                if self.dirty is not None:
+                    self.dirty.invalidate()
+
+            def background(rect):
+                self.tilemap.draw(self.screen, self.camera, rect)
+        else:
+            def background(rect):
+                if rect is None:
+                    self.screen.blit(self.map_bg, (0,0))
+                else:
+                    self.screen.blit(self.map_bg, rect, rect)
+
+        drawables = []
+        # NPCs
         for npc in self.npcs:
-            pos = (int(npc['pos'].x), int(npc['pos'].y))
-            pygame.draw.circle(self.screen, (200,50,50), pos, 20)
-            label = self.font_small.render(npc['name'], True, (255,255,255))
-            self.screen.blit(label, (pos[0]-label.get_width()//2, pos[1]-30))
-        # Dibujar jugador
-        ppos = (int(self.player_pos.x), int(self.player_pos.y))
-        pygame.draw.circle(self.screen, (50,150,200), ppos, 15)
+            pos = self.camera.to_screen(*lerp(npc['prev'], npc['pos'], alpha))
+            label = self.text.render(self.font_small, npc['name'])
+            lpos = (pos[0]-label.get_width()//2, pos[1]-30)
+            bounds = pygame.Rect(pos[0]-20, pos[1]-20, 40, 40).union(label.get_rect(topleft=lpos))
 
-    def _show_chat(self):
-        self.screen.fill((30,30,30))
+            def draw(pos=pos, label=label, lpos=lpos):
+                pygame.draw.circle(self.screen, (200,50,50), pos, 20)
+                self.screen.blit(label, lpos)
+            drawables.append(Drawable(('npc', npc['name']), bounds, None, draw))
+        # Jugador (encima de los NPCs)
+        ppos = self.camera.to_screen(*player)
+        drawables.append(Drawable(
+            'player', pygame.Rect(ppos[0]-15, ppos[1]-15, 30, 30), None,
+            lambda: pygame.draw.circle(self.screen, (50,150,200), ppos, 15)
+        ))
+        return background, drawables
+
+    def _show_playing(self):
+        background, drawables = self._playing_scene()
+        background(None)
+        for d in drawables:
+            d.draw()
+
+    def _chat_scene(self):
+        def background(rect):
+            self.screen.fill((30,30,30), rect)
+
+        drawables = []
+        messages = self.chat_history[-10:]
+        if self.pending_reply is not None:
+            # la respuesta se pinta según llega; "pensando" hasta el primer trozo
+            text = self.pending_reply.partial
+            if not text:
+                text = "." * (1 + (pygame.time.get_ticks() // 400) % 3)
+            messages = messages[-9:] + [(self.current_npc, text)]
+        live = len(messages) - 1 if self.pending_reply is not None else -1
+        # Mensajes partidos en líneas (wrap cacheado); se muestran las últimas que caben
+        lines = [
+            (line, i == live)
+            for i, (speaker, msg) in enumerate(messages)
+            for line in wrap(f"{speaker}: {msg}", self.chat_wrap)
+        ]
+        line_h = self.font_text.get_linesize() + 5
+        lines = lines[-max(1, (self.H - 60) // line_h):]
         y = 20
-        for speaker,msg in self.chat_history[-10:]:
-            surf = self.font_text.render(f"{speaker}: {msg}", True, (255,255,255))
-            self.screen.blit(surf, (20, y)); y += surf.get_height() + 5
+        for i, (line, is_live) in enumerate(lines):
+            # la respuesta que se está recibiendo cambia cada trozo: no se guarda en caché
+            surf = self.text.render(self.font_text, line, cache=not is_live)
+            drawables.append(Drawable(
+                ('line', i), surf.get_rect(topleft=(20, y)), line,
+                lambda surf=surf, y=y: self.screen.blit(surf, (20, y))
+            ))
+            y += line_h
         ibox = pygame.Rect(20, self.H-40, self.W-40, 30)
-        pygame.draw.rect(self.screen, (70,70,70), ibox)
-        inp = self.font_small.render(self.chat_input+"_", True, (255,255,255))
-        self.screen.blit(inp, (ibox.x+5, ibox.y+5))
+        inp = self.text.render(self.font_small, self.chat_input+"_")
+
+        def draw_input():
+            pygame.draw.rect(self.screen, (70,70,70), ibox)
+            self.screen.blit(inp, (ibox.x+5, ibox.y+5))
+        drawables.append(Drawable('input', ibox, self.chat_input, draw_input))
+        return background, drawables
+
+    def _show_chat(self):
+        background, drawables = self._chat_scene()
+        background(None)
+        for d in drawables:
+            d.draw()
@@ -1,15 +1,112 @@
 # game/events.py
 
+import heapq
 import random
+import itertools
+from collections import deque
+from typing import Callable
 from game.emotion import EmotionEngine
 from game.db import save_npc_memory
 
+
+class ScheduledEvent:
+    """
+    Evento planificado. target=None significa evento global (todos los NPC);
+    si no, solo afecta a ese NPC. Devuelto por schedule_* como handle cancelable.
+    """
+    __slots__ = ("time", "name", "desc", "target", "interval", "cancelled")
+
+    def __init__(self, time: float, name: str, desc: str = "", target: str = None, interval: float = None):
+        self.time = time
+        self.name = name
+        self.desc = desc
+        self.target = target
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class EventScheduler:
+    """
+    Planificador de eventos sobre un montículo (heap) ordenado por tiempo de simulación.
+    schedule_at / schedule_in / schedule_every devuelven un handle cancelable;
+    update(dt) avanza el reloj, saca en O(log n) cada evento vencido y entrega
+    el lote del frame a todos los suscriptores de una vez.
+    Los cancelados se descartan al salir del heap (borrado perezoso).
+    """
+    def __init__(self):
+        self.now = 0.0
+        self._heap: list[tuple[float, int, ScheduledEvent]] = []
+        self._seq = itertools.count()
+        self._subscribers: list[Callable[[list[ScheduledEvent]], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def subscribe(self, fn: Callable[[list[ScheduledEvent]], None]) -> None:
+        self._subscribers.append(fn)
+
+    def _push(self, ev: ScheduledEvent) -> ScheduledEvent:
+        heapq.heappush(self._heap, (ev.time, next(self._seq), ev))
+        return ev
+
+    def schedule_at(self, time: float, name: str, desc: str = "", target: str = None) -> ScheduledEvent:
+        return self._push(ScheduledEvent(time, name, desc, target))
+
+    def schedule_in(self, delay: float, name: str, desc: str = "", target: str = None) -> ScheduledEvent:
+        return self.schedule_at(self.now + delay, name, desc, target)
+
+    def schedule_every(
+        self,
+        interval: float,
+        name: str,
+        desc: str = "",
+        target: str = None,
+        first: float = None
+    ) -> ScheduledEvent:
+        """Evento recurrente cada `interval` s; la primera vez en `first` s (por defecto, interval)."""
+        if interval <= 0:
+            raise ValueError("interval debe ser > 0")
+        delay = interval if first is None else first
+        return self._push(ScheduledEvent(self.now + delay, name, desc, target, interval))
+
+    def pop_due(self) -> list[ScheduledEvent]:
+        batch = []
+        heap = self._heap
+        while heap and heap[0][0] <= self.now:
+            _, _, ev = heapq.heappop(heap)
+            if ev.cancelled:
+                continue
+            batch.append(ev)
+            if ev.interval is not None:
+                # el mismo handle se reprograma: cancelarlo detiene la serie
+                ev.time += ev.interval
+                if ev.time <= self.now:
+                    ev.time = self.now + ev.interval
+                self._push(ev)
+        return batch
+
+    def update(self, dt: float) -> list[ScheduledEvent]:
+        self.now += dt
+        batch = self.pop_due()
+        if batch:
+            for fn in self._subscribers:
+                fn(batch)
+        return batch
+
+
 class EventManager:
     """
     Gestiona eventos globales. Cada cierto tiempo dispara un evento
     aleatorio, notifica al EmotionEngine, guarda en BD y avisa al GameEngine.
+    Además permite planificar eventos puntuales, retrasados, recurrentes o
+    dirigidos a un NPC a través de `scheduler`.
     """
 
+    RANDOM_EVENT = "__aleatorio__"
+
     def __init__(
         self,
         event_list: list[tuple[str,str]],
@@ -17,7 +114,8 @@ class EventManager:
         save_memory_fn,
         on_event_callback,
         interval: float = 15.0,
-        history_size: int = 5
+        history_size: int = 5,
+        player_name: str = ""
     ):
         self.event_list = event_list
         self.emotion_engine = emotion_engine
@@ -25,33 +123,74 @@ class EventManager:
         self.on_event = on_event_callback
         self.interval = interval
         self.history_size = history_size
-        self.env_timer = 0.0
-        self.recent_events: list[tuple[str,str]] = []
+        self.player_name = player_name
+        self.recent_events: deque[tuple[str,str]] = deque(maxlen=history_size)
+
+        self.scheduler = EventScheduler()
+        self.scheduler.subscribe(self._dispatch)
+        # Suscriptores del lote ya resuelto, en orden: emociones, memoria, juego
+        self.subscribers = [self._notify_emotions, self._notify_memory, self._notify_game]
+        if event_list:
+            self.random_handle = self.scheduler.schedule_every(interval, self.RANDOM_EVENT)
+        else:
+            self.random_handle = None
 
     def update(self, dt: float = 1.0):
-        self.env_timer += dt
-        if self.env_timer >= self.interval:
-            self._trigger_event()
+        self.emotion_engine.decay(dt)
+        self.scheduler.update(dt)
+
+    # ─── Planificación ───────────────────────────────────────────────────────
+    def schedule_at(self, time: float, evento: str, desc: str = "", npc: str = None) -> ScheduledEvent:
+        return self.scheduler.schedule_at(time, evento, desc, npc)
+
+    def schedule_in(self, delay: float, evento: str, desc: str = "", npc: str = None) -> ScheduledEvent:
+        return self.scheduler.schedule_in(delay, evento, desc, npc)
+
+    def schedule_every(self, interval: float, evento: str, desc: str = "", npc: str = None, first: float = None) -> ScheduledEvent:
+        return self.scheduler.schedule_every(interval, evento, desc, npc, first)
 
     def _trigger_event(self):
-        evento, desc = random.choice(self.event_list)
+        """Dispara ahora un evento aleatorio de event_list."""
+        self.scheduler.schedule_at(self.scheduler.now, self.RANDOM_EVENT)
+        self.scheduler.update(0.0)
 
-        # Notificar motor emocional para cada NPC
-        for npc_name in self.emotion_engine.emotions.keys():
-            self.emotion_engine.handle_event(npc_name, evento)
+    # ─── Suscriptores (reciben el lote de eventos del frame) ─────────────────
+    def _dispatch(self, batch: list[ScheduledEvent]) -> None:
+        # Los eventos aleatorios eligen aquí su contenido, una vez por disparo
+        resolved = []
+        for ev in batch:
+            if ev.name == self.RANDOM_EVENT:
+                if not self.event_list:
+                    continue
+                evento, desc = random.choice(self.event_list)
+                ev = ScheduledEvent(ev.time, evento, desc)
+            resolved.append(ev)
+        if resolved:
+            for fn in self.subscribers:
+                fn(resolved)
 
-        # Formatear mensaje y notificar al juego
-        mensaje = f"[EVENTO] {evento} → {desc}"
-        self.on_event(mensaje)
+    def _notify_emotions(self, batch: list[ScheduledEvent]) -> None:
+        for ev in batch:
+            if ev.target is None:
+                # Notificar motor emocional: todos los NPC a la vez
+                self.emotion_engine.apply_event_to_all(ev.name)
+            else:
+                self.emotion_engine.handle_event(ev.target, ev.name)
 
-        # Guardar en memoria de cada NPC
-        for npc_name in self.emotion_engine.emotions.keys():
-            self.save_memory(npc_name, mensaje)
+    def _notify_memory(self, batch: list[ScheduledEvent]) -> None:
+        # Guardar en memoria de cada NPC afectado (para la conversación con el jugador actual)
+        for ev in batch:
+            mensaje = self._format(ev)
+            npcs = self.emotion_engine.emotions.keys() if ev.target is None else (ev.target,)
+            for npc_name in npcs:
+                self.save_memory(npc_name, self.player_name, mensaje)
 
-        # Mantener historial interno
-        self.recent_events.append((evento, desc))
-        if len(self.recent_events) > self.history_size:
-            self.recent_events.pop(0)
+    def _notify_game(self, batch: list[ScheduledEvent]) -> None:
+        for ev in batch:
+            self.on_event(self._format(ev))
+            # Mantener historial interno (ring buffer acotado)
+            self.recent_events.append((ev.name, ev.desc))
 
-        # Resetear timer
-        self.env_timer = 0.0
+    @staticmethod
+    def _format(ev: ScheduledEvent) -> str:
+        return f"[EVENTO] {ev.name} → {ev.desc}"
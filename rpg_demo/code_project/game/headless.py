@@ -0,0 +1,290 @@
+# game/headless.py
+"""
+Simulación sin ventana y banco de pruebas de escalado.
+
+    python -m game.headless --npcs 500 --ticks 600
+    python -m game.headless --bench --sizes 10,100,1000,10000 --out bench.json
+
+Usa el driver de vídeo "dummy" de SDL y el DialogueTreeBackend (sin red ni
+clave de OpenAI). Cada tick mueve a los NPC (patrulla + campo de flujo),
+actualiza el índice espacial, aplica movimientos sociales entre vecinos,
+avanza emociones y eventos y encola recuerdos en una BD temporal.
+La salida es JSON para poder comparar resultados entre versiones.
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from collections import defaultdict
+import numpy as np
+
+from game.walkgrid import WalkGrid
+from game.ai import NPCCrowd
+from game.pathfinding import PathfindingService
+from game.spatial import SpatialHash
+from game.cif_ck import SocialNetwork
+from game.emotion import EmotionEngine
+from game.events import EventManager
+from game.db import get_store, get_writer, close_all, save_npc_memory
+from game.llm import DialogueTreeBackend
+from game.conversation import ConversationManager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WALK_MASK = os.path.join(BASE_DIR, "assets", "maps", "pradera_walk.png")
+WORLD_SIZE = (1536, 1024)
+WORLD_EVENTS = [
+    ("Tormenta", "Nubes negras cubren el pueblo."),
+    ("Festival", "Música y faroles en la plaza."),
+    ("Niebla", "Apenas se ve a unos pasos."),
+]
+PLAYER = "Jugador"
+SUBSYSTEMS = ("movement", "spatial", "social", "events", "memory", "dialogue")
+
+
+def peak_rss_mb() -> float | None:
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux da KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+class HeadlessSimulation:
+    """
+    La simulación del juego para `n_npcs` NPC, sin pygame.display ni LLM real.
+    `social_cap` limita cuántos NPC entran en la SocialNetwork (su tensor es
+    atributos × N × N); el resto se mueve pero no socializa.
+    """
+    def __init__(
+        self,
+        n_npcs: int,
+        seed: int = 0,
+        dt: float = 1 / 60,
+        social_radius: float = 24.0,
+        social_every: int = 30,
+        interaction_prob: float = 0.05,
+        social_cap: int = 2000,
+        follow_share: float = 0.2,
+        event_interval: float = 5.0,
+        dialogue_every: int = 60,
+        db_dir: str = None
+    ):
+        self.n = n_npcs
+        self.dt = dt
+        self.social_radius = social_radius
+        self.social_every = social_every
+        self.interaction_prob = interaction_prob
+        self.dialogue_every = dialogue_every
+        self.rng = np.random.default_rng(seed)
+        self.timings: dict[str, float] = defaultdict(float)
+        self.ticks = 0
+        self.counters = defaultdict(int)
+
+        t0 = time.perf_counter()
+        self._tmp = db_dir is None
+        self.db_dir = tempfile.mkdtemp(prefix="rpg_headless_") if db_dir is None else db_dir
+        self.db_filename = os.path.join(self.db_dir, "npc_memory.db")
+        get_store(self.db_filename).init_schema()
+        self.writer = get_writer(self.db_filename)
+
+        w, h = WORLD_SIZE
+        self.grid = WalkGrid.load(WALK_MASK, channel=3, use_cache=False)
+        self.grid.scale = (self.grid.width / w, self.grid.height / h)
+        self.names = [f"NPC{i}" for i in range(n_npcs)]
+        ys, xs = np.nonzero(self.grid.array)
+        pick = self.rng.integers(0, len(xs), n_npcs)
+        sx, sy = self.grid.scale
+        start = np.stack([(xs[pick] + 0.5) / sx, (ys[pick] + 0.5) / sy], axis=1)
+        self.crowd = NPCCrowd(start, self.grid, speed=2, seed=seed)
+
+        self.paths = PathfindingService(self.grid, cell_size=4)
+        goal = start[self.rng.integers(0, n_npcs)]
+        self.field = self.paths.flow_field(goal)
+        self.followers = np.zeros(n_npcs, dtype=bool)
+        self.followers[:int(n_npcs * follow_share)] = True
+        self.wanderers = ~self.followers
+
+        self.index = SpatialHash(cell_size=max(social_radius, 16.0))
+        self.index.update_many(range(n_npcs), start[:, 0].tolist(), start[:, 1].tolist())
+        self.social = SocialNetwork(self.names[:min(n_npcs, social_cap)], seed=seed)
+        self.social_actors = min(n_npcs, social_cap)
+
+        self.emotions = EmotionEngine(self.names)
+        self.events = EventManager(
+            WORLD_EVENTS, self.emotions,
+            lambda npc, player, mem: save_npc_memory(npc, player, mem, self.db_filename),
+            lambda msg: None, interval=event_interval, player_name=PLAYER
+        )
+        self.conversation = ConversationManager(
+            None, backend=DialogueTreeBackend(), db_filename=self.db_filename
+        )
+        self.setup_s = time.perf_counter() - t0
+
+    def tick(self) -> None:
+        perf = time.perf_counter
+        timings = self.timings
+
+        t = perf()
+        self.crowd.step(self.wanderers)
+        self.crowd.follow(self.field, self.followers)
+        timings["movement"] += perf() - t
+
+        t = perf()
+        pos = self.crowd.pos
+        self.index.update_many(range(self.n), pos[:, 0].tolist(), pos[:, 1].tolist())
+        timings["spatial"] += perf() - t
+
+        if self.social_every and self.ticks % self.social_every == 0:
+            self._social_tick()
+
+        t = perf()
+        self.events.update(self.dt)
+        timings["events"] += perf() - t
+
+        if self.dialogue_every and self.ticks % self.dialogue_every == 0:
+            t = perf()
+            npc = ("Carlos", "Lina", "Eldar")[self.ticks // self.dialogue_every % 3]
+            self.conversation.get_dialogue(npc, PLAYER, "¿Tienes trabajo para mí?", use_cache=False)
+            self.counters["dialogues"] += 1
+            timings["dialogue"] += perf() - t
+        self.ticks += 1
+
+    def _social_tick(self) -> None:
+        perf = time.perf_counter
+        t = perf()
+        cap = self.social_actors
+        pairs = [(a, b) for a, b in self.index.pairs_within(self.social_radius) if a < cap and b < cap]
+        if pairs and self.interaction_prob < 1.0:
+            keep = self.rng.random(len(pairs)) < self.interaction_prob
+            pairs = [p for p, k in zip(pairs, keep) if k]
+        names = self.names
+        moves = self.social.step_pairs([(names[a], names[b]) for a, b in pairs])
+        for source, target, move in moves:
+            self.emotions.handle_social_move(target, move)
+        self.counters["social_moves"] += len(moves)
+        self.timings["social"] += perf() - t
+
+        t = perf()
+        for source, target, move in moves:
+            self.writer.save(target, source, f"{source} decidió {move} a {target}")
+        self.counters["memories"] += len(moves)
+        self.timings["memory"] += perf() - t
+
+    def run(self, ticks: int) -> dict:
+        t0 = time.perf_counter()
+        for _ in range(ticks):
+            self.tick()
+        sim_s = time.perf_counter() - t0
+        t = time.perf_counter()
+        self.writer.flush()
+        self.timings["memory_flush"] += time.perf_counter() - t
+        return self.report(sim_s)
+
+    def report(self, sim_s: float) -> dict:
+        ticks = max(self.ticks, 1)
+        return {
+            "npcs": self.n,
+            "ticks": self.ticks,
+            "social_actors": self.social_actors,
+            "setup_s": round(self.setup_s, 4),
+            "sim_s": round(sim_s, 4),
+            "ticks_per_s": round(self.ticks / sim_s, 2) if sim_s else None,
+            "ms_per_tick": {
+                name: round(self.timings.get(name, 0.0) / ticks * 1000, 4) for name in SUBSYSTEMS
+            },
+            "memory_flush_s": round(self.timings.get("memory_flush", 0.0), 4),
+            "counters": dict(self.counters),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def close(self) -> None:
+        self.conversation.shutdown()
+        close_all()
+        if self._tmp:
+            shutil.rmtree(self.db_dir, ignore_errors=True)
+
+
+def run_once(n_npcs: int, ticks: int, seed: int = 0, **kwargs) -> dict:
+    sim = HeadlessSimulation(n_npcs, seed=seed, **kwargs)
+    try:
+        return sim.run(ticks)
+    finally:
+        sim.close()
+
+
+def run_benchmark(sizes: list[int], ticks: int, seed: int = 0, social_cap: int = 2000) -> dict:
+    """
+    Ejecuta cada tamaño en un proceso aparte, para que el pico de RSS
+    de uno no contamine al siguiente.
+    """
+    results = []
+    for n in sizes:
+        cmd = [
+            sys.executable, "-m", "game.headless", "--npcs", str(n), "--ticks", str(ticks),
+            "--seed", str(seed), "--social-cap", str(social_cap),
+        ]
+        proc = subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True)
+        if proc.returncode != 0:
+            results.append({"npcs": n, "error": proc.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(proc.stdout))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "ticks": ticks,
+            "seed": seed,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación sin ventana y banco de pruebas de escalado")
+    parser.add_argument("--npcs", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--social-cap", type=int, default=2000,
+                        help="máximo de NPC en la SocialNetwork (tensor N×N)")
+    parser.add_argument("--bench", action="store_true", help="recorre --sizes y emite un informe")
+    parser.add_argument("--sizes", default="10,100,1000,10000")
+    parser.add_argument("--out", help="fichero JSON de salida (por defecto, stdout)")
+    args = parser.parse_args()
+
+    if args.bench:
+        sizes = [int(s) for s in args.sizes.split(",") if s]
+        data = run_benchmark(sizes, args.ticks, args.seed, args.social_cap)
+    else:
+        data = run_once(args.npcs, args.ticks, args.seed, social_cap=args.social_cap)
+
+    text = json.dumps(data, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
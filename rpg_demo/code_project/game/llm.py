@@ -1,6 +1,140 @@
 # game/llm.py
+import json
+from typing import Iterator, Protocol
 from game.data import DIALOGUE_TREES
 
+
+class LLMBackend(Protocol):
+    """
+    Interfaz común de los generadores de diálogo.
+    messages sigue el formato de chat de OpenAI: [{"role": ..., "content": ...}].
+    """
+    def complete(self, npc_name: str, messages: list[dict]) -> str:
+        ...
+
+    def stream(self, npc_name: str, messages: list[dict]) -> Iterator[str]:
+        ...
+
+
+def _last_user_message(messages: list[dict]) -> str:
+    for msg in reversed(messages):
+        if msg.get("role") == "user":
+            return msg.get("content", "")
+    return ""
+
+
+class OpenAIBackend:
+    """
+    Backend remoto: ChatCompletion de OpenAI.
+    El paquete openai se importa al crear el backend, no al importar este módulo.
+    """
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
+        import openai
+        openai.api_key = api_key
+        self.openai = openai
+        self.model = model
+
+    def complete(self, npc_name: str, messages: list[dict]) -> str:
+        resp = self.openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages
+        )
+        return resp.choices[0].message.content
+
+    def stream(self, npc_name: str, messages: list[dict]) -> Iterator[str]:
+        resp = self.openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            stream=True
+        )
+        for chunk in resp:
+            text = chunk.choices[0].delta.get("content")
+            if text:
+                yield text
+
+
+class DialogueTreeBackend:
+    """
+    Backend offline y determinista: responde con los árboles de data.DIALOGUE_TREES.
+    Elige la opción cuyo texto más se parece al mensaje del jugador;
+    sin mensaje (o sin coincidencia) devuelve el saludo.
+    """
+    def __init__(self, trees: dict = None):
+        self.trees = DIALOGUE_TREES if trees is None else trees
+
+    def complete(self, npc_name: str, messages: list[dict]) -> str:
+        tree = self.trees.get(npc_name)
+        if not tree:
+            return "…"
+        words = set(_last_user_message(messages).lower().strip("¿?¡!. ").split())
+        best, best_score = None, 0
+        for opt in tree.get("options", []):
+            score = len(words & set(opt["text"].lower().strip("¿?¡!. ").split()))
+            if score > best_score:
+                best, best_score = opt, score
+        if best is None:
+            return tree.get("greeting", "Hola.")
+        return best.get("response", "…")
+
+    def stream(self, npc_name: str, messages: list[dict]) -> Iterator[str]:
+        for word in self.complete(npc_name, messages).split(" "):
+            yield word + " "
+
+
+class HTTPBackend:
+    """
+    Backend sobre cualquier endpoint compatible con /v1/chat/completions
+    (p. ej. el servidor local de game/llm_server.py).
+    Usa un único httpx.Client compartido, así las conexiones se reutilizan (keep-alive).
+    """
+    def __init__(
+        self,
+        base_url: str = "http://127.0.0.1:8765",
+        api_key: str = "local",
+        model: str = "stub",
+        timeout: float = 30.0,
+        max_connections: int = 16
+    ):
+        import httpx
+        self.model = model
+        self._client = httpx.Client(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+        )
+
+    def _payload(self, npc_name: str, messages: list[dict], stream: bool) -> dict:
+        return {"model": self.model, "messages": messages, "stream": stream, "user": npc_name}
+
+    def complete(self, npc_name: str, messages: list[dict]) -> str:
+        resp = self._client.post("/v1/chat/completions", json=self._payload(npc_name, messages, False))
+        resp.raise_for_status()
+        return resp.json()["choices"][0]["message"]["content"]
+
+    def stream(self, npc_name: str, messages: list[dict]) -> Iterator[str]:
+        with self._client.stream(
+            "POST", "/v1/chat/completions", json=self._payload(npc_name, messages, True)
+        ) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    # se sigue leyendo hasta el final para devolver la conexión al pool
+                    continue
+                text = json.loads(data)["choices"][0]["delta"].get("content")
+                if text:
+                    yield text
+
+    def close(self) -> None:
+        self._client.close()
+
+
 class LLMClient:
     """
     Fallback offline: usa los árboles de diálogo definidos en data.DIALOGUE_TREES.
@@ -0,0 +1,218 @@
+# game/llm_server.py
+"""
+Servidor local que imita /v1/chat/completions de OpenAI, sin red ni coste.
+Las respuestas son deterministas (dependen solo del NPC y del mensaje) y se
+puede configurar la latencia hasta el primer token y los tokens por segundo,
+para hacer pruebas de carga del pipeline de diálogo y medir p50/p99.
+
+Uso:
+    python -m game.llm_server --latency 0.3 --tps 40
+    python -m game.llm_server --bench --requests 200 --concurrency 8
+"""
+
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+
+WORDS = (
+    "el viento trae noticias del norte y la aldea guarda silencio mientras "
+    "las antorchas arden junto al viejo pozo de piedra"
+).split()
+
+
+def stub_reply(npc_name: str, message: str, n_words: int = 24) -> str:
+    """Respuesta determinista: mismas entradas, mismo texto."""
+    seed = hashlib.sha1(f"{npc_name}\0{message}".encode("utf-8")).digest()
+    words = [WORDS[seed[i % len(seed)] % len(WORDS)] for i in range(n_words)]
+    return f"{npc_name or 'NPC'}: " + " ".join(words).capitalize() + "."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_POST(self):
+        if self.path != "/v1/chat/completions":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        cfg = self.server.config
+        messages = body.get("messages", [])
+        user_msg = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        reply = stub_reply(body.get("user", ""), user_msg, cfg["reply_words"])
+        tokens = [w + " " for w in reply.split(" ")]
+        tokens[-1] = tokens[-1].rstrip()
+        token_delay = 1.0 / cfg["tps"] if cfg["tps"] > 0 else 0.0
+
+        time.sleep(cfg["latency"])
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for tok in tokens:
+                chunk = {"choices": [{"index": 0, "delta": {"content": tok}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                time.sleep(token_delay)
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            time.sleep(token_delay * len(tokens))
+            payload = json.dumps({
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}}],
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    def _write_chunk(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # el cliente cerrando una conexión keep-alive no es un error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubLLMServer:
+    """
+    Servidor stand-in en un hilo propio.
+        with StubLLMServer(latency=0.2, tps=50) as srv:
+            backend = HTTPBackend(srv.url)
+    """
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        tps: float = 0.0,
+        reply_words: int = 24
+    ):
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.config = {"latency": latency, "tps": tps, "reply_words": reply_words}
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def run_load_test(backend, requests: int = 200, concurrency: int = 8, stream: bool = True) -> dict:
+    """
+    Lanza `requests` peticiones contra el backend con `concurrency` hilos.
+    Devuelve latencias (s) p50/p99 totales y hasta el primer trozo.
+    """
+    npcs = ["Carlos", "Lina", "Eldar"]
+
+    def one(i):
+        npc = npcs[i % len(npcs)]
+        messages = [
+            {"role": "system", "content": f"Tú eres **{npc}**."},
+            {"role": "user", "content": f"Mensaje {i}"},
+        ]
+        t0 = time.perf_counter()
+        first = None
+        if stream:
+            for _ in backend.stream(npc, messages):
+                if first is None:
+                    first = time.perf_counter() - t0
+        else:
+            backend.complete(npc, messages)
+        total = time.perf_counter() - t0
+        return total, first if first is not None else total
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+    totals = [r[0] for r in results]
+    firsts = [r[1] for r in results]
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "stream": stream,
+        "wall_s": wall,
+        "throughput_rps": requests / wall if wall else 0.0,
+        "latency_p50_s": _percentile(totals, 50),
+        "latency_p99_s": _percentile(totals, 99),
+        "ttft_p50_s": _percentile(firsts, 50),
+        "ttft_p99_s": _percentile(firsts, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor LLM local para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="segundos hasta el primer token")
+    parser.add_argument("--tps", type=float, default=50.0, help="tokens por segundo (0 = sin límite)")
+    parser.add_argument("--reply-words", type=int, default=24)
+    parser.add_argument("--bench", action="store_true", help="lanza una prueba de carga y sale")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-stream", action="store_true")
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, 0 if args.bench else args.port,
+                           args.latency, args.tps, args.reply_words)
+    if not args.bench:
+        print(f"Servidor LLM local en {server.url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    from game.llm import HTTPBackend
+    with server:
+        backend = HTTPBackend(server.url, max_connections=args.concurrency)
+        try:
+            stats = run_load_test(backend, args.requests, args.concurrency, not args.no_stream)
+        finally:
+            backend.close()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
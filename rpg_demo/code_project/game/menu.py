@@ -1,6 +1,8 @@
 import pygame
 import os
 import sys
+from game.assets import get_assets
+from game.text import get_text_renderer
 
 # ─── Rutas base ──────────────────────────────────────────────────────────────
 # BASE_DIR = carpeta "code_project"
@@ -25,17 +27,13 @@ class Menu:
         self.screen_width, self.screen_height = self.screen.get_size()
 
         # ─── Fuentes ──────────────────────────────────────────────────────────
-        self.title_font  = pygame.font.Font(
-            os.path.join(FONTS_DIR, 'The Amazing Spider-Man.ttf'), 72
-        )
-        self.option_font = pygame.font.Font(
-            os.path.join(FONTS_DIR, 'CinzelDecorative-Regular.ttf'), 48
-        )
+        assets = get_assets()
+        text = get_text_renderer()
+        self.title_font  = text.font(os.path.join(FONTS_DIR, 'The Amazing Spider-Man.ttf'), 72)
+        self.option_font = text.font(os.path.join(FONTS_DIR, 'CinzelDecorative-Regular.ttf'), 48)
 
         # ─── Imagen del botón ────────────────────────────────────────────────
-        self.button_img = pygame.image.load(
-            os.path.join(MENU_DIR, 'button.png')
-        ).convert_alpha()
+        self.button_img = assets.image(os.path.join(MENU_DIR, 'button.png'))
 
         # Opciones
         self.options = ["INICIAR", "QUIÉN SOY"]
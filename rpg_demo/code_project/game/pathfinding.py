@@ -0,0 +1,453 @@
+# game/pathfinding.py
+
+import math
+import time
+import heapq
+from collections import OrderedDict, deque
+from typing import Iterator
+import numpy as np
+from game.walkgrid import WalkGrid
+
+SQRT2 = math.sqrt(2.0)
+# (dy, dx, coste): 4 ortogonales y 4 diagonales
+NEIGHBOURS = (
+    (0, 1, 1.0), (0, -1, 1.0), (1, 0, 1.0), (-1, 0, 1.0),
+    (1, 1, SQRT2), (1, -1, SQRT2), (-1, 1, SQRT2), (-1, -1, SQRT2),
+)
+
+
+class PathRequest:
+    """Petición de ruta pendiente; `path` se rellena cuando `done`."""
+    __slots__ = ("start", "goal", "path", "done", "cancelled")
+
+    def __init__(self, start: tuple[int, int], goal: tuple[int, int]):
+        self.start = start
+        self.goal = goal
+        self.path: list[tuple[float, float]] | None = None
+        self.done = False
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class FlowField:
+    """
+    Campo de flujo hacia una meta: para cada celda, la dirección (unitaria)
+    del siguiente paso por el camino más corto. Lo comparten todos los NPC
+    que van al mismo sitio; direction() resuelve a todos en una consulta.
+    """
+    def __init__(self, service: 'PathfindingService', goal: tuple[int, int]):
+        self.service = service
+        self.goal = goal
+        self.dist: np.ndarray | None = None
+        self.steps: np.ndarray | None = None  # (filas, cols, 2) desplazamiento de celda (dx, dy)
+        self.done = False
+
+    def direction(self, xs, ys) -> np.ndarray:
+        """
+        Direcciones unitarias (N×2) en coordenadas de mundo hacia el centro de la
+        siguiente celda del camino; (0,0) en la meta, fuera del mapa o sin camino.
+        """
+        xs = np.asarray(xs, dtype=np.float32)
+        ys = np.asarray(ys, dtype=np.float32)
+        cx, cy, inside = self.service.cells_of(xs, ys)
+        out = np.zeros((len(cx), 2), dtype=np.float32)
+        if self.steps is None or not inside.any():
+            return out
+        step = self.steps[cy[inside], cx[inside]]
+        tx, ty = self.service.cell_centers(cx[inside] + step[:, 0], cy[inside] + step[:, 1])
+        vec = np.stack([tx - xs[inside], ty - ys[inside]], axis=1)
+        norm = np.linalg.norm(vec, axis=1, keepdims=True)
+        moving = (step != 0).any(axis=1) & (norm[:, 0] > 1e-6)
+        vec[moving] /= norm[moving]
+        vec[~moving] = 0.0
+        out[inside] = vec
+        return out
+
+    def distance(self, x: float, y: float) -> float:
+        """Distancia (en celdas) a la meta; inf si no hay camino."""
+        cx, cy, inside = self.service.cells_of([x], [y])
+        if self.dist is None or not inside[0]:
+            return math.inf
+        return float(self.dist[cy[0], cx[0]])
+
+
+class PathfindingService:
+    """
+    Búsqueda de caminos sobre la WalkGrid, en una rejilla de navegación más
+    gruesa (`cell_size` píxeles por celda; transitable si al menos
+    `walk_ratio` de sus píxeles lo son).
+    - A* (8 vecinos, sin cortar esquinas) para peticiones sueltas.
+    - Campos de flujo compartidos por meta para grupos de NPC.
+    - Caché LRU de rutas; cada ruta recuerda por qué regiones pasa y
+      set_blocked() invalida solo las que cruzan la zona modificada.
+    - request_path()/request_flow_field() encolan trabajo incremental que
+      update() avanza hasta agotar `budget_ms` por frame.
+    """
+    def __init__(
+        self,
+        grid: WalkGrid,
+        cell_size: int = 8,
+        walk_ratio: float = 0.5,
+        region_size: int = 16,
+        max_paths: int = 512,
+        max_fields: int = 8,
+        budget_ms: float = 2.0,
+        slice_nodes: int = 256
+    ):
+        self.grid = grid
+        self.cell_size = cell_size
+        self.region_size = region_size
+        self.max_paths = max_paths
+        self.max_fields = max_fields
+        self.budget_ms = budget_ms
+        self.slice_nodes = slice_nodes
+        self.nav = self._build_nav(grid.array, cell_size, walk_ratio)
+        self.rows, self.cols = self.nav.shape
+        self._flat = bytearray(self.nav.ravel())  # copia plana para el bucle de A*
+        self._paths: OrderedDict[tuple, list[tuple[float, float]]] = OrderedDict()
+        self._path_regions: dict[tuple, set[int]] = {}
+        self._region_paths: dict[int, set[tuple]] = {}
+        # Búsquedas sin camino: cualquier celda que se abra puede dar ruta, así
+        # que no se archivan por región y se olvidan todas al desbloquear
+        self._failed: set[tuple] = set()
+        self._fields: OrderedDict[tuple[int, int], FlowField] = OrderedDict()
+        self._jobs: deque[tuple[object, Iterator]] = deque()
+        self._pending_fields: dict[tuple[int, int], FlowField] = {}
+        self.stats = {"searches": 0, "hits": 0, "fields": 0}
+
+    @staticmethod
+    def _build_nav(walk: np.ndarray, c: int, walk_ratio: float) -> np.ndarray:
+        h, w = walk.shape
+        rows, cols = -(-h // c), -(-w // c)
+        padded = np.zeros((rows * c, cols * c), dtype=np.float32)
+        padded[:h, :w] = walk
+        return padded.reshape(rows, c, cols, c).mean(axis=(1, 3)) >= walk_ratio
+
+    # ─── Coordenadas ─────────────────────────────────────────────────────────
+    def cells_of(self, xs, ys) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        px, py = self.grid.to_cells(xs, ys)
+        cx, cy = px // self.cell_size, py // self.cell_size
+        inside = (cx >= 0) & (cx < self.cols) & (cy >= 0) & (cy < self.rows)
+        return cx, cy, inside
+
+    def walkable(self, xs, ys) -> np.ndarray:
+        """Transitabilidad de puntos de mundo según la rejilla de navegación."""
+        cx, cy, inside = self.cells_of(xs, ys)
+        out = np.zeros(len(cx), dtype=bool)
+        out[inside] = self.nav[cy[inside], cx[inside]]
+        return out
+
+    def to_cell(self, pos) -> tuple[int, int]:
+        """Celda (cx, cy) de un punto de mundo, llevada a la transitable más cercana."""
+        cx, cy, _ = self.cells_of([pos[0]], [pos[1]])
+        return self._nearest_walkable(int(cx[0]), int(cy[0]))
+
+    def cell_centers(self, cx: np.ndarray, cy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        sx, sy = self.grid.scale
+        c = self.cell_size
+        return ((cx + 0.5) * c / sx).astype(np.float32), ((cy + 0.5) * c / sy).astype(np.float32)
+
+    def to_world(self, cell: tuple[int, int]) -> tuple[float, float]:
+        sx, sy = self.grid.scale
+        c = self.cell_size
+        return ((cell[0] + 0.5) * c / sx, (cell[1] + 0.5) * c / sy)
+
+    def _nearest_walkable(self, cx: int, cy: int) -> tuple[int, int]:
+        cx = min(max(cx, 0), self.cols - 1)
+        cy = min(max(cy, 0), self.rows - 1)
+        if self.nav[cy, cx]:
+            return cx, cy
+        ys, xs = np.nonzero(self.nav)
+        if len(xs) == 0:
+            return cx, cy
+        i = int(np.argmin((xs - cx) ** 2 + (ys - cy) ** 2))
+        return int(xs[i]), int(ys[i])
+
+    def _region(self, cell: tuple[int, int]) -> int:
+        r = self.region_size
+        return (cell[1] // r) * (-(-self.cols // r)) + cell[0] // r
+
+    # ─── A* ──────────────────────────────────────────────────────────────────
+    def _astar(self, start: tuple[int, int], goal: tuple[int, int]) -> Iterator[None]:
+        """
+        A* incremental: cede el control cada `slice_nodes` expansiones y
+        devuelve (StopIteration.value) la lista de celdas o None.
+        """
+        nav, cols, rows = self._flat, self.cols, self.rows
+        gx, gy = goal
+        s = start[1] * cols + start[0]
+        g = gy * cols + gx
+        open_heap = [(0.0, 0.0, s)]
+        came: dict[int, int] = {s: -1}
+        cost: dict[int, float] = {s: 0.0}
+        closed: set[int] = set()
+        expanded = 0
+        while open_heap:
+            _, gc, cur = heapq.heappop(open_heap)
+            if cur in closed:
+                continue
+            if cur == g:
+                path = []
+                while cur != -1:
+                    path.append((cur % cols, cur // cols))
+                    cur = came[cur]
+                path.reverse()
+                return path
+            closed.add(cur)
+            x, y = cur % cols, cur // cols
+            for dy, dx, step in NEIGHBOURS:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < cols and 0 <= ny < rows):
+                    continue
+                n = ny * cols + nx
+                if not nav[n]:
+                    continue
+                if dx and dy and not (nav[y * cols + nx] and nav[ny * cols + x]):
+                    continue  # no cortar esquinas
+                ng = gc + step
+                if ng < cost.get(n, math.inf):
+                    cost[n] = ng
+                    came[n] = cur
+                    ddx, ddy = abs(nx - gx), abs(ny - gy)
+                    # heurística octil
+                    h = (ddx + ddy) + (SQRT2 - 2.0) * min(ddx, ddy)
+                    heapq.heappush(open_heap, (ng + h, ng, n))
+            expanded += 1
+            if expanded % self.slice_nodes == 0:
+                yield
+        return None
+
+    def _waypoints(self, cells: list[tuple[int, int]] | None) -> list[tuple[float, float]]:
+        """Celdas -> puntos de mundo, quitando los intermedios en línea recta."""
+        if not cells:
+            return []
+        keep = [cells[0]]
+        for prev, cur, nxt in zip(cells, cells[1:], cells[2:]):
+            if (cur[0] - prev[0], cur[1] - prev[1]) != (nxt[0] - cur[0], nxt[1] - cur[1]):
+                keep.append(cur)
+        if len(cells) > 1:
+            keep.append(cells[-1])
+        return [self.to_world(c) for c in keep]
+
+    def _cache_path(self, key: tuple, cells: list[tuple[int, int]] | None) -> list[tuple[float, float]]:
+        path = self._waypoints(cells)
+        self._paths[key] = path
+        if not cells:
+            self._failed.add(key)
+        else:
+            regions = {self._region(c) for c in cells}
+            self._path_regions[key] = regions
+            for r in regions:
+                self._region_paths.setdefault(r, set()).add(key)
+        while len(self._paths) > self.max_paths:
+            self._forget(next(iter(self._paths)))
+        return path
+
+    def _forget(self, key: tuple) -> None:
+        self._paths.pop(key, None)
+        self._failed.discard(key)
+        for r in self._path_regions.pop(key, ()):
+            keys = self._region_paths.get(r)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._region_paths[r]
+
+    def _cached(self, key: tuple) -> list[tuple[float, float]] | None:
+        path = self._paths.get(key)
+        if path is not None:
+            self._paths.move_to_end(key)
+            self.stats["hits"] += 1
+        return path
+
+    def find_path(self, start, goal) -> list[tuple[float, float]]:
+        """Ruta (puntos de mundo) de start a goal, calculada ya. [] si no hay camino."""
+        key = (self.to_cell(start), self.to_cell(goal))
+        path = self._cached(key)
+        if path is not None:
+            return path
+        self.stats["searches"] += 1
+        return self._cache_path(key, self._run(self._astar(*key)))
+
+    def request_path(self, start, goal) -> PathRequest:
+        """Encola la búsqueda; se resuelve en update() respetando el presupuesto."""
+        key = (self.to_cell(start), self.to_cell(goal))
+        req = PathRequest(*key)
+        path = self._cached(key)
+        if path is not None:
+            req.path, req.done = path, True
+        else:
+            self._jobs.append((req, self._astar(*key)))
+        return req
+
+    # ─── Campos de flujo ─────────────────────────────────────────────────────
+    def _diag_ok(self) -> list[np.ndarray]:
+        """Por vecino, celdas desde las que ese paso es válido (sin cortar esquinas)."""
+        nav = np.pad(self.nav, 1)
+        rows, cols = self.rows, self.cols
+        masks = []
+        for dy, dx, _ in NEIGHBOURS:
+            ok = nav[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx].copy()
+            if dx and dy:
+                ok &= nav[1:rows + 1, 1 + dx:cols + 1 + dx] & nav[1 + dy:rows + 1 + dy, 1:cols + 1]
+            masks.append(ok & self.nav)
+        return masks
+
+    def _build_field(self, field: FlowField, sweeps_per_slice: int = 2) -> Iterator[None]:
+        """Relajación vectorizada (frente de onda) de distancias y luego direcciones."""
+        rows, cols = self.rows, self.cols
+        inf = np.float32(np.inf)
+        dist = np.full((rows + 2, cols + 2), inf, dtype=np.float32)
+        gx, gy = field.goal
+        dist[gy + 1, gx + 1] = 0.0
+        # coste del paso por vecino, inf donde no es válido: una suma y un mínimo por vecino
+        costs = [np.where(ok, np.float32(step), inf) for (_, _, step), ok in zip(NEIGHBOURS, self._diag_ok())]
+        shifted = [dist[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx] for dy, dx, _ in NEIGHBOURS]
+        inner = dist[1:rows + 1, 1:cols + 1]
+        prev = np.empty_like(inner)
+        cand = np.empty_like(inner)
+        sweeps = 0
+        while True:
+            prev[...] = inner
+            # en sitio: cada vecino ya ve lo relajado por los anteriores
+            for view, cost in zip(shifted, costs):
+                np.add(view, cost, out=cand)
+                np.minimum(inner, cand, out=inner)
+            if np.array_equal(prev, inner):
+                break
+            sweeps += 1
+            if sweeps % sweeps_per_slice == 0:
+                yield
+        yield
+        offsets = np.array([(dx, dy) for dy, dx, _ in NEIGHBOURS], dtype=np.int8)
+        cands = np.stack([view + cost for view, cost in zip(shifted, costs)])
+        choice = np.argmin(cands, axis=0)
+        steps = offsets[choice]
+        stuck = ~np.isfinite(inner) | (inner == 0.0)
+        steps[stuck] = 0
+        field.dist = inner.copy()
+        field.steps = steps
+        field.done = True
+        self.stats["fields"] += 1
+
+    def _store_field(self, field: FlowField) -> None:
+        self._fields[field.goal] = field
+        while len(self._fields) > self.max_fields:
+            self._fields.popitem(last=False)
+
+    def flow_field(self, goal) -> FlowField:
+        """Campo de flujo hacia goal, calculado ya (o reutilizado)."""
+        cell = self.to_cell(goal)
+        field = self._fields.get(cell)
+        if field is not None:
+            self._fields.move_to_end(cell)
+            return field
+        pending = self._pending_fields.get(cell)
+        if pending is not None:
+            # ya encolado: se termina aquí ese mismo trabajo en vez de calcularlo dos veces
+            for i, (owner, job) in enumerate(self._jobs):
+                if owner is pending:
+                    del self._jobs[i]
+                    self._finish(pending, self._run(job))
+                    return pending
+        field = FlowField(self, cell)
+        self._run(self._build_field(field))
+        self._store_field(field)
+        return field
+
+    def request_flow_field(self, goal) -> FlowField:
+        """Como flow_field, pero repartido entre frames; mira `field.done`."""
+        cell = self.to_cell(goal)
+        field = self._fields.get(cell) or self._pending_fields.get(cell)
+        if field is None:
+            field = self._pending_fields[cell] = FlowField(self, cell)
+            self._jobs.append((field, self._build_field(field)))
+        return field
+
+    # ─── Presupuesto por frame ───────────────────────────────────────────────
+    @staticmethod
+    def _run(job: Iterator[None]):
+        try:
+            while True:
+                next(job)
+        except StopIteration as stop:
+            return stop.value
+
+    def _finish(self, owner, result) -> None:
+        if isinstance(owner, FlowField):
+            if self._pending_fields.pop(owner.goal, None) is owner:
+                self._store_field(owner)
+            return
+        key = (owner.start, owner.goal)
+        owner.path = self._cached(key)
+        if owner.path is None:
+            self.stats["searches"] += 1
+            owner.path = self._cache_path(key, result)
+        owner.done = True
+
+    def update(self, budget_ms: float = None) -> int:
+        """Avanza los trabajos encolados hasta gastar el presupuesto; devuelve cuántos terminaron."""
+        budget = (self.budget_ms if budget_ms is None else budget_ms) / 1000.0
+        deadline = time.perf_counter() + budget
+        finished = 0
+        while self._jobs and time.perf_counter() < deadline:
+            owner, job = self._jobs[0]
+            if getattr(owner, "cancelled", False):
+                self._jobs.popleft()
+                continue
+            try:
+                next(job)
+            except StopIteration as stop:
+                self._jobs.popleft()
+                self._finish(owner, stop.value)
+                finished += 1
+        return finished
+
+    @property
+    def pending(self) -> int:
+        return len(self._jobs)
+
+    # ─── Cambios en el mapa ──────────────────────────────────────────────────
+    def set_blocked(self, rect: tuple[float, float, float, float], blocked: bool = True) -> None:
+        """
+        Marca un rectángulo de mundo (x, y, w, h) como bloqueado o libre e
+        invalida las rutas que pasan por sus regiones y los campos de flujo.
+        """
+        x, y, w, h = rect
+        cx, cy, _ = self.cells_of([x, x + w], [y, y + h])
+        x0, x1 = max(int(cx[0]), 0), min(int(cx[1]), self.cols - 1)
+        y0, y1 = max(int(cy[0]), 0), min(int(cy[1]), self.rows - 1)
+        if x0 > x1 or y0 > y1:
+            return
+        self.nav[y0:y1 + 1, x0:x1 + 1] = not blocked
+        self._flat = bytearray(self.nav.ravel())
+        self.invalidate_cells(x0, y0, x1, y1, opened=not blocked)
+
+    def invalidate_cells(self, x0: int, y0: int, x1: int, y1: int, opened: bool = True) -> None:
+        """
+        Olvida las rutas que cruzan esas celdas; si `opened` (se pudo abrir
+        paso), también todos los "sin camino" guardados.
+        """
+        if opened:
+            for key in list(self._failed):
+                self._forget(key)
+        r = self.region_size
+        for ry in range(y0 // r, y1 // r + 1):
+            for rx in range(x0 // r, x1 // r + 1):
+                for key in list(self._region_paths.get(self._region((rx * r, ry * r)), ())):
+                    self._forget(key)
+        # Un campo de flujo cubre todo el mapa: se recalculan en sitio (los NPC
+        # que ya lo usan siguen con el anterior hasta que termine)
+        for goal, field in self._fields.items():
+            if goal not in self._pending_fields:
+                self._pending_fields[goal] = field
+                self._jobs.append((field, None))
+        # Los trabajos a medias leían la rejilla vieja: se reinician
+        self._jobs = deque((owner, self._job_for(owner)) for owner, _ in self._jobs)
+
+    def _job_for(self, owner) -> Iterator[None]:
+        if isinstance(owner, FlowField):
+            return self._build_field(owner)
+        return self._astar(owner.start, owner.goal)
@@ -0,0 +1,235 @@
+# game/profiler.py
+
+import os
+import json
+import time
+import threading
+from collections import deque, defaultdict
+from functools import wraps
+
+
+class _NullScope:
+    """Ámbito vacío: lo que devuelve scope() con el perfilador apagado."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class _Scope:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class Profiler:
+    """
+    Perfilador por subsistemas.
+    - scope(name) mide un bloque (`with profiler.scope("db.search"): ...`),
+      desde cualquier hilo; @profiled(name) hace lo mismo con una función.
+    - begin_frame()/end_frame() delimitan frames: se guardan, para los últimos
+      `window` frames, el tiempo total y el de cada ámbito, y stats() da p50/p95/máx.
+      Solo cuentan en el frame los ámbitos del hilo que llama a begin_frame();
+      los de otros hilos (diálogo, assets, escritor) van aparte, por llamada,
+      en `background`: no ocupan tiempo del hilo principal.
+    - Cada medida queda además como evento "X" de Chrome trace; export_trace()
+      escribe el JSON que abren chrome://tracing o Perfetto.
+    Apagado (enabled=False), scope() devuelve un ámbito vacío compartido y
+    el coste se reduce a una llamada y una comprobación.
+    """
+    def __init__(self, enabled: bool = False, window: int = 240, max_events: int = 500_000):
+        self.enabled = enabled
+        self.window = window
+        self.max_events = max_events
+        self.frames: deque[float] = deque(maxlen=window)
+        self.scopes: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.background: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.events: list[dict] = []
+        self.dropped = 0
+        self._frame_totals: dict[str, float] = defaultdict(float)
+        self._frame_start: int | None = None
+        self._frame_thread: int | None = None
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    # ─── Medición ────────────────────────────────────────────────────────────
+    def scope(self, name: str):
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _Scope(self, name)
+
+    def _record(self, name: str, start: int, end: int) -> None:
+        dur_ms = (end - start) / 1e6
+        tid = threading.get_ident()
+        with self._lock:
+            if self._frame_thread is None or tid == self._frame_thread:
+                self._frame_totals[name] += dur_ms
+            else:
+                self.background[name].append(dur_ms)
+            if len(self.events) < self.max_events:
+                self.events.append({
+                    "name": name, "cat": name.split(".", 1)[0], "ph": "X",
+                    "ts": (start - self._t0) / 1000, "dur": (end - start) / 1000,
+                    "pid": self._pid, "tid": tid,
+                })
+            else:
+                self.dropped += 1
+
+    def begin_frame(self) -> None:
+        if self.enabled:
+            self._frame_thread = threading.get_ident()
+            self._frame_start = time.perf_counter_ns()
+
+    def end_frame(self) -> None:
+        if not self.enabled or self._frame_start is None:
+            return
+        end = time.perf_counter_ns()
+        self._record("frame", self._frame_start, end)
+        self._frame_start = None
+        with self._lock:
+            totals, self._frame_totals = self._frame_totals, defaultdict(float)
+        self.frames.append(totals.pop("frame"))
+        # los ámbitos que no aparecieron en este frame cuentan como 0
+        for name in set(self.scopes) | set(totals):
+            self.scopes[name].append(totals.get(name, 0.0))
+
+    def set_enabled(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self._frame_start = None
+        with self._lock:
+            self._frame_totals.clear()
+
+    # ─── Resultados ──────────────────────────────────────────────────────────
+    @staticmethod
+    def _summary(values) -> dict:
+        ordered = sorted(values)
+        return {
+            "p50": _percentile(ordered, 50),
+            "p95": _percentile(ordered, 95),
+            "max": ordered[-1] if ordered else 0.0,
+        }
+
+    def stats(self) -> dict:
+        """
+        {'frame': {p50, p95, max}, 'scopes': {nombre: {...}}} en ms por frame, y
+        'background': {nombre: {...}} en ms por llamada (ámbitos de otros hilos).
+        """
+        with self._lock:
+            background = {name: list(vals) for name, vals in self.background.items()}
+        return {
+            "frame": self._summary(self.frames),
+            "scopes": {name: self._summary(vals) for name, vals in self.scopes.items()},
+            "background": {name: self._summary(vals) for name, vals in background.items()},
+        }
+
+    def export_trace(self, path: str) -> str:
+        with self._lock:
+            events = list(self.events)
+        meta = [{
+            "name": "thread_name", "ph": "M", "pid": self._pid, "tid": t.ident,
+            "args": {"name": t.name},
+        } for t in threading.enumerate()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms",
+                       "otherData": {"dropped_events": self.dropped}}, f)
+        return path
+
+    # ─── Overlay ─────────────────────────────────────────────────────────────
+    def overlay_lines(self, top: int = 6) -> list[str]:
+        s = self.stats()
+        f = s["frame"]
+        lines = [f"frame  p50 {f['p50']:5.1f}  p95 {f['p95']:5.1f}  max {f['max']:5.1f} ms"]
+        ranked = sorted(s["scopes"].items(), key=lambda kv: kv[1]["p95"], reverse=True)
+        for name, v in ranked[:top]:
+            lines.append(f"{name:<14} {v['p50']:5.2f} {v['p95']:5.2f} {v['max']:6.2f}")
+        # otros hilos, por llamada (no suman al frame)
+        ranked = sorted(s["background"].items(), key=lambda kv: kv[1]["p95"], reverse=True)
+        for name, v in ranked[:top // 2]:
+            lines.append(f"~{name:<13} {v['p50']:5.2f} {v['p95']:5.2f} {v['max']:6.2f}")
+        return lines
+
+
+class ProfilerOverlay:
+    """
+    Panel con las estadísticas del perfilador. El texto se regenera como mucho
+    cada `refresh` segundos para que el propio overlay no distorsione la medida.
+    """
+    def __init__(self, profiler: Profiler, font, refresh: float = 0.5):
+        self.profiler = profiler
+        self.font = font
+        self.refresh = refresh
+        self.visible = False
+        self._always_on = profiler.enabled  # encendido desde fuera (RPG_PROFILE=1)
+        self._panel = None
+        self._last = 0.0
+
+    def toggle(self) -> None:
+        self.visible = not self.visible
+        self.profiler.set_enabled(self.visible or self._always_on)
+
+    def draw(self, surface) -> None:
+        if not self.visible:
+            return
+        import pygame
+        now = time.perf_counter()
+        if self._panel is None or now - self._last >= self.refresh:
+            self._last = now
+            lines = [self.font.render(line, True, (230, 230, 120)) for line in self.profiler.overlay_lines()]
+            w = max(s.get_width() for s in lines) + 12
+            h = sum(s.get_height() + 2 for s in lines) + 10
+            self._panel = pygame.Surface((w, h), pygame.SRCALPHA)
+            self._panel.fill((0, 0, 0, 170))
+            y = 5
+            for s in lines:
+                self._panel.blit(s, (6, y))
+                y += s.get_height() + 2
+        surface.blit(self._panel, (surface.get_width() - self._panel.get_width() - 8, 8))
+
+
+_profiler = Profiler(enabled=os.getenv("RPG_PROFILE") == "1")
+
+
+def get_profiler() -> Profiler:
+    return _profiler
+
+
+def profile_scope(name: str):
+    """Atajo: `with profile_scope("llm.complete"): ...` sobre el perfilador compartido."""
+    return _profiler.scope(name)
+
+
+def profiled(name: str):
+    """Decorador: mide cada llamada a la función con el perfilador compartido."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _profiler.enabled:
+                return fn(*args, **kwargs)
+            with _Scope(_profiler, name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,235 @@
+# game/prompt.py
+
+import re
+import threading
+from typing import Callable
+from game.db import DB_FILENAME, get_store, get_writer
+
+_ENCODING = None
+_ENCODING_LOADED = False
+_ENCODING_LOCK = threading.Lock()
+
+
+def _encoding():
+    """
+    Codificador de tiktoken, cargado la primera vez que se cuentan tokens (None si no está).
+    Los hilos que llegan durante la carga la esperan: nadie cuenta con la estimación
+    mientras tanto, así los presupuestos no cambian de una llamada a otra.
+    """
+    global _ENCODING, _ENCODING_LOADED
+    if not _ENCODING_LOADED:
+        with _ENCODING_LOCK:
+            if not _ENCODING_LOADED:
+                try:
+                    import tiktoken
+                    _ENCODING = tiktoken.get_encoding("cl100k_base")
+                except Exception:  # tiktoken es opcional
+                    _ENCODING = None
+                _ENCODING_LOADED = True
+    return _ENCODING
+
+
+def count_tokens(text: str) -> int:
+    """Tokens de `text`; sin tiktoken se estima ~4 caracteres por token."""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(1, (len(text) + 3) // 4)
+
+
+# Pistas de que una línea guarda un hecho que conviene no olvidar:
+# nombres propios a mitad de frase, cifras y verbos de promesas o sucesos.
+_PROPER_NAME = re.compile(r"[^.!?¡¿\s]\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+")
+_SALIENT = re.compile(
+    r"\d|\b(?:promet\w*|jur\w*|deb\w*|misi[oó]n\w*|llam[oaé]\w*|nombre|"
+    r"mat\w*|rob\w*|muri\w*|salv\w*|regal\w*|encontr\w*|perd\w*|"
+    r"ayud\w*|tesoro|llave|oro|monedas?)\b",
+    re.IGNORECASE,
+)
+
+
+def is_salient(line: str) -> bool:
+    """True si la línea parece un hecho duradero (nombre, promesa, suceso)."""
+    return _PROPER_NAME.search(line) is not None or _SALIENT.search(line) is not None
+
+
+class ExtractiveSummarizer:
+    """
+    Resumen incremental sin modelo: añade las líneas nuevas al resumen anterior
+    y, si se pasa de `max_tokens`, descarta primero las líneas triviales más
+    antiguas (saludos, relleno) y solo después las destacadas (`is_salient`:
+    nombres, promesas, sucesos), también de la más antigua a la más nueva.
+    Determinista y gratuito; el tamaño del resumen nunca pasa del límite.
+    Contrapartida: no comprime, solo elige qué líneas sobreviven, así que
+    con historias largas los hechos viejos acaban cayendo igualmente y los
+    triviales recientes ocupan sitio. Con un backend real, LLMSummarizer
+    reescribe el resumen y conserva más en el mismo presupuesto, a cambio de
+    una llamada al modelo por pliegue.
+    """
+    def __init__(self, max_tokens: int = 300, max_line_chars: int = 160):
+        self.max_tokens = max_tokens
+        self.max_line_chars = max_line_chars
+
+    def __call__(self, npc_name: str, summary: str, lines: list[str]) -> str:
+        kept = [ln for ln in summary.split("\n") if ln]
+        for ln in lines:
+            ln = " ".join(ln.split())
+            if len(ln) > self.max_line_chars:
+                ln = ln[:self.max_line_chars - 1] + "…"
+            kept.append(ln)
+        costs = [count_tokens(ln) for ln in kept]
+        total = sum(costs)
+        if total <= self.max_tokens:
+            return "\n".join(kept)
+        # orden de descarte: triviales y luego destacadas, cada grupo de viejo a nuevo
+        order = sorted(range(len(kept)), key=lambda i: (is_salient(kept[i]), i))
+        dropped = set()
+        for i in order:
+            if total <= self.max_tokens:
+                break
+            dropped.add(i)
+            total -= costs[i]
+        return "\n".join(ln for i, ln in enumerate(kept) if i not in dropped)
+
+
+class LLMSummarizer:
+    """
+    Resumen incremental con el backend de diálogo: le pasa el resumen anterior
+    y solo las líneas nuevas. Si el backend falla, devuelve un texto vacío o se
+    pasa de `max_tokens` (el límite del prompt es solo una petición), recurre al
+    extractivo: el resumen guardado nunca supera el límite.
+    """
+    def __init__(self, backend, max_tokens: int = 300):
+        self.backend = backend
+        self.max_tokens = max_tokens
+        self.fallback = ExtractiveSummarizer(max_tokens)
+
+    def __call__(self, npc_name: str, summary: str, lines: list[str]) -> str:
+        messages = [
+            {"role": "system", "content": (
+                f"Resume en tercera persona, en menos de {self.max_tokens} tokens, lo que "
+                f"{npc_name} recuerda del jugador. Conserva nombres, promesas y hechos."
+            )},
+            {"role": "user", "content": (
+                f"Resumen anterior:\n{summary or '(vacío)'}\n\nNuevas líneas:\n" + "\n".join(lines)
+            )},
+        ]
+        try:
+            text = self.backend.complete(npc_name, messages).strip()
+        except Exception:
+            return self.fallback(npc_name, summary, lines)
+        if not text or count_tokens(text) > self.max_tokens:
+            return self.fallback(npc_name, summary, lines)
+        return text
+
+
+class PromptBuilder:
+    """
+    Arma el prompt de sistema de un NPC dentro de un presupuesto de tokens:
+    resumen acumulado de la historia antigua + los turnos más recientes tal cual.
+    Cuando se acumulan `summarize_batch` líneas fuera de la ventana reciente,
+    se pliegan en el resumen (guardado en la tabla summaries) sin releer
+    la historia ya resumida, así el tamaño del prompt se mantiene estable.
+    Si se pasa el mensaje del jugador, se añaden hasta `relevant_k` recuerdos
+    antiguos relevantes (FTS5), sin repetir los que ya van en el resumen o en la
+    ventana reciente, usando como mucho `relevant_share` del presupuesto.
+    """
+    def __init__(
+        self,
+        token_budget: int = 1200,
+        recent_turns: int = 12,
+        summarize_batch: int = 8,
+        max_folds_per_call: int = 4,
+        relevant_k: int = 4,
+        relevant_share: float = 0.25,
+        summarizer: Callable[[str, str, list[str]], str] = None,
+        db_filename: str = DB_FILENAME
+    ):
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.summarize_batch = summarize_batch
+        self.max_folds_per_call = max_folds_per_call
+        self.relevant_k = relevant_k
+        self.relevant_share = relevant_share
+        self.summarizer = summarizer if summarizer is not None else ExtractiveSummarizer()
+        self.db_filename = db_filename
+
+    def _fold(self, npc_name: str, player_name: str) -> tuple[str, int, list[tuple[int | None, str]]]:
+        """Pliega lotes antiguos en el resumen y devuelve (resumen, upto_id, filas sin resumir)."""
+        store = get_store(self.db_filename)
+        writer = get_writer(self.db_filename)
+        summary, upto_id = store.load_summary(npc_name, player_name)
+        window = self.recent_turns + self.summarize_batch
+        for _ in range(self.max_folds_per_call):
+            rows = writer.load_rows(npc_name, player_name, upto_id, window)
+            if len(rows) < window:
+                return summary, upto_id, rows
+            old = store.load_rows_after(npc_name, player_name, upto_id, self.summarize_batch)
+            if not old:
+                return summary, upto_id, rows
+            summary = self.summarizer(npc_name, summary, [m for _, m in old])
+            upto_id = old[-1][0]
+            store.save_summary(npc_name, player_name, summary, upto_id)
+        return summary, upto_id, writer.load_rows(npc_name, player_name, upto_id, window)
+
+    def _relevant(
+        self,
+        npc_name: str,
+        player_name: str,
+        query: str,
+        rows: list[tuple[int | None, str]],
+        summary: str,
+        budget: int
+    ) -> list[str]:
+        if not query or self.relevant_k <= 0:
+            return []
+        seen_ids = {i for i, _ in rows if i is not None}
+        seen_text = {m for _, m in rows}
+        hits = get_store(self.db_filename).search(
+            npc_name, player_name, query, self.relevant_k + len(seen_ids)
+        )
+        found = []
+        for mem_id, memory, _score in hits:
+            if mem_id in seen_ids or memory in seen_text or memory in summary:
+                continue
+            cost = count_tokens(memory) + 1
+            if cost > budget:
+                break
+            budget -= cost
+            seen_text.add(memory)
+            found.append((mem_id, memory))
+            if len(found) == self.relevant_k:
+                break
+        # en orden cronológico, como el resto de la memoria
+        return [m for _, m in sorted(found)]
+
+    def build(self, npc_name: str, player_name: str, query: str = None) -> tuple[str, list[str]]:
+        """
+        Devuelve (prompt de sistema, líneas de memoria incluidas tal cual).
+        `query` (normalmente el mensaje del jugador) activa la búsqueda por relevancia.
+        """
+        summary, _, rows = self._fold(npc_name, player_name)
+        header = f"Tú eres **{npc_name}**."
+        if summary:
+            header += f"\nLo que recuerdas de antes:\n{summary}"
+        budget = self.token_budget - count_tokens(header)
+        relevant = self._relevant(
+            npc_name, player_name, query, rows, summary, int(budget * self.relevant_share)
+        )
+        if relevant:
+            header += "\nRecuerdos relacionados:\n" + "\n".join(f"- {m}" for m in relevant)
+        header += "\nRecuerda estas líneas de tu memoria:\n"
+
+        budget = self.token_budget - count_tokens(header)
+        recent: list[str] = []
+        # de la más nueva a la más vieja, hasta agotar el presupuesto
+        for _, memory in reversed(rows):
+            cost = count_tokens(memory) + 1
+            if cost > budget:
+                break
+            budget -= cost
+            recent.append(memory)
+        recent.reverse()
+        return header + "\n".join(f"- {m}" for m in recent), relevant + recent
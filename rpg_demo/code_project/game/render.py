@@ -0,0 +1,105 @@
+# game/render.py
+
+from typing import Callable, Hashable, NamedTuple
+import pygame
+
+
+class Drawable(NamedTuple):
+    """Algo que se pinta en pantalla: clave estable, límites actuales, estado y cómo dibujarlo."""
+    key: Hashable
+    rect: pygame.Rect
+    state: Hashable
+    draw: Callable[[], None]
+
+
+class DirtyRenderer:
+    """
+    Modo de pintado por rectángulos sucios.
+    Cada frame se le pasan los Drawable de la escena; compara sus límites y
+    estado con los del frame anterior y solo repinta (fondo + lo que se solape)
+    las zonas que cambiaron, llamando a pygame.display.update(rects).
+    Si no cambió nada, el frame se omite por completo.
+    invalidate() fuerza un repintado completo (cambio de escena, cámara, etc.).
+    """
+    def __init__(self, screen: pygame.Surface, merge_slack: int = 0):
+        self.screen = screen
+        self.bounds = screen.get_rect()
+        self.merge_slack = merge_slack
+        self.full = True
+        self._prev: dict[Hashable, tuple[pygame.Rect, Hashable]] = {}
+        self._dirty: list[pygame.Rect] = []
+        self.stats = {"full": 0, "partial": 0, "skipped": 0}
+
+    def invalidate(self) -> None:
+        self.full = True
+
+    def mark(self, rect: pygame.Rect) -> None:
+        rect = pygame.Rect(rect).clip(self.bounds)
+        if rect.w and rect.h:
+            self._dirty.append(rect)
+
+    def _track(self, drawables: list[Drawable]) -> None:
+        current = {}
+        for d in drawables:
+            current[d.key] = (d.rect, d.state)
+            prev = self._prev.get(d.key)
+            if prev is None:
+                self.mark(d.rect)
+            elif prev[0] != d.rect or prev[1] != d.state:
+                self.mark(prev[0])
+                self.mark(d.rect)
+        # lo que desapareció deja su hueco sucio
+        for key, (rect, _) in self._prev.items():
+            if key not in current:
+                self.mark(rect)
+        self._prev = current
+
+    def _merged(self) -> list[pygame.Rect]:
+        """Une los rectángulos que se solapan (o casi) para pintar menos veces."""
+        rects = self._dirty
+        self._dirty = []
+        merged: list[pygame.Rect] = []
+        slack = self.merge_slack
+        for r in rects:
+            r = r.copy()
+            changed = True
+            while changed:
+                changed = False
+                for i, m in enumerate(merged):
+                    if r.inflate(slack, slack).colliderect(m):
+                        r.union_ip(merged.pop(i))
+                        changed = True
+                        break
+            merged.append(r)
+        return merged
+
+    def present(self, background: Callable[[pygame.Rect | None], None], drawables: list[Drawable]) -> bool:
+        """
+        Pinta el frame. `background(rect)` restaura el fondo bajo `rect`
+        (o entero si rect es None). Devuelve False si el frame se omitió.
+        """
+        self._track(drawables)
+        screen = self.screen
+        if self.full:
+            self.full = False
+            self._dirty = []
+            background(None)
+            for d in drawables:
+                d.draw()
+            pygame.display.flip()
+            self.stats["full"] += 1
+            return True
+        rects = self._merged()
+        if not rects:
+            self.stats["skipped"] += 1
+            return False
+        for r in rects:
+            screen.set_clip(r)
+            background(r)
+            for d in drawables:
+                if d.rect.colliderect(r):
+                    d.draw()
+        screen.set_clip(None)
+        pygame.display.update(rects)
+        self.stats["partial"] += 1
+        return True
@@ -0,0 +1,486 @@
+# game/snapshot.py
+"""
+Instantáneas binarias del estado del mundo con deltas incrementales.
+
+    python -m game.snapshot --bench --npcs 1000
+
+Formato de `<ruta>` (instantánea completa, little-endian):
+    cabecera  _HEADER: magia, versión, generación, tiempo de simulación, largo del manifiesto
+    manifiesto JSON: nombres (NPC, atributos, emociones), eventos recientes y,
+                por array, su desplazamiento, forma y dtype
+    arrays    float32 contiguos, alineados a 64 bytes: se leen con np.memmap
+Formato de `<ruta>.delta` (registro de solo anexado entre instantáneas):
+    por registro _DELTA: magia, generación, tiempo, nº de secciones, largo del JSON;
+    JSON con los eventos recientes; y por sección que cambió, _SECTION
+    (id, nº de celdas) seguido de índices planos int32 y valores float32.
+Los deltas llevan la generación de su instantánea: si no coincide (o el
+registro quedó a medias) se ignoran desde ahí.
+"""
+
+import os
+import json
+import time
+import struct
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+import numpy as np
+
+_MAGIC = b"RPGW"
+_DELTA_MAGIC = b"RPGD"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHQdI")
+_DELTA = struct.Struct("<4sQdII")
+_SECTION = struct.Struct("<BI")
+_ALIGN = 64
+
+# Arrays del mundo, en el orden de sus ids en los deltas
+SECTIONS = ("positions", "social", "emotions")
+
+log = logging.getLogger(__name__)
+
+
+class WorldState:
+    """
+    Estado del mundo como arrays empaquetados:
+    - positions: NPC × 2 (x, y), en el orden de `npcs`
+    - social: atributos × actores × actores (SocialNetwork.values)
+    - emotions: actores × emociones (EmotionEngine.table)
+    - events: eventos recientes [(nombre, descripción)]
+    capture() copia los arrays (es lo único que paga el hilo del juego al
+    autoguardar); apply() devuelve el estado a los objetos del juego.
+    """
+    __slots__ = (
+        "time", "npcs", "positions", "social_attrs", "social_actors", "social",
+        "emotion_names", "emotion_actors", "emotions", "events"
+    )
+
+    def __init__(
+        self,
+        time: float = 0.0,
+        npcs: list[str] = (),
+        positions: np.ndarray = None,
+        social_attrs: list[str] = (),
+        social_actors: list[str] = (),
+        social: np.ndarray = None,
+        emotion_names: list[str] = (),
+        emotion_actors: list[str] = (),
+        emotions: np.ndarray = None,
+        events: list[tuple[str, str]] = ()
+    ):
+        self.time = float(time)
+        self.npcs = list(npcs)
+        self.positions = np.zeros((0, 2), dtype=np.float32) if positions is None else positions
+        self.social_attrs = list(social_attrs)
+        self.social_actors = list(social_actors)
+        self.social = np.zeros((0, 0, 0), dtype=np.float32) if social is None else social
+        self.emotion_names = list(emotion_names)
+        self.emotion_actors = list(emotion_actors)
+        self.emotions = np.zeros((0, 0), dtype=np.float32) if emotions is None else emotions
+        self.events = [tuple(ev) for ev in events]
+
+    @classmethod
+    def capture(
+        cls,
+        npcs: list[str],
+        positions,
+        social=None,
+        emotions=None,
+        events=None,
+        time: float = 0.0
+    ) -> 'WorldState':
+        """
+        `positions` es un array N×2 o una secuencia de (x, y)/Vector2;
+        social, emotions y events son la SocialNetwork, el EmotionEngine y
+        el EventManager del juego (cualquiera puede ser None).
+        """
+        state = cls(time=time, npcs=npcs)
+        state.positions = np.array(positions, dtype=np.float32).reshape(-1, 2)
+        if social is not None:
+            state.social_attrs = list(social.attr_names)
+            state.social_actors = list(social.names)
+            state.social = social.values.copy()
+        if emotions is not None:
+            state.emotion_names = list(emotions.emotion_names)
+            state.emotion_actors = list(emotions.names)
+            state.emotions = emotions.table.copy()
+        if events is not None:
+            state.events = list(events.recent_events)
+        return state
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {"positions": self.positions, "social": self.social, "emotions": self.emotions}
+
+    def same_layout(self, other: 'WorldState') -> bool:
+        """True si los nombres y formas coinciden (y por tanto cabe un delta)."""
+        return (
+            self.npcs == other.npcs
+            and self.social_attrs == other.social_attrs
+            and self.social_actors == other.social_actors
+            and self.emotion_names == other.emotion_names
+            and self.emotion_actors == other.emotion_actors
+            and all(a.shape == b.shape for a, b in zip(self.arrays().values(), other.arrays().values()))
+        )
+
+    def position(self, npc: str) -> tuple[float, float] | None:
+        try:
+            x, y = self.positions[self.npcs.index(npc)]
+        except ValueError:
+            return None
+        return float(x), float(y)
+
+    def apply(self, social=None, emotions=None, events=None) -> None:
+        """
+        Vuelca el estado en la SocialNetwork, el EmotionEngine y el EventManager
+        dados. Atributos, emociones y actores se casan por nombre; los que el
+        juego no conoce se añaden. Las posiciones se leen con position().
+        """
+        if social is not None and self.social_attrs:
+            for actor in self.social_actors:
+                social.add_actor(actor)
+            rows = [social.index[a] for a in self.social_actors]
+            for i, attr in enumerate(self.social_attrs):
+                a = social.attr_index.get(attr)
+                if a is not None:
+                    social.values[a][np.ix_(rows, rows)] = self.social[i]
+        if emotions is not None and self.emotion_names:
+            for actor in self.emotion_actors:
+                emotions.add_actor(actor)
+            rows = [emotions.index[a] for a in self.emotion_actors]
+            for i, name in enumerate(self.emotion_names):
+                col = emotions.emotion_index.get(name)
+                if col is not None:
+                    emotions.table[rows, col] = self.emotions[:, i]
+        if events is not None:
+            events.recent_events.clear()
+            events.recent_events.extend(self.events)
+
+
+# ─── Instantánea completa ────────────────────────────────────────────────────
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def delta_path(path: str) -> str:
+    return path + ".delta"
+
+
+def write_snapshot(path: str, state: WorldState, generation: int = None) -> int:
+    """
+    Escribe una instantánea completa (fichero temporal + os.replace) y vacía
+    el registro de deltas. Devuelve la generación, que deben llevar los deltas.
+    """
+    generation = time.time_ns() if generation is None else generation
+    arrays = {name: np.ascontiguousarray(arr, dtype="<f4") for name, arr in state.arrays().items()}
+    layout = {}
+    offset = 0
+    for name, arr in arrays.items():
+        layout[name] = {"offset": offset, "shape": list(arr.shape), "dtype": "<f4"}
+        offset = _aligned(offset + arr.nbytes)
+    manifest = json.dumps({
+        "npcs": state.npcs,
+        "social_attrs": state.social_attrs,
+        "social_actors": state.social_actors,
+        "emotion_names": state.emotion_names,
+        "emotion_actors": state.emotion_actors,
+        "events": state.events,
+        "arrays": layout,
+    }, ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(_HEADER.size + len(manifest))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, generation, state.time, len(manifest)))
+        f.write(manifest)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+    # deltas de la generación anterior: ya no aplican
+    with open(delta_path(path), "wb"):
+        pass
+    return generation
+
+
+def read_snapshot(path: str, mmap: bool = True) -> tuple[WorldState, int]:
+    """
+    Lee una instantánea completa. Con mmap=True los arrays son np.memmap
+    copy-on-write: no se leen del disco hasta tocarlos y se pueden modificar
+    sin alterar el fichero. Devuelve (estado, generación).
+    """
+    with open(path, "rb") as f:
+        magic, version, _, generation, sim_time, manifest_len = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{path} no es una instantánea del mundo")
+        if version != _VERSION:
+            raise ValueError(f"Versión de instantánea no soportada: {version}")
+        manifest = json.loads(f.read(manifest_len).decode("utf-8"))
+    data_start = _aligned(_HEADER.size + manifest_len)
+    arrays = {}
+    for name, info in manifest["arrays"].items():
+        shape = tuple(info["shape"])
+        if mmap and all(shape):
+            arrays[name] = np.memmap(path, dtype=info["dtype"], mode="c", offset=data_start + info["offset"], shape=shape)
+        else:
+            count = int(np.prod(shape))
+            arrays[name] = np.fromfile(path, dtype=info["dtype"], count=count, offset=data_start + info["offset"]).reshape(shape)
+    state = WorldState(
+        time=sim_time,
+        npcs=manifest["npcs"],
+        social_attrs=manifest["social_attrs"],
+        social_actors=manifest["social_actors"],
+        emotion_names=manifest["emotion_names"],
+        emotion_actors=manifest["emotion_actors"],
+        events=manifest["events"],
+        **arrays
+    )
+    return state, generation
+
+
+# ─── Deltas ──────────────────────────────────────────────────────────────────
+def encode_delta(generation: int, base: WorldState, state: WorldState) -> bytes:
+    """Registro con las celdas de `state` que difieren de `base` (misma disposición)."""
+    sections = []
+    base_arrays = base.arrays()
+    for sid, (name, arr) in enumerate(state.arrays().items()):
+        old = base_arrays[name].reshape(-1)
+        new = arr.reshape(-1)
+        idx = np.flatnonzero(old != new).astype("<i4")
+        if len(idx):
+            sections.append(_SECTION.pack(sid, len(idx)) + idx.tobytes() + new[idx].astype("<f4").tobytes())
+    meta = json.dumps({"events": state.events}, ensure_ascii=False).encode("utf-8")
+    header = _DELTA.pack(_DELTA_MAGIC, generation, state.time, len(sections), len(meta))
+    return header + meta + b"".join(sections)
+
+
+def apply_deltas(path: str, state: WorldState, generation: int) -> int:
+    """Aplica sobre `state` los deltas de `path` con esa generación; devuelve cuántos."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return 0
+    arrays = [arr.reshape(-1) for arr in state.arrays().values()]
+    pos = applied = 0
+    while pos + _DELTA.size <= len(data):
+        magic, gen, sim_time, n_sections, meta_len = _DELTA.unpack_from(data, pos)
+        if magic != _DELTA_MAGIC or gen != generation:
+            break
+        end = pos + _DELTA.size + meta_len
+        updates = []
+        ok = end <= len(data)
+        for _ in range(n_sections if ok else 0):
+            if end + _SECTION.size > len(data):
+                ok = False
+                break
+            sid, count = _SECTION.unpack_from(data, end)
+            end += _SECTION.size
+            if sid >= len(arrays) or end + count * 8 > len(data):
+                ok = False
+                break
+            idx = np.frombuffer(data, dtype="<i4", count=count, offset=end)
+            vals = np.frombuffer(data, dtype="<f4", count=count, offset=end + count * 4)
+            updates.append((sid, idx, vals))
+            end += count * 8
+        if not ok:
+            break  # registro a medias (cierre durante la escritura)
+        meta = json.loads(data[pos + _DELTA.size:pos + _DELTA.size + meta_len].decode("utf-8"))
+        for sid, idx, vals in updates:
+            arrays[sid][idx] = vals
+        state.time = sim_time
+        state.events = [tuple(ev) for ev in meta["events"]]
+        applied += 1
+        pos = end
+    return applied
+
+
+def load_world(path: str, mmap: bool = True) -> WorldState | None:
+    """Instantánea + sus deltas, o None si no hay partida guardada en `path`."""
+    if not os.path.exists(path):
+        return None
+    state, generation = read_snapshot(path, mmap)
+    apply_deltas(delta_path(path), state, generation)
+    return state
+
+
+class WorldSaver:
+    """
+    Autoguardado en segundo plano.
+    autosave(state) recibe un WorldState ya capturado y deja la escritura a un
+    hilo propio: el primer guardado (y cada `full_every` deltas, o si cambia la
+    disposición del mundo, o si el registro supera `max_delta_ratio` del
+    tamaño de la instantánea) escribe una instantánea completa; el resto anexa
+    solo lo que cambió desde el guardado anterior.
+    Si el guardado anterior aún no terminó, el nuevo espera en una cola de
+    uno (el más reciente sustituye al pendiente): el hilo del juego nunca se
+    bloquea esperando al disco.
+    Un error de escritura se registra en el log en cuanto ocurre y queda en
+    `error`; el siguiente guardado vuelve a ser una instantánea completa.
+    """
+    def __init__(self, path: str, full_every: int = 100, max_delta_ratio: float = 0.5):
+        self.path = path
+        self.full_every = full_every
+        self.max_delta_ratio = max_delta_ratio
+        self._base: WorldState | None = None
+        self._generation: int | None = None
+        self._deltas = 0
+        self._pending: deque[WorldState] = deque(maxlen=1)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+        self._future: Future | None = None
+        self.error: Exception | None = None
+        self.stats = {"full": 0, "delta": 0, "coalesced": 0, "failed": 0, "bytes": 0, "write_s": 0.0}
+
+    def autosave(self, state: WorldState) -> None:
+        with self._lock:
+            if self._pending:
+                self.stats["coalesced"] += 1
+            self._pending.append(state)
+            if self._future is None:
+                self._future = self._executor.submit(self._drain)
+
+    def save_full(self, state: WorldState) -> None:
+        """Fuerza una instantánea completa en el siguiente guardado."""
+        with self._lock:
+            self._base = None
+        self.autosave(state)
+
+    def _drain(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._future = None
+                        return
+                    state = self._pending.popleft()
+                    base = self._base
+                try:
+                    self._write(base, state)
+                except Exception as exc:
+                    log.exception("No se pudo autoguardar el mundo en %s", self.path)
+                    with self._lock:
+                        self.error = exc
+                        self.stats["failed"] += 1
+                        # el fichero pudo quedar a medias: la próxima vez, completa
+                        self._base = None
+        except BaseException:
+            with self._lock:
+                self._future = None
+            raise
+
+    def _write(self, base: WorldState | None, state: WorldState) -> None:
+        t = time.perf_counter()
+        if self._needs_full(base, state):
+            self._generation = write_snapshot(self.path, state)
+            self._deltas = 0
+            self.stats["full"] += 1
+            self.stats["bytes"] += os.path.getsize(self.path)
+        else:
+            record = encode_delta(self._generation, base, state)
+            with open(delta_path(self.path), "ab") as f:
+                f.write(record)
+            self._deltas += 1
+            self.stats["delta"] += 1
+            self.stats["bytes"] += len(record)
+        self.stats["write_s"] += time.perf_counter() - t
+        with self._lock:
+            # save_full() pudo pedir una completa mientras tanto: se respeta
+            if self._base is base:
+                self._base = state
+
+    def _needs_full(self, base: WorldState | None, state: WorldState) -> bool:
+        if base is None or self._generation is None or not base.same_layout(state):
+            return True
+        if self.full_every and self._deltas >= self.full_every:
+            return True
+        try:
+            return os.path.getsize(delta_path(self.path)) > self.max_delta_ratio * os.path.getsize(self.path)
+        except OSError:
+            return True
+
+    def flush(self) -> None:
+        """Espera a que termine lo pendiente (los errores de escritura ya se registraron)."""
+        while True:
+            with self._lock:
+                future = self._future
+            if future is None:
+                return
+            future.result()
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+
+def run_benchmark(n_npcs: int, saves: int = 20, ticks_between: int = 60, seed: int = 0, path: str = None) -> dict:
+    """
+    Autoguardado de una HeadlessSimulation de `n_npcs` NPC: coste de la
+    captura en el hilo del juego, de cada escritura (completa y delta) y de la carga.
+    """
+    import shutil
+    import tempfile
+    from game.headless import HeadlessSimulation
+
+    tmp = tempfile.mkdtemp(prefix="rpg_snapshot_") if path is None else None
+    path = path or os.path.join(tmp, "world.snap")
+    sim = HeadlessSimulation(n_npcs, seed=seed)
+    saver = WorldSaver(path, full_every=0, max_delta_ratio=float("inf"))
+    capture_ms, full_ms, delta_ms = [], [], []
+    try:
+        for i in range(saves):
+            sim.run(ticks_between)
+            t = time.perf_counter()
+            state = WorldState.capture(
+                sim.names, sim.crowd.pos, sim.social, sim.emotions, sim.events, sim.events.scheduler.now
+            )
+            capture_ms.append((time.perf_counter() - t) * 1000)
+            before = saver.stats["write_s"]
+            saver.autosave(state)
+            saver.flush()
+            (full_ms if i == 0 else delta_ms).append((saver.stats["write_s"] - before) * 1000)
+        t = time.perf_counter()
+        loaded = load_world(path)
+        load_ms = (time.perf_counter() - t) * 1000
+        ok = bool(np.array_equal(loaded.positions, state.positions) and np.array_equal(loaded.social, state.social)
+                  and np.array_equal(loaded.emotions, state.emotions))
+        return {
+            "npcs": n_npcs,
+            "saves": saves,
+            "capture_ms": {"mean": round(float(np.mean(capture_ms)), 3), "max": round(max(capture_ms), 3)},
+            "full_write_ms": round(full_ms[0], 3),
+            "delta_write_ms": {
+                "mean": round(float(np.mean(delta_ms)), 3) if delta_ms else None,
+                "max": round(max(delta_ms), 3) if delta_ms else None,
+            },
+            "snapshot_bytes": os.path.getsize(path),
+            "delta_log_bytes": os.path.getsize(delta_path(path)),
+            "load_ms": round(load_ms, 3),
+            "roundtrip_ok": ok,
+        }
+    finally:
+        saver.close()
+        sim.close()
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Instantáneas del mundo: banco de pruebas del autoguardado")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--npcs", type=int, default=1000)
+    parser.add_argument("--saves", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=60, help="ticks de simulación entre guardados")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return
+    print(json.dumps(run_benchmark(args.npcs, args.saves, args.ticks, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# game/spatial.py
+
+import math
+import heapq
+from typing import Hashable, Iterable, Iterator
+
+
+class SpatialHash:
+    """
+    Índice espacial de rejilla uniforme para NPC (o cualquier cosa con posición).
+    Cada objeto vive en la celda floor(x / cell_size), floor(y / cell_size);
+    move() solo toca los cubos cuando el objeto cambia de celda, así que
+    actualizarlo cada frame cuesta O(1) por NPC.
+    Las consultas (radio, rectángulo, k vecinos, pares a distancia < r) solo
+    miran las celdas que pueden contener resultados en lugar de recorrer todo.
+    Conviene que cell_size sea del orden del radio de consulta habitual.
+    """
+    def __init__(self, cell_size: float = 64.0):
+        self.cell_size = float(cell_size)
+        self._cells: dict[tuple[int, int], set[Hashable]] = {}
+        self._pos: dict[Hashable, tuple[float, float]] = {}
+        self._cell_of: dict[Hashable, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._pos
+
+    def _key(self, x: float, y: float) -> tuple[int, int]:
+        s = self.cell_size
+        return (math.floor(x / s), math.floor(y / s))
+
+    def position(self, item: Hashable) -> tuple[float, float]:
+        return self._pos[item]
+
+    # ─── Altas, bajas y movimiento ───────────────────────────────────────────
+    def insert(self, item: Hashable, x: float, y: float) -> None:
+        if item in self._pos:
+            self.move(item, x, y)
+            return
+        key = self._key(x, y)
+        self._pos[item] = (x, y)
+        self._cell_of[item] = key
+        self._cells.setdefault(key, set()).add(item)
+
+    def move(self, item: Hashable, x: float, y: float) -> None:
+        old = self._cell_of.get(item)
+        if old is None:
+            self.insert(item, x, y)
+            return
+        self._pos[item] = (x, y)
+        key = self._key(x, y)
+        if key != old:
+            bucket = self._cells[old]
+            bucket.discard(item)
+            if not bucket:
+                del self._cells[old]
+            self._cells.setdefault(key, set()).add(item)
+            self._cell_of[item] = key
+
+    def update_many(self, items: Iterable[Hashable], xs: Iterable[float], ys: Iterable[float]) -> None:
+        """Mueve muchos objetos de una vez (p. ej. desde los arrays de NPCCrowd)."""
+        move = self.move
+        for item, x, y in zip(items, xs, ys):
+            move(item, x, y)
+
+    def remove(self, item: Hashable) -> None:
+        key = self._cell_of.pop(item, None)
+        if key is None:
+            return
+        del self._pos[item]
+        bucket = self._cells[key]
+        bucket.discard(item)
+        if not bucket:
+            del self._cells[key]
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._pos.clear()
+        self._cell_of.clear()
+
+    # ─── Consultas ───────────────────────────────────────────────────────────
+    def _cells_in(self, x0: float, y0: float, x1: float, y1: float) -> Iterator[set[Hashable]]:
+        (cx0, cy0), (cx1, cy1) = self._key(x0, y0), self._key(x1, y1)
+        cells = self._cells
+        # Si el rectángulo cubre más celdas que las ocupadas, mejor recorrer las ocupadas
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+            for (cx, cy), bucket in cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield bucket
+            return
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield bucket
+
+    def query_radius(self, x: float, y: float, r: float, sort: bool = False) -> list[Hashable]:
+        """Objetos a distancia <= r de (x, y); ordenados por distancia si sort=True."""
+        r2 = r * r
+        pos = self._pos
+        found = []
+        for bucket in self._cells_in(x - r, y - r, x + r, y + r):
+            for item in bucket:
+                px, py = pos[item]
+                d2 = (px - x) ** 2 + (py - y) ** 2
+                if d2 <= r2:
+                    found.append((d2, item))
+        if sort:
+            found.sort(key=lambda e: e[0])
+        return [item for _, item in found]
+
+    def query_rect(self, x: float, y: float, w: float, h: float) -> list[Hashable]:
+        """Objetos dentro del rectángulo (x, y, w, h), bordes incluidos."""
+        x1, y1 = x + w, y + h
+        pos = self._pos
+        found = []
+        for bucket in self._cells_in(x, y, x1, y1):
+            for item in bucket:
+                px, py = pos[item]
+                if x <= px <= x1 and y <= py <= y1:
+                    found.append(item)
+        return found
+
+    def nearest(self, x: float, y: float, k: int = 1, max_radius: float = math.inf) -> list[Hashable]:
+        """
+        Los k objetos más cercanos a (x, y) dentro de max_radius, del más cercano
+        al más lejano. Explora anillos de celdas crecientes y para en cuanto el
+        anillo siguiente ya no puede mejorar el resultado.
+        """
+        if k <= 0 or not self._pos:
+            return []
+        s = self.cell_size
+        cx, cy = self._key(x, y)
+        pos, cells = self._pos, self._cells
+        max_r2 = max_radius * max_radius
+        best: list[tuple[float, int, Hashable]] = []  # montículo de máximos (d2 negada)
+        seen = 0
+
+        def consider(bucket):
+            for item in bucket:
+                px, py = pos[item]
+                d2 = (px - x) ** 2 + (py - y) ** 2
+                if d2 > max_r2:
+                    continue
+                entry = (-d2, id(item), item)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif d2 < -best[0][0]:
+                    heapq.heapreplace(best, entry)
+
+        ring = 0
+        while True:
+            if ring == 0:
+                keys = [(cx, cy)]
+            else:
+                keys = [(cx + dx, cy - ring) for dx in range(-ring, ring + 1)]
+                keys += [(cx + dx, cy + ring) for dx in range(-ring, ring + 1)]
+                keys += [(cx - ring, cy + dy) for dy in range(-ring + 1, ring)]
+                keys += [(cx + ring, cy + dy) for dy in range(-ring + 1, ring)]
+            for key in keys:
+                bucket = cells.get(key)
+                if bucket:
+                    seen += len(bucket)
+                    consider(bucket)
+            # el anillo siguiente está como mínimo a ring * s del punto
+            reach = ring * s
+            if len(best) == k and reach * reach >= -best[0][0]:
+                break
+            if reach > max_radius or seen == len(pos):
+                break
+            ring += 1
+            if 8 * ring > len(cells):
+                # anillos más grandes que las celdas ocupadas: se recorren las que faltan
+                for (kx, ky), bucket in cells.items():
+                    if max(abs(kx - cx), abs(ky - cy)) >= ring:
+                        consider(bucket)
+                break
+        best.sort(key=lambda e: -e[0])
+        return [item for _, _, item in best]
+
+    def pairs_within(self, r: float) -> list[tuple[Hashable, Hashable]]:
+        """
+        Todos los pares (a, b) a distancia <= r, cada uno una sola vez.
+        Con r <= cell_size basta comparar cada celda con ella misma y con
+        la mitad de sus vecinas; si r es mayor se amplía el vecindario.
+        """
+        r2 = r * r
+        span = max(1, math.ceil(r / self.cell_size))
+        # mitad del vecindario (evita contar cada par dos veces)
+        offsets = [(dx, dy) for dy in range(0, span + 1) for dx in range(-span, span + 1)
+                   if dy > 0 or dx > 0]
+        pos, cells = self._pos, self._cells
+        pairs = []
+        for (cx, cy), bucket in cells.items():
+            items = [(item, pos[item]) for item in bucket]
+            for i, (a, (ax, ay)) in enumerate(items):
+                for b, (bx, by) in items[i + 1:]:
+                    if (ax - bx) ** 2 + (ay - by) ** 2 <= r2:
+                        pairs.append((a, b))
+            for dx, dy in offsets:
+                other = cells.get((cx + dx, cy + dy))
+                if not other:
+                    continue
+                for b in other:
+                    bx, by = pos[b]
+                    for a, (ax, ay) in items:
+                        if (ax - bx) ** 2 + (ay - by) ** 2 <= r2:
+                            pairs.append((a, b))
+        return pairs
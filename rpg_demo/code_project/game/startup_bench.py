@@ -0,0 +1,133 @@
+# game/startup_bench.py
+"""
+Banco de pruebas de arranque: tiempo de importación y hasta el primer frame.
+
+    python -m game.startup_bench --runs 5
+    python -m game.startup_bench --runs 5 --out startup.json
+
+Cada medida se hace en un intérprete nuevo (sin módulos ya cargados), con el
+driver de vídeo "dummy" de SDL y sin clave de OpenAI. Se informa de:
+- python_s: arranque del intérprete vacío (referencia),
+- import_s: `import game.engine`,
+- init_s: GameEngine(...),
+- first_frame_s: desde antes del import hasta presentar el primer frame,
+- top_imports: los módulos de primer nivel más caros según `-X importtime`.
+La salida es JSON para poder comparar resultados entre versiones.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS = ("import_s", "init_s", "first_frame_s", "process_s")
+
+
+def measure_once() -> dict:
+    """Se ejecuta en el proceso hijo: importa el motor y pinta un frame."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    t0 = time.perf_counter()
+    from game.engine import GameEngine
+    t_import = time.perf_counter()
+    engine = GameEngine(None, max_fps=0)
+    t_init = time.perf_counter()
+    engine.run(max_frames=1)
+    return {
+        "import_s": round(t_import - t0, 4),
+        "init_s": round(t_init - t_import, 4),
+        "first_frame_s": round(engine.first_frame_at - t0, 4),
+        "modules": len(sys.modules),
+    }
+
+
+def parse_importtime(stderr: str, top: int = 10) -> list[dict]:
+    """Módulos de primer nivel de `-X importtime`, ordenados por tiempo acumulado."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        if name.startswith(" " * 2):
+            continue  # importado por otro módulo: ya cuenta en su acumulado
+        rows.append({"module": name.strip(), "cumulative_ms": round(int(parts[1]) / 1000, 2)})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def _child(importtime: bool = False) -> tuple[dict, str, float]:
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-m", "game.startup_bench", "--child"]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1:])
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr, wall
+
+
+def python_startup_s(runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        times.append(time.perf_counter() - t0)
+    return round(statistics.median(times), 4)
+
+
+def run_benchmark(runs: int = 5, top: int = 10) -> dict:
+    samples = []
+    for _ in range(runs):
+        data, _, wall = _child()
+        data["process_s"] = round(wall, 4)
+        samples.append(data)
+    _, stderr, _ = _child(importtime=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": runs,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "python_s": python_startup_s(runs),
+        "median": {m: round(statistics.median(s[m] for s in samples), 4) for m in METRICS},
+        "max": {m: max(s[m] for s in samples) for m in METRICS},
+        "modules": samples[-1]["modules"],
+        "top_imports": parse_importtime(stderr, top),
+        "samples": samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación y hasta el primer frame")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="módulos más caros a listar")
+    parser.add_argument("--out", help="fichero JSON de salida (por defecto, stdout)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_once()))
+        return
+
+    text = json.dumps(run_benchmark(args.runs, args.top), indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
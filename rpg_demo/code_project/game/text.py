@@ -0,0 +1,120 @@
+# game/text.py
+
+import os
+import textwrap
+from collections import OrderedDict
+from functools import lru_cache
+import pygame
+from game.profiler import profile_scope
+
+Color = tuple[int, ...]
+
+
+@lru_cache(maxsize=1024)
+def wrap(text: str, width: int) -> tuple[str, ...]:
+    """textwrap.wrap con caché: los bocadillos repiten el mismo texto cada frame."""
+    return tuple(textwrap.wrap(text, width=width))
+
+
+class TextRenderer:
+    """
+    Servicio compartido de texto.
+    - Fuentes cacheadas por (ruta o nombre de sistema, tamaño).
+    - Superficies renderizadas cacheadas por (fuente, texto, color, antialias, fondo),
+      en un LRU limitado por memoria de píxeles (`max_bytes`), no por número.
+    Un texto estático se rasteriza una sola vez; para texto que cambia en cada
+    frame (p. ej. una respuesta a medio llegar) se puede pasar cache=False.
+    """
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._fonts: dict[tuple[str, int], pygame.font.Font] = {}
+        self._surfaces: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, name: str, size: int) -> pygame.font.Font:
+        """Fuente desde un .ttf/.otf (ruta) o por nombre de sistema (SysFont)."""
+        key = (name, size)
+        font = self._fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            if name and (os.sep in name or os.path.splitext(name)[1].lower() in ('.ttf', '.otf')):
+                font = pygame.font.Font(name, size)
+            else:
+                font = pygame.font.SysFont(name, size)
+            self._fonts[key] = font
+        return font
+
+    @staticmethod
+    def _cost(surf: pygame.Surface) -> int:
+        return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+    def render(
+        self,
+        font: pygame.font.Font,
+        text: str,
+        color: Color = (255, 255, 255),
+        antialias: bool = True,
+        background: Color = None,
+        cache: bool = True
+    ) -> pygame.Surface:
+        key = (font, text, tuple(color), antialias, background)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        with profile_scope("text.render"):
+            surf = font.render(text, antialias, color, background)
+        if not cache:
+            return surf
+        cost = self._cost(surf)
+        if cost > self.max_bytes:
+            return surf
+        self._surfaces[key] = surf
+        self.bytes += cost
+        while self.bytes > self.max_bytes:
+            _, old = self._surfaces.popitem(last=False)
+            self.bytes -= self._cost(old)
+        return surf
+
+    def draw(
+        self,
+        surface: pygame.Surface,
+        font: pygame.font.Font,
+        text: str,
+        pos: tuple[int, int],
+        color: Color = (255, 255, 255),
+        antialias: bool = True,
+        cache: bool = True
+    ) -> pygame.Rect:
+        return surface.blit(self.render(font, text, color, antialias, cache=cache), pos)
+
+    def clear(self) -> None:
+        self._surfaces.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "surfaces": len(self._surfaces),
+            "bytes": self.bytes,
+            "fonts": len(self._fonts),
+        }
+
+
+_renderer: TextRenderer | None = None
+
+
+def get_text_renderer() -> TextRenderer:
+    """Instancia compartida por el motor y la UI."""
+    global _renderer
+    if _renderer is None:
+        _renderer = TextRenderer()
+    return _renderer
@@ -0,0 +1,222 @@
+# game/tilemap.py
+
+import os
+import csv
+from collections import OrderedDict
+import numpy as np
+import pygame
+from game.walkgrid import WalkGrid
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JEROM_TILESET = os.path.join(BASE_DIR, 'assets', 'tilesets', '16x16_Jerom_CC-BY-SA-3.0.png')
+EMPTY = -1
+
+
+class Tileset:
+    """
+    Hoja de tiles cuadrados (por defecto el tileset 16x16 de Jerom).
+    Los tiles se recortan bajo demanda como subsuperficies (sin copiar píxeles)
+    y se escalan una sola vez si se pide `scale`.
+    """
+    def __init__(self, path: str = JEROM_TILESET, tile_size: int = 16, scale: int = 1):
+        image = pygame.image.load(path)
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha() if image.get_flags() & pygame.SRCALPHA else image.convert()
+        self.image = image
+        self.tile_size = tile_size
+        self.scale = scale
+        self.cols = image.get_width() // tile_size
+        self.rows = image.get_height() // tile_size
+        self._tiles: dict[int, pygame.Surface] = {}
+
+    def __len__(self) -> int:
+        return self.cols * self.rows
+
+    @property
+    def size(self) -> int:
+        """Lado de un tile en píxeles ya escalado."""
+        return self.tile_size * self.scale
+
+    def tile(self, index: int) -> pygame.Surface:
+        surf = self._tiles.get(index)
+        if surf is None:
+            if not 0 <= index < len(self):
+                raise ValueError(f"Tile {index} fuera del tileset ({len(self)} tiles, 0..{len(self) - 1})")
+            ts = self.tile_size
+            row, col = divmod(index, self.cols)
+            surf = self.image.subsurface((col * ts, row * ts, ts, ts))
+            if self.scale != 1:
+                surf = pygame.transform.scale(surf, (self.size, self.size))
+            self._tiles[index] = surf
+        return surf
+
+
+class Camera:
+    """Ventana (x, y, w, h) sobre el mundo en píxeles, limitada al tamaño del mapa."""
+    def __init__(self, width: int, height: int, world_size: tuple[int, int] = None):
+        self.x = 0.0
+        self.y = 0.0
+        self.width = width
+        self.height = height
+        self.world_size = world_size
+
+    @property
+    def rect(self) -> pygame.Rect:
+        return pygame.Rect(int(self.x), int(self.y), self.width, self.height)
+
+    def center_on(self, x: float, y: float) -> None:
+        self.x = x - self.width / 2
+        self.y = y - self.height / 2
+        if self.world_size is not None:
+            ww, wh = self.world_size
+            self.x = min(max(self.x, 0), max(ww - self.width, 0))
+            self.y = min(max(self.y, 0), max(wh - self.height, 0))
+
+    def to_screen(self, x: float, y: float) -> tuple[int, int]:
+        return int(x - int(self.x)), int(y - int(self.y))
+
+    def to_world(self, sx: float, sy: float) -> tuple[float, float]:
+        return sx + int(self.x), sy + int(self.y)
+
+
+class TileMap:
+    """
+    Mapa de índices de tiles (una o varias capas, -1 = vacío) dibujado por
+    bloques (chunks) de `chunk_tiles` × `chunk_tiles` tiles.
+    Cada chunk se pre-renderiza en una Surface la primera vez que entra en
+    cámara y se guarda en una caché LRU de `max_chunks`; draw() solo pinta los
+    chunks que tocan la vista, así el coste depende del área visible y no del
+    tamaño del mundo.
+    """
+    def __init__(
+        self,
+        layers: list[np.ndarray],
+        tileset: Tileset,
+        chunk_tiles: int = 16,
+        max_chunks: int = 64,
+        background: tuple[int, int, int] = (0, 0, 0)
+    ):
+        if isinstance(layers, np.ndarray) and layers.ndim == 2:
+            layers = [layers]
+        self.layers = [np.asarray(layer, dtype=np.int16) for layer in layers]
+        shapes = {layer.shape for layer in self.layers}
+        if len(shapes) != 1:
+            raise ValueError(f"Todas las capas deben tener el mismo tamaño: {sorted(shapes)}")
+        self.rows, self.cols = self.layers[0].shape
+        for n, layer in enumerate(self.layers):
+            bad = np.argwhere((layer < EMPTY) | (layer >= len(tileset)))
+            if len(bad):
+                r, c = bad[0].tolist()
+                raise ValueError(
+                    f"Capa {n}, fila {r}, columna {c}: tile {int(layer[r, c])} fuera del tileset "
+                    f"({len(tileset)} tiles; -1 = vacío)"
+                )
+        self.tileset = tileset
+        self.chunk_tiles = chunk_tiles
+        self.max_chunks = max_chunks
+        self.background = background
+        self._chunks: OrderedDict[tuple[int, int], pygame.Surface] = OrderedDict()
+        self.stats = {"built": 0, "evicted": 0}
+
+    @classmethod
+    def load(cls, paths, tileset: Tileset = None, **kwargs) -> 'TileMap':
+        """
+        Carga una o varias capas desde CSV (formato de exportación de Tiled,
+        -1 o vacío = sin tile) o .npy.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        layers = []
+        for path in paths:
+            if path.endswith('.npy'):
+                layers.append(np.load(path))
+                continue
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = [[int(v) if v.strip() else EMPTY for v in row] for row in csv.reader(f) if row]
+            layers.append(np.array(rows, dtype=np.int16))
+        return cls(layers, tileset if tileset is not None else Tileset(), **kwargs)
+
+    @property
+    def pixel_size(self) -> tuple[int, int]:
+        ts = self.tileset.size
+        return self.cols * ts, self.rows * ts
+
+    def walk_grid(self, solid) -> WalkGrid:
+        """Rejilla por tiles (en coordenadas de mundo): transitable si ninguna capa tiene un tile de `solid`."""
+        blocked = np.zeros((self.rows, self.cols), dtype=bool)
+        for layer in self.layers:
+            blocked |= np.isin(layer, list(solid))
+        ts = self.tileset.size
+        return WalkGrid.from_array(~blocked, scale=(1 / ts, 1 / ts))
+
+    @property
+    def chunk_px(self) -> int:
+        return self.chunk_tiles * self.tileset.size
+
+    # ─── Chunks ──────────────────────────────────────────────────────────────
+    def _build_chunk(self, cx: int, cy: int) -> pygame.Surface:
+        ct, ts = self.chunk_tiles, self.tileset.size
+        r0, c0 = cy * ct, cx * ct
+        r1, c1 = min(r0 + ct, self.rows), min(c0 + ct, self.cols)
+        surf = pygame.Surface(((c1 - c0) * ts, (r1 - r0) * ts))
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert()
+        surf.fill(self.background)
+        tile = self.tileset.tile
+        for layer in self.layers:
+            block = layer[r0:r1, c0:c1]
+            rr, cc = np.nonzero(block != EMPTY)
+            # blits() en lote: una sola llamada a pygame por capa
+            surf.blits([
+                (tile(idx), (c * ts, r * ts))
+                for r, c, idx in zip(rr.tolist(), cc.tolist(), block[rr, cc].tolist())
+            ], doreturn=False)
+        self.stats["built"] += 1
+        return surf
+
+    def chunk(self, cx: int, cy: int) -> pygame.Surface:
+        key = (cx, cy)
+        surf = self._chunks.get(key)
+        if surf is not None:
+            self._chunks.move_to_end(key)
+            return surf
+        surf = self._chunks[key] = self._build_chunk(cx, cy)
+        while len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+            self.stats["evicted"] += 1
+        return surf
+
+    def set_tile(self, row: int, col: int, index: int, layer: int = 0) -> None:
+        """Cambia un tile y descarta solo el chunk que lo contiene."""
+        self.layers[layer][row, col] = index
+        self._chunks.pop((col // self.chunk_tiles, row // self.chunk_tiles), None)
+
+    def visible_chunks(self, view: pygame.Rect) -> list[tuple[int, int]]:
+        cp = self.chunk_px
+        n_cx = -(-self.cols // self.chunk_tiles)
+        n_cy = -(-self.rows // self.chunk_tiles)
+        cx0, cy0 = max(view.left // cp, 0), max(view.top // cp, 0)
+        cx1, cy1 = min((view.right - 1) // cp, n_cx - 1), min((view.bottom - 1) // cp, n_cy - 1)
+        return [(cx, cy) for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1)]
+
+    def draw(self, surface: pygame.Surface, camera: Camera, rect: pygame.Rect = None) -> None:
+        """Pinta los chunks visibles; con `rect` (en pantalla) solo repinta esa zona."""
+        view = camera.rect
+        cp = self.chunk_px
+        if rect is None:
+            surface.blits([
+                (self.chunk(cx, cy), (cx * cp - view.x, cy * cp - view.y))
+                for cx, cy in self.visible_chunks(view)
+            ], doreturn=False)
+            return
+        area = rect.move(view.topleft).clip(view)
+        if not area:
+            return
+        blits = []
+        for cx, cy in self.visible_chunks(area):
+            # trozo del chunk (en sus coordenadas) que cae dentro de `area`
+            surf = self.chunk(cx, cy)
+            part = area.move(-cx * cp, -cy * cp).clip(surf.get_rect())
+            dest = (cx * cp + part.x - view.x, cy * cp + part.y - view.y)
+            blits.append((surf, dest, part))
+        surface.blits(blits, doreturn=False)
@@ -0,0 +1,56 @@
+# game/timestep.py
+
+from pygame.math import Vector2
+
+
+class FixedTimestep:
+    """
+    Reloj de simulación a paso fijo con acumulador.
+    Cada frame se le pasa el tiempo real transcurrido (advance) y devuelve
+    cuántos pasos de `dt = 1 / hz` toca simular: la simulación siempre avanza
+    en pasos iguales, así que un frame lento solo produce más pasos, no
+    resultados distintos.
+    `max_steps` limita los pasos por frame (evita la espiral de la muerte en
+    máquinas lentas: el tiempo sobrante se descarta y la simulación va más
+    despacio en lugar de bloquear el render). `alpha` es la fracción de paso
+    pendiente, para interpolar el render entre el estado anterior y el actual.
+    """
+    def __init__(self, hz: float = 60.0, max_steps: int = 5):
+        if hz <= 0:
+            raise ValueError("hz debe ser > 0")
+        if max_steps < 1:
+            raise ValueError("max_steps debe ser >= 1")
+        self.hz = float(hz)
+        self.dt = 1.0 / self.hz
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.steps = 0
+        self.dropped = 0.0
+
+    def advance(self, frame_dt: float) -> int:
+        """Suma `frame_dt` segundos reales y devuelve los pasos a simular ahora."""
+        self.accumulator += max(frame_dt, 0.0)
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            self.dropped += (steps - self.max_steps) * self.dt
+            steps = self.max_steps
+        self.accumulator -= steps * self.dt
+        if self.accumulator >= self.dt:
+            # lo que no cabe en max_steps se pierde; solo queda la fracción
+            self.accumulator %= self.dt
+        self.steps += steps
+        return steps
+
+    @property
+    def alpha(self) -> float:
+        return self.accumulator / self.dt
+
+    @property
+    def time(self) -> float:
+        """Tiempo de simulación transcurrido, en segundos."""
+        return self.steps * self.dt
+
+
+def lerp(prev: Vector2, curr: Vector2, alpha: float) -> tuple[float, float]:
+    """Posición interpolada entre dos pasos de simulación."""
+    return (prev.x + (curr.x - prev.x) * alpha, prev.y + (curr.y - prev.y) * alpha)
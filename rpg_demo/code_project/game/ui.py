@@ -1,5 +1,6 @@
 import pygame
 from game.data import WIDTH, HEIGHT, CLASSES
+from game.text import get_text_renderer
 
 
 def character_selection(screen):
@@ -7,9 +8,9 @@ def character_selection(screen):
     Muestra un menú para seleccionar la clase del jugador.
     Retorna el diccionario con los datos de la clase seleccionada.
     """
-    pygame.font.init()
-    title_font = pygame.font.SysFont("Arial", 32)
-    option_font = pygame.font.SysFont("Arial", 24)
+    text = get_text_renderer()
+    title_font = text.font("Arial", 32)
+    option_font = text.font("Arial", 24)
     options = list(CLASSES.keys())
     selected = 0
     clock = pygame.time.Clock()
@@ -17,14 +18,13 @@ def character_selection(screen):
     while True:
         screen.fill((0, 0, 0))
         # Título
-        title_surf = title_font.render("Selecciona tu clase", True, (255, 255, 255))
+        title_surf = text.render(title_font, "Selecciona tu clase")
         screen.blit(title_surf, ((WIDTH - title_surf.get_width()) // 2, 80))
 
         # Opciones
         for idx, key in enumerate(options):
             cls = CLASSES[key]
-            text = f"{cls['name']}: {cls['description']}"
-            surf = option_font.render(text, True, (255, 255, 255))
+            surf = text.render(option_font, f"{cls['name']}: {cls['description']}")
             x = 100
             y = 180 + idx * 60
             if idx == selected:
@@ -51,9 +51,8 @@ def character_selection(screen):
 class UI:
     @staticmethod
     def draw_text(screen, text, pos, font_size=18, color=(255, 255, 255)):
-        font = pygame.font.SysFont("Arial", font_size)
-        surf = font.render(text, True, color)
-        screen.blit(surf, pos)
+        renderer = get_text_renderer()
+        renderer.draw(screen, renderer.font("Arial", font_size), text, pos, color)
 
     @staticmethod
     def draw_menu(screen, greeting, options, selected_index):
@@ -71,13 +70,11 @@ class UI:
         screen.blit(box, (20, y0))
 
         # Saludo
-        font = pygame.font.SysFont("Arial", 20)
-        surf = font.render(greeting, True, (255, 255, 255))
-        screen.blit(surf, (30, y0 + 10))
+        text = get_text_renderer()
+        text.draw(screen, text.font("Arial", 20), greeting, (30, y0 + 10))
 
         # Opciones
-        opt_font = pygame.font.SysFont("Arial", 18)
+        opt_font = text.font("Arial", 18)
         for i, opt in enumerate(options):
             prefix = '→ ' if i == selected_index else '   '
-            surf = opt_font.render(prefix + opt, True, (255, 255, 255))
-            screen.blit(surf, (30, y0 + 10 + line_h * (i + 1)))
+            text.draw(screen, opt_font, prefix + opt, (30, y0 + 10 + line_h * (i + 1)))
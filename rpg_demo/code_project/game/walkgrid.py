@@ -0,0 +1,113 @@
+# game/walkgrid.py
+
+import os
+import numpy as np
+
+CACHE_SUFFIX = ".walk.npz"
+CACHE_VERSION = 1
+
+
+class WalkGrid:
+    """
+    Rejilla de celdas transitables construida una sola vez a partir de la
+    máscara del mapa (pygame.surfarray), guardada como bits empaquetados
+    (np.packbits: 1 bit por píxel, filas = y) y cacheada en disco junto al PNG.
+    Las consultas aceptan un punto o arrays de coordenadas para resolver
+    todas las colisiones del frame en una sola operación vectorizada.
+    `scale` convierte coordenadas de mundo a celdas (p. ej. si el mapa se
+    dibuja escalado a la pantalla).
+    """
+    def __init__(self, packed: np.ndarray, width: int, height: int, scale: tuple[float, float] = (1.0, 1.0)):
+        self.packed = packed
+        self.width = width
+        self.height = height
+        self.scale = scale
+
+    # ─── Construcción ────────────────────────────────────────────────────────
+    @classmethod
+    def from_array(cls, walkable: np.ndarray, **kwargs) -> 'WalkGrid':
+        """`walkable` en forma (alto, ancho), como una imagen."""
+        walkable = np.asarray(walkable, dtype=bool)
+        h, w = walkable.shape
+        return cls(np.packbits(walkable, axis=1), w, h, **kwargs)
+
+    @classmethod
+    def from_surface(cls, surface, channel: int = 0, threshold: int = 0, **kwargs) -> 'WalkGrid':
+        """
+        Transitable donde el canal `channel` (0=R … 3=alfa, como get_at) supera `threshold`.
+        """
+        import pygame
+        if channel == 3:
+            values = pygame.surfarray.array_alpha(surface)
+        else:
+            values = pygame.surfarray.array3d(surface)[..., channel]
+        # surfarray indexa [x, y]; se guarda como imagen [y, x]
+        return cls.from_array(values.T > threshold, **kwargs)
+
+    @classmethod
+    def load(cls, map_path: str, channel: int = 0, threshold: int = 0, use_cache: bool = True, **kwargs) -> 'WalkGrid':
+        """
+        Carga la rejilla de `map_path`; reutiliza `<mapa>.walk.npz` si es más
+        reciente que el PNG y se creó con el mismo canal y umbral.
+        """
+        cache_path = os.path.splitext(map_path)[0] + CACHE_SUFFIX
+        src_mtime = os.path.getmtime(map_path)
+        if use_cache and os.path.exists(cache_path):
+            try:
+                with np.load(cache_path) as data:
+                    meta = data["meta"].tolist()
+                    if meta == [CACHE_VERSION, channel, threshold] and float(data["mtime"]) == src_mtime:
+                        h, w = data["shape"].tolist()
+                        return cls(data["bits"], w, h, **kwargs)
+            except (OSError, KeyError, ValueError):
+                pass  # caché corrupta o antigua: se regenera
+        import pygame
+        grid = cls.from_surface(pygame.image.load(map_path), channel, threshold, **kwargs)
+        if use_cache:
+            grid.save(cache_path, src_mtime, channel, threshold)
+        return grid
+
+    def save(self, path: str, src_mtime: float = 0.0, channel: int = 0, threshold: int = 0) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                bits=self.packed,
+                shape=np.array([self.height, self.width]),
+                meta=np.array([CACHE_VERSION, channel, threshold]),
+                mtime=np.array(src_mtime),
+            )
+        os.replace(tmp, path)
+
+    # ─── Consultas ───────────────────────────────────────────────────────────
+    @property
+    def array(self) -> np.ndarray:
+        """Rejilla desempaquetada (alto, ancho) de bools."""
+        return np.unpackbits(self.packed, axis=1, count=self.width).astype(bool)
+
+    def to_cells(self, xs, ys) -> tuple[np.ndarray, np.ndarray]:
+        sx, sy = self.scale
+        cx = np.floor(np.asarray(xs, dtype=np.float64) * sx).astype(np.intp)
+        cy = np.floor(np.asarray(ys, dtype=np.float64) * sy).astype(np.intp)
+        return cx, cy
+
+    def walkable_cells(self, cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+        """Versión vectorizada sobre índices de celda; fuera del mapa es no transitable."""
+        cx = np.asarray(cx, dtype=np.intp)
+        cy = np.asarray(cy, dtype=np.intp)
+        inside = (cx >= 0) & (cx < self.width) & (cy >= 0) & (cy < self.height)
+        x = np.where(inside, cx, 0)
+        y = np.where(inside, cy, 0)
+        bits = (self.packed[y, x >> 3] >> (7 - (x & 7))) & 1
+        return inside & (bits == 1)
+
+    def walkable(self, xs, ys) -> np.ndarray:
+        """Transitabilidad de muchos puntos de mundo a la vez."""
+        return self.walkable_cells(*self.to_cells(xs, ys))
+
+    def is_walkable(self, x: float, y: float) -> bool:
+        sx, sy = self.scale
+        cx, cy = int(x * sx // 1), int(y * sy // 1)
+        if not (0 <= cx < self.width and 0 <= cy < self.height):
+            return False
+        return bool((self.packed[cy, cx >> 3] >> (7 - (cx & 7))) & 1)
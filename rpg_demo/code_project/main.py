@@ -1,15 +1,23 @@
 import os
-import openai
 from game.engine import GameEngine
 
 def main():
-    # Leer la clave desde la variable de entorno
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-    if not openai.api_key:
+    # Leer la clave desde la variable de entorno (openai se importa al abrir el primer chat)
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
         raise RuntimeError("No se encontró OPENAI_API_KEY en las variables de entorno")
 
     # Inicializar y ejecutar el motor de juego
-    engine = GameEngine(openai.api_key)
+    # RPG_DIRTY_RECTS=1 activa el pintado por rectángulos sucios (menos CPU en menús y chat)
+    # RPG_SAVE es la ruta de la partida guardada (se carga al entrar al mapa y se autoguarda)
+    # RPG_SIM_HZ fija la frecuencia de la simulación (p. ej. 30 en máquinas lentas) y RPG_MAX_FPS la del render
+    engine = GameEngine(
+        api_key,
+        dirty_rects=os.getenv("RPG_DIRTY_RECTS") == "1",
+        sim_hz=float(os.getenv("RPG_SIM_HZ", "60")),
+        max_fps=int(os.getenv("RPG_MAX_FPS", "120")),
+        save_path=os.getenv("RPG_SAVE") or None
+    )
     engine.run()
 
 if __name__ == "__main__":
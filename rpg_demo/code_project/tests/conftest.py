@@ -0,0 +1,13 @@
+# tests/conftest.py
+
+import pytest
+from game.db import get_store, close_all
+
+
+@pytest.fixture
+def db(tmp_path):
+    """BD de memorias temporal con el esquema creado; cierra el pool y el escritor al acabar."""
+    path = str(tmp_path / "memoria.db")
+    get_store(path).init_schema()
+    yield path
+    close_all()
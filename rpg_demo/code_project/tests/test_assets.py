@@ -0,0 +1,40 @@
+# tests/test_assets.py
+
+import threading
+import pygame
+import pytest
+from game.assets import AssetManager
+
+
+@pytest.fixture
+def assets(tmp_path):
+    pygame.image.save(pygame.Surface((8, 8)), str(tmp_path / "fondo.png"))
+    manager = AssetManager(root=str(tmp_path), disk_cache=False)
+    yield manager
+    manager.shutdown()
+
+
+def test_request_during_preload_waits_instead_of_decoding_twice(assets):
+    started, release = threading.Event(), threading.Event()
+    load_raw = assets._load_raw
+
+    def slow_load(spec):
+        started.set()
+        assert release.wait(5)
+        return load_raw(spec)
+    assets._load_raw = slow_load
+    future = assets.preload(("fondo.png", (16, 16)))
+    assert started.wait(5)
+    threading.Timer(0.05, release.set).start()
+    surf = assets.scaled("fondo.png", (16, 16))
+    future.result(5)
+    assert surf.get_size() == (16, 16)
+    assert assets.stats["loads"] == 1 and assets.stats["preloaded"] == 1
+    assert assets._raw == {} and assets._loading == {}
+
+
+def test_preload_skips_what_is_already_loaded(assets):
+    surf = assets.scaled("fondo.png", (16, 16))
+    assets.preload(("fondo.png", (16, 16))).result(5)
+    assert assets.scaled("fondo.png", (16, 16)) is surf
+    assert assets.stats["loads"] == 1 and assets._raw == {}
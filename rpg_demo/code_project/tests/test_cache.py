@@ -0,0 +1,65 @@
+# tests/test_cache.py
+
+from game.db import get_writer
+from game.llm import DialogueTreeBackend
+from game.cache import ResponseCache
+from game.conversation import ConversationManager
+
+TREES = {"Lina": {"greeting": "Hola, viajero.", "options": [
+    {"text": "¿Qué vendes?", "response": "Pan y queso."},
+]}}
+
+
+class CountingBackend(DialogueTreeBackend):
+    def __init__(self):
+        super().__init__(TREES)
+        self.calls = 0
+
+    def complete(self, npc_name, messages):
+        self.calls += 1
+        return super().complete(npc_name, messages)
+
+
+def manager(db):
+    backend = CountingBackend()
+    conv = ConversationManager(None, backend=backend, cache=ResponseCache(db), db_filename=db)
+    return conv, backend
+
+
+def test_same_context_and_message_hits(db):
+    conv, backend = manager(db)
+    for _ in range(3):
+        assert conv.get_dialogue("Lina", "Ana", "hola") == "Hola, viajero."
+    # 1.º sin contexto, 2.º tras un saludo, 3.º con el mismo contexto que el 2.º
+    assert conv.cache.stats()["hits"] == 1
+    assert backend.calls == 2
+
+
+def test_key_is_stable_across_writer_flush(db):
+    conv, backend = manager(db)
+    conv.get_dialogue("Lina", "Ana", "hola")
+    conv.get_dialogue("Lina", "Ana", "hola")
+    assert get_writer(db).flush(timeout=5)
+    conv.get_dialogue("Lina", "Ana", "¡Hola!")  # normalizado: misma clave
+    assert conv.cache.stats()["hits"] == 1
+    assert backend.calls == 2
+
+
+def test_new_context_or_player_misses(db):
+    conv, backend = manager(db)
+    conv.get_dialogue("Lina", "Ana", "hola")
+    conv.get_dialogue("Lina", "Ana", "hola")
+    conv.get_dialogue("Lina", "Ana", "¿qué vendes?")
+    assert conv.get_dialogue("Lina", "Ana", "hola") == "Hola, viajero."
+    conv.get_dialogue("Lina", "Bruno", "hola")
+    assert conv.cache.stats()["hits"] == 0
+    assert backend.calls == 5
+
+
+def test_entries_survive_a_restart(db):
+    conv, _ = manager(db)
+    conv.get_dialogue("Lina", "Ana", "hola")
+    key = conv._cache_key("Lina", "Ana", "hola")
+    conv.get_dialogue("Lina", "Ana", "hola")
+    cold = ResponseCache(db)
+    assert cold.get(key) == "Hola, viajero."
@@ -0,0 +1,66 @@
+# tests/test_cif_ck.py
+
+import numpy as np
+import pytest
+from game.cif_ck import SocialNetwork
+
+NPCS = ["Ana", "Bruno", "Lina"]
+
+
+def moves(net, n=20):
+    return [getattr(net.decide_move("Ana", "Bruno"), "name", None) for _ in range(n)]
+
+
+def test_decide_move_is_reproducible_with_a_seed():
+    assert moves(SocialNetwork(NPCS, seed=7)) == moves(SocialNetwork(NPCS, seed=7))
+
+
+def test_scalar_and_batch_paths_share_the_seeded_rng():
+    a, b = SocialNetwork(NPCS, seed=3), SocialNetwork(NPCS, seed=3)
+    a.decide_move("Ana", "Bruno")
+    b.decide_move("Ana", "Bruno")
+    assert (a.decide_moves_all() == b.decide_moves_all()).all()
+
+
+RULES = {
+    "attributes": ["amistad", "respeto", "miedo"],
+    "moves": [
+        {"name": "saludar"},
+        {"name": "elogiar", "when": [["amistad", ">", 0.2], ["amistad", "<=", 0.8]], "allow_self": False},
+        {"name": "confiar", "when": [["amistad", ">=", 0.5], ["miedo", "<", 0.1]],
+         "weight": {"base": 0.5, "amistad": 2.0}},
+        {"name": "huir", "when": [["miedo", ">", 0.6]], "effects": {"miedo": -0.3}},
+        {"name": "obedecer", "when": [["respeto", ">=", 0.3], ["respeto", ">=", 0.6], ["miedo", "<=", 0.0]]},
+    ],
+}
+
+
+def test_indexed_lookup_matches_each_rule_precondition():
+    net = SocialNetwork(NPCS, seed=0, rules=RULES)
+    net.values[...] = np.round(net.rng.uniform(-1, 1, net.values.shape), 1)  # umbrales exactos incluidos
+    mask = net.valid_mask()
+    for s, src in enumerate(net.names):
+        for t, tgt in enumerate(net.names):
+            want = [m.name for m in net.moves if m.precond(net, src, tgt)]
+            assert [m.name for m in net.get_valid_moves(src, tgt)] == want
+            assert [m.name for m, ok in zip(net.moves, mask[:, s, t]) if ok] == want
+
+
+def test_rules_with_unknown_attributes_or_comparators_are_rejected():
+    bad_attr = {"attributes": ["amistad"], "moves": [{"name": "x", "when": [["odio", ">", 0]]}]}
+    with pytest.raises(ValueError, match="odio"):
+        SocialNetwork(NPCS, rules=bad_attr)
+    bad_op = {"attributes": ["amistad"], "moves": [{"name": "x", "when": [["amistad", "==", 0]]}]}
+    with pytest.raises(ValueError, match="Comparador"):
+        SocialNetwork(NPCS, rules=bad_op)
+
+
+def test_rule_effects_and_weights_come_from_the_file():
+    net = SocialNetwork(NPCS, seed=0, rules=RULES)
+    net.adjust_pair("amistad", "Ana", "Bruno", 0.6)
+    confiar = next(m for m in net.moves if m.name == "confiar")
+    assert confiar.weight(net, "Ana", "Bruno") == pytest.approx(0.5 + 2.0 * 0.6)
+    net.adjust_pair("miedo", "Ana", "Bruno", 0.9)
+    huir = next(m for m in net.moves if m.name == "huir")
+    net.execute_move(huir, "Ana", "Bruno")
+    assert net.get_pair("miedo", "Ana", "Bruno") == pytest.approx(0.6)
@@ -0,0 +1,123 @@
+# tests/test_conversation_stream.py
+
+import sqlite3
+import threading
+from concurrent.futures import wait
+from game.db import get_writer
+from game.cache import ResponseCache
+from game.conversation import ConversationManager, FALLBACK_REPLY
+
+CHUNKS = ["Hola", ", viajero", ". ¿Qué", " buscas?"]
+
+
+class FakeStreamBackend:
+    """Backend local: cede CHUNKS y se detiene tras `hold_after` trozos hasta que se llame a release()."""
+    def __init__(self, chunks=CHUNKS, hold_after: int = None):
+        self.chunks = chunks
+        self.hold_after = hold_after
+        self.held = threading.Event()
+        self.gate = threading.Event()
+
+    def release(self) -> None:
+        self.gate.set()
+
+    def complete(self, npc_name, messages):
+        return "".join(self.chunks)
+
+    def stream(self, npc_name, messages):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.hold_after:
+                self.held.set()
+                assert self.gate.wait(5)
+            yield chunk
+
+
+class BrokenStreamBackend(FakeStreamBackend):
+    """Cede `fail_after` trozos y luego se corta la conexión."""
+    def __init__(self, fail_after: int):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def stream(self, npc_name, messages):
+        yield from self.chunks[:self.fail_after]
+        raise ConnectionError("stream cortado")
+
+
+def memories(db):
+    writer = get_writer(db)
+    assert writer.flush(timeout=5)
+    return writer.load("Lina", "Ana")
+
+
+def manager(db, backend):
+    return ConversationManager(None, backend=backend, db_filename=db)
+
+
+def test_stream_yields_chunks_in_order(db):
+    conv = manager(db, FakeStreamBackend())
+    assert list(conv.stream_dialogue("Lina", "Ana", "hola")) == CHUNKS
+
+
+def test_partial_text_while_in_flight(db):
+    backend = FakeStreamBackend(hold_after=2)
+    conv = manager(db, backend)
+    req = conv.submit_dialogue("Lina", "Ana", "hola", stream=True)
+    try:
+        assert backend.held.wait(5)
+        assert not req.done()
+        assert req.partial == "Hola, viajero"
+        assert memories(db) == []
+    finally:
+        backend.release()
+    assert req.future.result(5) == "Hola, viajero. ¿Qué buscas?"
+    assert req.partial == "Hola, viajero. ¿Qué buscas?"
+    conv.shutdown()
+
+
+def test_memory_saved_once_when_stream_ends(db):
+    conv = manager(db, FakeStreamBackend())
+    stream = conv.stream_dialogue("Lina", "Ana", "hola")
+    next(stream)
+    assert memories(db) == []
+    list(stream)
+    assert memories(db) == ["Jugador: hola", "Lina: Hola, viajero. ¿Qué buscas?"]
+
+
+def test_cancel_saves_nothing(db):
+    backend = FakeStreamBackend(hold_after=1)
+    conv = manager(db, backend)
+    req = conv.submit_dialogue("Lina", "Ana", "hola", stream=True)
+    assert backend.held.wait(5)
+    req.cancel()
+    backend.release()
+    wait([req.future], timeout=5)
+    assert req.done() and req.cancelled
+    conv.shutdown()
+    assert memories(db) == []
+
+
+def test_db_error_building_the_key_falls_back(db, monkeypatch):
+    conv = ConversationManager(None, backend=FakeStreamBackend(), cache=ResponseCache(db), db_filename=db)
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(conv, "_cache_key", locked)
+    assert list(conv.stream_dialogue("Lina", "Ana", "hola")) == [FALLBACK_REPLY]
+    assert memories(db) == ["Jugador: hola", f"Lina: {FALLBACK_REPLY}"]
+
+
+def test_error_before_first_chunk_falls_back(db):
+    conv = manager(db, BrokenStreamBackend(fail_after=0))
+    assert list(conv.stream_dialogue("Lina", "Ana", "hola")) == [FALLBACK_REPLY]
+    assert memories(db) == ["Jugador: hola", f"Lina: {FALLBACK_REPLY}"]
+
+
+def test_mid_stream_error_is_not_remembered_or_cached(db):
+    cache = ResponseCache(db)
+    conv = ConversationManager(None, backend=BrokenStreamBackend(fail_after=2), cache=cache, db_filename=db)
+    assert list(conv.stream_dialogue("Lina", "Ana", "hola")) == CHUNKS[:2]
+    assert memories(db) == []
+    assert cache.stats()["size"] == 0
+    conv.backend = FakeStreamBackend()
+    assert list(conv.stream_dialogue("Lina", "Ana", "hola")) == CHUNKS
+    assert cache.stats()["hits"] == 0
@@ -0,0 +1,21 @@
+# tests/test_db.py
+
+import threading
+import pytest
+from game.db import get_store, get_writer, save_npc_memory, load_npc_memory
+
+
+def test_memory_path_is_rejected():
+    with pytest.raises(ValueError):
+        get_store(":memory:")
+
+
+def test_rows_written_by_the_writer_are_seen_from_other_threads(db):
+    save_npc_memory("Lina", "Ana", "Jugador: hola", db)
+    assert get_writer(db).flush(timeout=5)
+    seen = []
+    reader = threading.Thread(target=lambda: seen.extend(get_store(db).load("Lina", "Ana")))
+    reader.start()
+    reader.join(5)
+    assert seen == ["Jugador: hola"]
+    assert load_npc_memory("Lina", "Ana", db_filename=db) == ["Jugador: hola"]
@@ -0,0 +1,55 @@
+# tests/test_events.py
+
+from game.events import EventScheduler
+
+
+def names(batch):
+    return [ev.name for ev in batch]
+
+
+def test_due_events_come_out_in_time_then_schedule_order():
+    sched = EventScheduler()
+    sched.schedule_at(3.0, "c")
+    sched.schedule_at(1.0, "a")
+    sched.schedule_at(2.0, "b1")
+    sched.schedule_at(2.0, "b2")
+    sched.schedule_in(10.0, "tarde")
+    assert names(sched.update(0.5)) == []
+    assert names(sched.update(2.5)) == ["a", "b1", "b2", "c"]
+    assert len(sched) == 1
+
+
+def test_cancelled_events_are_skipped():
+    sched = EventScheduler()
+    keep = sched.schedule_in(1.0, "sigue")
+    drop = sched.schedule_in(1.0, "cancelado")
+    drop.cancel()
+    assert names(sched.update(1.0)) == ["sigue"]
+    assert not keep.cancelled and len(sched) == 0
+
+
+def test_recurring_event_repeats_until_cancelled():
+    sched = EventScheduler()
+    tick = sched.schedule_every(1.0, "tick", first=0.5)
+    fired = [names(sched.update(0.5)) for _ in range(5)]
+    assert fired == [["tick"], [], ["tick"], [], ["tick"]]
+    tick.cancel()
+    assert names(sched.update(5.0)) == []
+
+
+def test_long_frame_fires_a_recurring_event_once_and_reschedules_ahead():
+    sched = EventScheduler()
+    tick = sched.schedule_every(1.0, "tick")
+    assert names(sched.update(3.5)) == ["tick"]
+    assert tick.time == 4.5
+
+
+def test_subscribers_get_one_batch_per_update():
+    sched = EventScheduler()
+    batches = []
+    sched.subscribe(lambda batch: batches.append(names(batch)))
+    sched.schedule_at(1.0, "a", target="Lina")
+    sched.schedule_at(1.0, "b")
+    sched.update(0.5)
+    sched.update(0.5)
+    assert batches == [["a", "b"]]
@@ -0,0 +1,30 @@
+# tests/test_headless.py
+
+import os
+import sys
+import json
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bloquea openai en el proceso hijo: la simulación headless no debe necesitarlo
+NO_OPENAI = """
+import sys, runpy
+class Block:
+    def find_spec(self, name, path=None, target=None):
+        if name == "openai" or name.startswith("openai."):
+            raise ImportError("openai no disponible")
+sys.meta_path.insert(0, Block())
+sys.argv = ["game.headless", "--npcs", "20", "--ticks", "10"]
+runpy.run_module("game.headless", run_name="__main__")
+"""
+
+
+def test_headless_runs_without_openai():
+    proc = subprocess.run(
+        [sys.executable, "-c", NO_OPENAI], cwd=BASE_DIR, capture_output=True, text=True, timeout=120
+    )
+    assert proc.returncode == 0, proc.stderr
+    report = json.loads(proc.stdout)
+    assert report["npcs"] == 20
+    assert "openai" not in proc.stderr
@@ -0,0 +1,95 @@
+# tests/test_pathfinding.py
+
+import math
+import numpy as np
+import pytest
+from game.walkgrid import WalkGrid
+from game.pathfinding import PathfindingService
+
+
+def service(walk: np.ndarray) -> PathfindingService:
+    return PathfindingService(WalkGrid.from_array(walk), cell_size=1, region_size=4)
+
+
+@pytest.fixture
+def wall():
+    """20×20 con un muro vertical en x=10 y un hueco en y=17."""
+    walk = np.ones((20, 20), dtype=bool)
+    walk[:, 10] = False
+    walk[17, 10] = True
+    return walk
+
+
+def cells(path, step=0.1):
+    """Celdas que pisa la ruta (muestreando cada segmento)."""
+    out = set()
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        n = max(1, int(math.dist((x0, y0), (x1, y1)) / step))
+        out |= {(int(x0 + (x1 - x0) * t / n), int(y0 + (y1 - y0) * t / n)) for t in range(n + 1)}
+    return out
+
+
+def length(path):
+    return sum(math.dist(a, b) for a, b in zip(path, path[1:]))
+
+
+def test_straight_path_keeps_only_the_ends():
+    pf = service(np.ones((10, 10), dtype=bool))
+    assert pf.find_path((0.5, 2.5), (8.5, 2.5)) == [(0.5, 2.5), (8.5, 2.5)]
+
+
+def test_astar_goes_through_the_gap_with_optimal_cost(wall):
+    pf = service(wall)
+    path = pf.find_path((2.5, 2.5), (17.5, 2.5))
+    assert (10, 17) in cells(path)
+    # A* y el campo de flujo deben dar el mismo coste óptimo (octil)
+    field = pf.flow_field((17.5, 2.5))
+    assert length(path) == pytest.approx(field.distance(2.5, 2.5), rel=1e-5)
+    assert all(wall[y, x] for x, y in cells(path))
+
+
+def test_following_the_flow_field_reaches_the_goal(wall):
+    pf = service(wall)
+    field = pf.flow_field((17.5, 2.5))
+    pos = np.array([[2.5, 2.5], [5.5, 19.5], [15.5, 15.5]], dtype=np.float32)
+    for _ in range(200):
+        pos += field.direction(pos[:, 0], pos[:, 1])
+    assert np.allclose(pos, (17.5, 2.5), atol=1.0)
+
+
+def test_no_path_is_empty_and_reopening_finds_one(wall):
+    wall[17, 10] = True
+    pf = service(wall)
+    pf.set_blocked((10, 0, 1, 20), blocked=True)
+    assert pf.find_path((2.5, 2.5), (17.5, 2.5)) == []
+    pf.set_blocked((10, 5, 1, 1), blocked=False)
+    assert pf.find_path((2.5, 2.5), (17.5, 2.5)) != []
+
+
+def test_blocking_invalidates_paths_through_the_area(wall):
+    pf = service(wall)
+    before = pf.find_path((2.5, 2.5), (17.5, 2.5))
+    pf.set_blocked((10, 17, 1, 1), blocked=True)
+    pf.set_blocked((10, 3, 1, 1), blocked=False)
+    after = pf.find_path((2.5, 2.5), (17.5, 2.5))
+    assert (10, 17) in cells(before)
+    assert (10, 3) in cells(after) and (10, 17) not in cells(after)
+
+
+def test_flow_field_reuses_a_queued_job():
+    pf = service(np.ones((20, 20), dtype=bool))
+    queued = pf.request_flow_field((5.5, 5.5))
+    assert not queued.done and pf.pending == 1
+    field = pf.flow_field((5.5, 5.5))
+    assert field is queued and field.done
+    assert pf.pending == 0 and pf.stats["fields"] == 1
+    pf.update(budget_ms=50)
+    assert pf.flow_field((5.5, 5.5)) is field and pf.stats["fields"] == 1
+
+
+def test_incremental_requests_match_sync_results(wall):
+    pf = service(wall)
+    req = pf.request_path((2.5, 2.5), (17.5, 2.5))
+    while not req.done:
+        pf.update(budget_ms=50)
+    assert req.path == service(wall).find_path((2.5, 2.5), (17.5, 2.5))
@@ -0,0 +1,29 @@
+# tests/test_profiler.py
+
+import threading
+import time
+from game.profiler import Profiler
+
+
+def test_background_scopes_do_not_count_in_the_frame():
+    prof = Profiler(enabled=True)
+    prof.begin_frame()
+    with prof.scope("render"):
+        time.sleep(0.002)
+
+    def worker():
+        with prof.scope("llm.complete"):
+            time.sleep(0.03)
+    t = threading.Thread(target=worker)
+    t.start()
+    t.join()
+    prof.end_frame()
+
+    stats = prof.stats()
+    assert "llm.complete" not in stats["scopes"]
+    assert stats["scopes"]["render"]["max"] < 30
+    assert stats["background"]["llm.complete"]["max"] >= 30
+    assert any(line.startswith("~llm.complete") for line in prof.overlay_lines())
+    # la traza sí conserva el hilo de cada medida
+    tids = {ev["tid"] for ev in prof.events if ev["name"] in ("render", "llm.complete")}
+    assert len(tids) == 2
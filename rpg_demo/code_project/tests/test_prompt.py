@@ -0,0 +1,73 @@
+# tests/test_prompt.py
+
+from game.db import save_npc_memory, get_writer
+from game.prompt import ExtractiveSummarizer, LLMSummarizer, PromptBuilder, count_tokens
+
+LINES = [f"Jugador: frase de relleno número {i} para llenar el resumen" for i in range(20)]
+
+
+class VerboseBackend:
+    """Ignora el límite pedido y responde con un resumen larguísimo."""
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, npc_name, messages):
+        self.calls += 1
+        return "El jugador habló mucho. " * 200
+
+
+def test_llm_summary_over_budget_falls_back_to_extractive():
+    summarizer = LLMSummarizer(VerboseBackend(), max_tokens=50)
+    summary = summarizer("Lina", "", LINES)
+    assert count_tokens(summary) <= 50
+    assert summary == ExtractiveSummarizer(50)("Lina", "", LINES)
+
+
+def test_extractive_keeps_salient_lines():
+    lines = ["Jugador: me llamo Arn y prometo traer la llave."] + [f"Jugador: hola {'a' * i}" for i in range(10)]
+    summary = ExtractiveSummarizer(max_tokens=30)("Lina", "", lines)
+    assert count_tokens(summary) <= 30
+    assert summary.startswith("Jugador: me llamo Arn")
+
+
+def test_one_fold_per_call(db):
+    backend = VerboseBackend()
+    builder = PromptBuilder(
+        recent_turns=4, summarize_batch=2, max_folds_per_call=1,
+        summarizer=LLMSummarizer(backend, max_tokens=50), db_filename=db
+    )
+    for line in LINES:
+        save_npc_memory("Lina", "Ana", line, db)
+    assert get_writer(db).flush(timeout=5)
+    builder.build("Lina", "Ana")
+    assert backend.calls == 1
+    prompt, _ = builder.build("Lina", "Ana")
+    assert backend.calls == 2
+    assert count_tokens(prompt) <= builder.token_budget
+
+
+def test_threads_wait_for_the_tokenizer_load(monkeypatch):
+    import sys
+    import time
+    import types
+    import threading
+    import game.prompt as prompt
+
+    class Encoding:
+        def encode(self, text):
+            return text.split()
+
+    def get_encoding(name):
+        time.sleep(0.05)
+        return Encoding()
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=get_encoding))
+    monkeypatch.setattr(prompt, "_ENCODING", None)
+    monkeypatch.setattr(prompt, "_ENCODING_LOADED", False)
+    counts = []
+    threads = [threading.Thread(target=lambda: counts.append(count_tokens("una frase de cinco palabras")))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counts == [5] * 8
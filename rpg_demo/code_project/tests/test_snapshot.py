@@ -0,0 +1,72 @@
+# tests/test_snapshot.py
+
+import logging
+import numpy as np
+from game.cif_ck import SocialNetwork
+from game.emotion import EmotionEngine
+from game.snapshot import WorldState, WorldSaver, load_world, delta_path
+
+NPCS = ["Ana", "Bruno", "Lina"]
+
+
+def capture(positions, social, emotions, time):
+    return WorldState.capture(NPCS, positions, social=social, emotions=emotions, time=time)
+
+
+def test_snapshot_and_deltas_round_trip(tmp_path):
+    path = str(tmp_path / "world.snap")
+    social, emotions = SocialNetwork(NPCS, seed=0), EmotionEngine(NPCS)
+    positions = np.array([[10, 20], [30, 40], [50, 60]], dtype=np.float32)
+    saver = WorldSaver(path, full_every=0, max_delta_ratio=float("inf"))
+    for step in range(4):
+        positions[step % 3] += 5
+        social.values[0, 1, 2] = step
+        emotions.table[2, 0] = step / 10
+        saver.autosave(capture(positions, social, emotions, step))
+        saver.flush()
+    saver.close()
+    assert saver.stats["full"] == 1 and saver.stats["delta"] == 3
+
+    loaded = load_world(path)
+    assert loaded.time == 3
+    assert np.array_equal(loaded.positions, positions)
+    assert np.array_equal(loaded.social, social.values)
+    assert np.array_equal(loaded.emotions, emotions.table)
+    assert loaded.position("Bruno") == (35.0, 45.0)
+
+
+def test_truncated_delta_record_is_ignored(tmp_path):
+    path = str(tmp_path / "world.snap")
+    positions = np.zeros((3, 2), dtype=np.float32)
+    saver = WorldSaver(path, full_every=0, max_delta_ratio=float("inf"))
+    saver.autosave(capture(positions, None, None, 0))
+    saver.flush()
+    positions[0] = (1, 1)
+    saver.autosave(capture(positions, None, None, 1))
+    saver.flush()
+    positions[1] = (2, 2)
+    saver.autosave(capture(positions, None, None, 2))
+    saver.close()
+    with open(delta_path(path), "r+b") as f:
+        f.truncate(f.seek(0, 2) - 3)  # último registro a medias
+    loaded = load_world(path)
+    assert loaded.time == 1
+    assert loaded.position("Ana") == (1.0, 1.0) and loaded.position("Bruno") == (0.0, 0.0)
+
+
+def test_write_error_is_logged_and_next_save_is_full(tmp_path, caplog):
+    blocker = tmp_path / "world.snap"
+    blocker.mkdir()  # un directorio donde va el fichero: os.replace falla
+    path = str(blocker)
+    positions = np.zeros((3, 2), dtype=np.float32)
+    saver = WorldSaver(path)
+    with caplog.at_level(logging.ERROR, logger="game.snapshot"):
+        saver.autosave(capture(positions, None, None, 0))
+        saver.flush()
+    assert saver.stats["failed"] == 1 and isinstance(saver.error, OSError)
+    assert "autoguardar" in caplog.text
+    blocker.rmdir()
+    saver.autosave(capture(positions, None, None, 1))
+    saver.close()
+    assert saver.stats["full"] == 1
+    assert load_world(path).time == 1
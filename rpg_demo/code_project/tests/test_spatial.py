@@ -0,0 +1,65 @@
+# tests/test_spatial.py
+
+import math
+import random
+import pytest
+from game.spatial import SpatialHash
+
+
+@pytest.fixture
+def points():
+    rng = random.Random(4)
+    return {i: (rng.uniform(-300, 900), rng.uniform(-200, 700)) for i in range(300)}
+
+
+@pytest.fixture
+def index(points):
+    sh = SpatialHash(cell_size=40)
+    for item, (x, y) in points.items():
+        sh.insert(item, x, y)
+    return sh
+
+
+def dist(points, item, x, y):
+    return math.dist(points[item], (x, y))
+
+
+@pytest.mark.parametrize("r", [5, 40, 150])
+def test_query_radius_matches_brute_force(points, index, r):
+    want = sorted(i for i in points if dist(points, i, 100, 50) <= r)
+    assert sorted(index.query_radius(100, 50, r)) == want
+    ordered = index.query_radius(100, 50, r, sort=True)
+    assert [dist(points, i, 100, 50) for i in ordered] == sorted(dist(points, i, 100, 50) for i in want)
+
+
+def test_query_rect_matches_brute_force(points, index):
+    want = sorted(i for i, (x, y) in points.items() if 0 <= x <= 250 and 100 <= y <= 180)
+    assert sorted(index.query_rect(0, 100, 250, 80)) == want
+
+
+@pytest.mark.parametrize("k, max_radius", [(1, math.inf), (7, math.inf), (5, 30), (400, math.inf)])
+def test_nearest_matches_brute_force(points, index, k, max_radius):
+    ranked = sorted((dist(points, i, 420, 300), i) for i in points)
+    want = [d for d, _ in ranked if d <= max_radius][:k]
+    got = index.nearest(420, 300, k, max_radius=max_radius)
+    assert [dist(points, i, 420, 300) for i in got] == pytest.approx(want)
+
+
+@pytest.mark.parametrize("r", [10, 40, 100])
+def test_pairs_within_matches_brute_force(points, index, r):
+    items = sorted(points)
+    want = {(a, b) for n, a in enumerate(items) for b in items[n + 1:]
+            if math.dist(points[a], points[b]) <= r}
+    got = [tuple(sorted(p)) for p in index.pairs_within(r)]
+    assert len(got) == len(set(got))
+    assert set(got) == want
+
+
+def test_move_and_remove_keep_queries_consistent(index):
+    index.move(0, 1000, 1000)
+    assert index.nearest(1001, 1001) == [0]
+    index.update_many([1, 2], [1002, 998], [1000, 1000])
+    assert sorted(index.query_radius(1000, 1000, 5)) == [0, 1, 2]
+    index.remove(1)
+    assert 1 not in index and sorted(index.query_radius(1000, 1000, 5)) == [0, 2]
+    assert len(index) == 299
@@ -0,0 +1,44 @@
+# tests/test_tilemap.py
+
+import numpy as np
+import pygame
+import pytest
+from game.tilemap import TileMap, Tileset, Camera
+
+
+@pytest.fixture
+def tilemap():
+    rng = np.random.default_rng(0)
+    tileset = Tileset()
+    layer = rng.integers(0, len(tileset), size=(40, 50))
+    return TileMap(layer, tileset, chunk_tiles=8)
+
+
+def test_partial_draw_matches_full_draw(tilemap):
+    camera = Camera(320, 240, tilemap.pixel_size)
+    camera.center_on(300, 260)
+    full = pygame.Surface((320, 240))
+    tilemap.draw(full, camera)
+
+    partial = pygame.Surface((320, 240))
+    partial.fill((255, 0, 255))
+    rect = pygame.Rect(100, 50, 90, 130)  # cruza bordes de chunk
+    tilemap.draw(partial, camera, rect)
+
+    got = pygame.surfarray.array3d(partial)
+    want = pygame.surfarray.array3d(full)
+    inside = np.zeros(got.shape[:2], dtype=bool)
+    inside[rect.left:rect.right, rect.top:rect.bottom] = True
+    assert (got[inside] == want[inside]).all()
+    assert (got[~inside] == (255, 0, 255)).all()
+
+
+def test_partial_draw_only_builds_overlapping_chunks(tilemap):
+    camera = Camera(320, 240, tilemap.pixel_size)
+    tilemap.draw(pygame.Surface((320, 240)), camera, pygame.Rect(0, 0, 10, 10))
+    assert tilemap.stats["built"] == 1
+
+
+def test_out_of_range_tile_is_rejected():
+    with pytest.raises(ValueError, match="fuera del tileset"):
+        TileMap(np.array([[0, 10_000]]), Tileset())